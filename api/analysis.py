@@ -2,9 +2,37 @@
 Transaction analysis: income vs expenses, cash flow, categories, top merchants.
 Works with both Plaid and PDF-parsed transactions in common format.
 """
+import hashlib
+import heapq
+import importlib.util
+import json
+import os
+import re
 from collections import defaultdict
-from datetime import datetime
-from typing import Any
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import islice, repeat
+from operator import itemgetter
+from typing import Any, Iterable
+
+from .categorizer import KeywordCategorizer
+from .timing import stage
+from .transactions import TransactionBatch, as_batch
+
+# Parsed batches, or dict lists (client payloads, stored statements) converted on entry
+Transactions = TransactionBatch | list[dict[str, Any]]
+
+# numpy is optional and imported on first columnar use, not at startup
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+# Row count at which analyze_transactions switches to the NumPy columnar engine
+COLUMNAR_THRESHOLD = int(os.getenv("ANALYSIS_COLUMNAR_THRESHOLD") or 2000)
+TOP_MERCHANTS = 10
+# ANALYSIS_MERCHANT_SKETCH: 0 keeps every merchant's exact total; N > 0 keeps at most N per
+# partial as a space-saving summary (top merchants become approximate, memory stays constant)
+MERCHANT_SKETCH_SIZE = int(os.getenv("ANALYSIS_MERCHANT_SKETCH") or 0)
+# Rows analyzed per chunk when transactions arrive as an iterator
+STREAM_CHUNK_ROWS = 10000
 
 
 # Simple heuristics for categorizing by description (when Plaid category not available)
@@ -20,41 +48,207 @@ CATEGORY_KEYWORDS = {
 }
 
 
+# Built once at import; rebuild (or restart) after editing CATEGORY_KEYWORDS
+_categorizer = KeywordCategorizer(CATEGORY_KEYWORDS)
+
+
 def _infer_category(description: str) -> str:
-    desc_lower = (description or "").lower()
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        if any(kw in desc_lower for kw in keywords):
-            return category
-    return "Other"
+    return _categorizer.categorize(description)
 
 
-def analyze_transactions(transactions: list[dict[str, Any]]) -> dict[str, Any]:
+@stage("analyze")
+def analyze_transactions(transactions: Transactions | Iterable[dict[str, Any]]) -> dict[str, Any]:
     """
     Compute detailed analysis from transaction list.
     Each transaction: { date, description, amount, category? (optional, from Plaid) }
+    Any other iterable of transactions is consumed in chunks (see TransactionAggregator).
     """
+    if not isinstance(transactions, (list, TransactionBatch)):
+        aggregator = TransactionAggregator()
+        aggregator.add(transactions)
+        return aggregator.result()
+    if not transactions:
+        return _empty_analysis()
+    return finalize_partial(partial_analysis(transactions))
+
+
+@stage("analyze")
+def analyze_parts(parts: Iterable[Transactions]) -> dict[str, Any]:
+    """analyze_transactions of several transaction lists (e.g. one per statement) taken in
+    order, without concatenating them first."""
+    aggregator = TransactionAggregator()
+    for part in parts:
+        aggregator.add(part)
+    return aggregator.result()
+
+
+def _empty_analysis() -> dict[str, Any]:
+    return {
+        "total_income": 0,
+        "total_expenses": 0,
+        "cash_flow": 0,
+        "by_category": {},
+        "top_merchants": [],
+        "cash_flow_by_month": {},
+        "transaction_count": 0,
+    }
+
+
+# Partial aggregates: unrounded sums for one batch of transactions (e.g. one statement).
+# Partials merge by adding, so a user's analysis is the merge of per-statement partials.
+# PARTIAL_VERSION changes with the categorizer keywords and the merchant sketch size; bump its
+# leading number when any other rule behind a partial changes (e.g. _month_key's date parsing).
+# Stale partials must be recomputed.
+PARTIAL_VERSION = "2-" + hashlib.sha1(
+    json.dumps(CATEGORY_KEYWORDS, sort_keys=True).encode()
+).hexdigest()[:12] + (f"-s{MERCHANT_SKETCH_SIZE}" if MERCHANT_SKETCH_SIZE else "")
+
+
+def _new_partial() -> dict[str, Any]:
+    return {
+        "version": PARTIAL_VERSION,
+        "income": 0.0,
+        "expenses": 0.0,
+        "by_category": {},
+        "by_month": {},
+        "by_merchant": {},
+        "count": 0,
+    }
+
+
+def partial_analysis(transactions: Transactions) -> dict[str, Any]:
+    """Mergeable aggregate of a transaction list (JSON-serializable)."""
     if not transactions:
-        return {
-            "total_income": 0,
-            "total_expenses": 0,
-            "cash_flow": 0,
-            "by_category": {},
-            "top_merchants": [],
-            "cash_flow_by_month": {},
-            "transaction_count": 0,
-        }
+        return _new_partial()
+    batch = as_batch(transactions)
+    if HAS_NUMPY and len(batch) >= COLUMNAR_THRESHOLD:
+        partial = _partial_columnar(batch)
+    else:
+        partial = _partial_rows(batch)
+    return _bound_merchants(partial) if MERCHANT_SKETCH_SIZE else partial
+
+
+def is_current_partial(partial: Any) -> bool:
+    return isinstance(partial, dict) and partial.get("version") == PARTIAL_VERSION
+
+
+def merge_partials(partials: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Sum partials. Keys keep first-seen order, as if the transactions had been concatenated."""
+    merged = _new_partial()
+    for p in partials:
+        _merge_into(merged, p)
+    return merged
+
+
+def _merge_into(merged: dict[str, Any], p: dict[str, Any]) -> None:
+    merged["income"] += p["income"]
+    merged["expenses"] += p["expenses"]
+    merged["count"] += p["count"]
+    for field in ("by_category", "by_month"):
+        target = merged[field]
+        for k, v in p[field].items():
+            target[k] = target.get(k, 0.0) + v
+    target = merged["by_merchant"]
+    floor, merged_floor = p.get("merchant_floor", 0.0), merged.get("merchant_floor", 0.0)
+    if floor or merged_floor:
+        # Space-saving merge: a merchant one side dropped may have had up to that side's floor
+        for k in target.keys() - p["by_merchant"].keys():
+            target[k] += floor
+        for k, v in p["by_merchant"].items():
+            target[k] = target.get(k, merged_floor) + v
+        merged["merchant_floor"] = merged_floor + floor
+    else:
+        for k, v in p["by_merchant"].items():
+            target[k] = target.get(k, 0.0) + v
+    if MERCHANT_SKETCH_SIZE:
+        _bound_merchants(merged)
+
+
+def _bound_merchants(partial: dict[str, Any], size: int | None = None) -> dict[str, Any]:
+    """Keep the `size` (default MERCHANT_SKETCH_SIZE) largest merchant totals (in first-seen
+    order). merchant_floor records the largest total dropped, an upper bound for any merchant
+    no longer listed."""
+    size = MERCHANT_SKETCH_SIZE if size is None else size
+    by_merchant = partial["by_merchant"]
+    if len(by_merchant) <= size:
+        return partial
+    largest = heapq.nlargest(size + 1, by_merchant.items(), key=itemgetter(1))
+    kept = {k for k, _ in largest[:size]}
+    partial["by_merchant"] = {k: v for k, v in by_merchant.items() if k in kept}
+    partial["merchant_floor"] = max(partial.get("merchant_floor", 0.0), largest[size][1])
+    return partial
 
+
+class TransactionAggregator:
+    """Running analysis of transactions that arrive in pieces: batches, dict lists or any
+    iterable of dicts (read STREAM_CHUNK_ROWS at a time). Each piece is reduced to a partial
+    and merged, so the whole transaction list never has to exist at once."""
+
+    def __init__(self) -> None:
+        self.partial = _new_partial()
+
+    def add(self, transactions: Transactions | Iterable[dict[str, Any]]) -> None:
+        if isinstance(transactions, (list, TransactionBatch)):
+            if transactions:
+                _merge_into(self.partial, partial_analysis(transactions))
+            return
+        rows = iter(transactions)
+        while chunk := list(islice(rows, STREAM_CHUNK_ROWS)):
+            _merge_into(self.partial, partial_analysis(chunk))
+
+    def add_partial(self, partial: dict[str, Any]) -> None:
+        _merge_into(self.partial, partial)
+
+    def result(self) -> dict[str, Any]:
+        return finalize_partial(self.partial)
+
+
+def finalize_partial(partial: dict[str, Any]) -> dict[str, Any]:
+    """Round and rank a partial into the analyze_transactions result."""
+    if not partial["count"]:
+        return _empty_analysis()
+    total_income = partial["income"]
+    total_expenses = partial["expenses"]
+    return {
+        "total_income": round(total_income, 2),
+        "total_expenses": round(total_expenses, 2),
+        "cash_flow": round(total_income - total_expenses, 2),
+        "by_category": {k: round(v, 2) for k, v in partial["by_category"].items()},
+        "top_merchants": _top_merchants(partial["by_merchant"]),
+        "cash_flow_by_month": {k: round(v, 2) for k, v in sorted(partial["by_month"].items())},
+        "transaction_count": partial["count"],
+    }
+
+
+def _top_merchants(by_merchant: dict[str, float]) -> list[dict[str, Any]]:
+    """Top merchants by rounded amount; ties keep first-seen order. A k-sized heap, not a
+    sort of every merchant."""
+    names = list(by_merchant)
+    sums = list(by_merchant.values())
+    candidates = range(len(names))
+    if HAS_NUMPY and len(names) > COLUMNAR_THRESHOLD:
+        import numpy as np
+        arr = np.asarray(sums, dtype=np.float64)
+        if not np.isnan(arr).any():
+            # Only merchants within a cent of the k-th largest raw sum can reach the rounded top k
+            kth = np.partition(arr, len(arr) - TOP_MERCHANTS)[-TOP_MERCHANTS]
+            candidates = np.flatnonzero(arr >= kth - 0.01).tolist()
+    # nlargest matches a stable descending sort, so ties stay in first-seen order
+    top = heapq.nlargest(TOP_MERCHANTS, candidates, key=lambda i: round(sums[i], 2))
+    return [{"name": names[i], "amount": round(sums[i], 2)} for i in top]
+
+
+def _partial_rows(batch: TransactionBatch) -> dict[str, Any]:
+    """Pure-Python engine: one pass over the columns. Used for small inputs and without NumPy."""
     total_income = 0.0
     total_expenses = 0.0
     by_category: dict[str, float] = defaultdict(float)
     by_merchant: dict[str, float] = defaultdict(float)
     by_month: dict[str, float] = defaultdict(float)
 
-    for t in transactions:
-        amount = float(t.get("amount", 0))
-        desc = (t.get("description") or t.get("name") or "Unknown").strip()
-        cat = t.get("category") or _infer_category(desc)
-        date_str = t.get("date")
+    categories = batch.column("category") or repeat(None)
+    for amount, desc, cat, date_str in zip(batch.amounts, batch.descriptions, categories, batch.dates):
+        cat = cat or _infer_category(desc)
         if amount > 0:
             total_income += amount
         else:
@@ -68,22 +262,88 @@ def analyze_transactions(transactions: list[dict[str, Any]]) -> dict[str, Any]:
             if month:
                 by_month[month] += amount
 
-    top_merchants = sorted(
-        [{"name": k, "amount": round(v, 2)} for k, v in by_merchant.items()],
-        key=lambda x: -x["amount"],
-    )[:10]
+    return {
+        "version": PARTIAL_VERSION,
+        "income": total_income,
+        "expenses": total_expenses,
+        "by_category": dict(by_category),
+        "by_month": dict(by_month),
+        "by_merchant": dict(by_merchant),
+        "count": len(batch),
+    }
 
-    by_category_final = {k: round(v, 2) for k, v in by_category.items()}
-    by_month_final = {k: round(v, 2) for k, v in sorted(by_month.items())}
+
+def _partial_columnar(batch: TransactionBatch) -> dict[str, Any]:
+    """
+    NumPy engine. The amounts column is used in place; one Python pass turns the string columns
+    into integer codes for category/merchant/month (per-distinct-string work memoized), then
+    every total is a bincount. bincount accumulates each bin sequentially in row order, the same
+    order as _partial_rows, so the sums are bit-for-bit identical.
+    """
+    import numpy as np
+    n = len(batch)
+    amounts = np.frombuffer(batch.amounts, dtype=np.float64)
+    cat_codes = np.empty(n, dtype=np.intp)
+    merchant_codes = np.full(n, -1, dtype=np.intp)
+    month_codes = np.full(n, -1, dtype=np.intp)
+    categories: dict[str, int] = {}
+    merchants: dict[str, int] = {}
+    months: dict[str, int] = {}
+    month_of: dict[Any, str | None] = {}
+    inferred: dict[str, str] = {}
+    merchant_of: dict[str, str] = {}
+
+    rows = zip(batch.amounts, batch.descriptions, batch.column("category") or repeat(None), batch.dates)
+    for i, (amount, desc, cat, date_str) in enumerate(rows):
+        if not cat:
+            cat = inferred.get(desc)
+            if cat is None:
+                cat = inferred[desc] = _infer_category(desc)
+        code = categories.get(cat)
+        if code is None:
+            code = categories[cat] = len(categories)
+        cat_codes[i] = code
+        if amount < 0:
+            merchant = merchant_of.get(desc)
+            if merchant is None:
+                merchant = merchant_of[desc] = _extract_merchant(desc)
+            code = merchants.get(merchant)
+            if code is None:
+                code = merchants[merchant] = len(merchants)
+            merchant_codes[i] = code
+        if date_str:
+            try:
+                month = month_of[date_str]
+            except KeyError:
+                month = month_of[date_str] = _month_key(date_str)
+            except TypeError:  # unhashable date value
+                month = _month_key(date_str)
+            if month:
+                code = months.get(month)
+                if code is None:
+                    code = months[month] = len(months)
+                month_codes[i] = code
+
+    abs_amounts = np.abs(amounts)
+    # Bin 1 = income (amount > 0), bin 0 = everything else counted as expense
+    totals = np.bincount((amounts > 0).astype(np.intp), weights=abs_amounts, minlength=2).tolist()
+    total_expenses, total_income = totals[0], totals[1]
+    cat_sums = np.bincount(cat_codes, weights=abs_amounts, minlength=len(categories)).tolist()
+    has_month = month_codes >= 0
+    month_sums = np.bincount(month_codes[has_month], weights=amounts[has_month], minlength=len(months)).tolist()
+    is_expense = merchant_codes >= 0
+    merchant_sums = np.bincount(
+        merchant_codes[is_expense], weights=abs_amounts[is_expense], minlength=len(merchants)
+    ).tolist()
 
     return {
-        "total_income": round(total_income, 2),
-        "total_expenses": round(total_expenses, 2),
-        "cash_flow": round(total_income - total_expenses, 2),
-        "by_category": by_category_final,
-        "top_merchants": top_merchants,
-        "cash_flow_by_month": by_month_final,
-        "transaction_count": len(transactions),
+        "version": PARTIAL_VERSION,
+        "income": total_income,
+        "expenses": total_expenses,
+        "by_category": dict(zip(categories, cat_sums)),
+        "by_month": dict(zip(months, month_sums)),
+        "by_merchant": dict(zip(merchants, merchant_sums)),
+        "count": n,
     }
 
 
@@ -97,15 +357,97 @@ def _extract_merchant(description: str) -> str:
     return description[:50] or "Unknown"
 
 
-def _month_key(date_str: Any) -> str | None:
-    """Convert various date formats to YYYY-MM."""
+# Parsers store ISO dates; older saved statements and other sources may carry any of these
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d %b %Y", "%d %B %Y")
+# Formats read the first 10 characters (so timestamps parse); month names are also tried on
+# the whole value, as "15 January 2025" is longer
+_DATE_PREFIX = 10
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+# Distinct date values remembered by _parse_date / _month_key
+DATE_MEMO_SIZE = 8192
+
+
+def _parse_date(date_str: Any) -> date | None:
+    """Parse the date formats we understand; None if unrecognized. Memoized: a user's
+    dates repeat across every analysis run."""
     if not date_str:
         return None
+    try:
+        return _parse_date_cached(date_str)
+    except TypeError:  # unhashable value
+        return _parse_date_uncached(date_str)
+
+
+def _parse_date_uncached(date_str: Any) -> date | None:
     s = str(date_str).strip()
-    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d %b %Y", "%d %B %Y"):
+    if _ISO_DATE.match(s):
         try:
-            dt = datetime.strptime(s[:10], fmt[:10] if len(fmt) > 10 else fmt)
-            return dt.strftime("%Y-%m")
+            return date.fromisoformat(s[:10])
         except ValueError:
-            continue
+            pass
+    prefix = s[:_DATE_PREFIX]
+    for fmt in DATE_FORMATS:
+        for text in (s, prefix) if "%b" in fmt or "%B" in fmt else (prefix,):
+            try:
+                return datetime.strptime(text, fmt).date()
+            except ValueError:
+                continue
     return None
+
+
+_parse_date_cached = lru_cache(maxsize=DATE_MEMO_SIZE)(_parse_date_uncached)
+
+
+@lru_cache(maxsize=DATE_MEMO_SIZE)
+def _month_key_cached(date_str: Any) -> str | None:
+    if type(date_str) is str and _ISO_DATE.fullmatch(date_str):
+        # What the parsers store: check it is a real date, then slice
+        try:
+            date.fromisoformat(date_str)
+            return date_str[:7]
+        except ValueError:
+            return None
+    parsed = _parse_date_uncached(date_str)
+    return parsed.strftime("%Y-%m") if parsed else None
+
+
+def _month_key(date_str: Any) -> str | None:
+    """Convert various date formats to YYYY-MM. Memoized, with ISO dates sliced instead of parsed."""
+    try:
+        return _month_key_cached(date_str)
+    except TypeError:  # unhashable value
+        parsed = _parse_date_uncached(date_str)
+        return parsed.strftime("%Y-%m") if parsed else None
+
+
+def filter_transactions(
+    transactions: Transactions,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    category: str | None = None,
+) -> TransactionBatch:
+    """Transactions inside [date_from, date_to] and/or in category (explicit or inferred).
+    With a date bound set, transactions whose date can't be parsed are excluded."""
+    batch = as_batch(transactions)
+    keep = range(len(batch))
+    if date_from or date_to:
+        parsed = [_parse_date(d) for d in batch.dates]
+        keep = [
+            i for i in keep
+            if parsed[i] is not None and not (date_from and parsed[i] < date_from)
+            and not (date_to and parsed[i] > date_to)
+        ]
+    if category:
+        descriptions = batch.descriptions
+        categories = batch.column("category") or [None] * len(batch)
+        keep = [i for i in keep if (categories[i] or _infer_category(descriptions[i])) == category]
+    return batch.take(keep)
+
+
+def newest_first(transactions: Transactions) -> TransactionBatch:
+    """Sort by parsed date, newest first; undated transactions last. Ties: later rows first."""
+    batch = as_batch(transactions)
+    keyed = [(_parse_date(d), i) for i, d in enumerate(batch.dates)]
+    dated = sorted((k for k in keyed if k[0] is not None), reverse=True)
+    undated = [k for k in reversed(keyed) if k[0] is None]
+    return batch.take(i for _, i in dated + undated)
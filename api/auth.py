@@ -0,0 +1,176 @@
+"""
+Supabase JWT verification with a cached JWKS and a cache of already-verified tokens.
+The JWKS is fetched once per TTL (or when a token names an unknown kid), not per request.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from typing import Any, Callable
+
+from .io_pool import run_io
+
+logger = logging.getLogger(__name__)
+
+JWKS_TTL_SECONDS = int(os.getenv("JWKS_TTL_SECONDS") or 600)
+# Minimum gap between refreshes triggered by unknown kids (protects the JWKS endpoint)
+JWKS_MIN_REFRESH_SECONDS = int(os.getenv("JWKS_MIN_REFRESH_SECONDS") or 30)
+JWKS_FETCH_TIMEOUT = float(os.getenv("JWKS_FETCH_TIMEOUT") or 5)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE") or 1024)
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256"]
+AUDIENCE = "authenticated"
+
+
+def _fetch_json(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=JWKS_FETCH_TIMEOUT) as resp:
+        return json.load(resp)
+
+
+class JWKSCache:
+    """Signing keys by kid, refreshed after ttl or on an unknown kid. Concurrent callers
+    share a single in-flight refresh."""
+
+    def __init__(self, url: str, ttl: float = JWKS_TTL_SECONDS,
+                 min_refresh_interval: float = JWKS_MIN_REFRESH_SECONDS,
+                 fetch: Callable[[str], dict] = _fetch_json):
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.fetch = fetch
+        self._keys: dict[str, Any] = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self.refreshes = 0
+
+    def _refresh(self, seen_at: float) -> None:
+        import jwt
+
+        with self._lock:
+            if self._fetched_at > seen_at:
+                return  # another caller refreshed while we waited
+            jwk_set = jwt.PyJWKSet.from_dict(self.fetch(self.url))
+            self._keys = {k.key_id: k for k in jwk_set.keys}
+            self._fetched_at = time.monotonic()
+            self.refreshes += 1
+            logger.info("Fetched JWKS (%d keys)", len(self._keys))
+
+    def get_signing_key(self, kid: str | None) -> Any:
+        seen_at = self._fetched_at
+        age = time.monotonic() - seen_at
+        if not self._keys or age > self.ttl:
+            self._refresh(seen_at)
+        elif kid not in self._keys and age > self.min_refresh_interval:
+            self._refresh(seen_at)  # key rotation
+        key = self._keys.get(kid)
+        if key is None:
+            import jwt
+            raise jwt.InvalidTokenError(f"Unknown signing key {kid!r}")
+        return key.key
+
+
+class TokenCache:
+    """LRU of verified token -> sub. Entries are dropped once the token's exp passes."""
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> str | None:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            sub, exp = entry
+            if exp <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return sub
+
+    def set(self, token: str, sub: str, exp: float | None) -> None:
+        if not sub or not exp or self.max_size <= 0:
+            return  # never cache tokens without an expiry
+        with self._lock:
+            self._entries[self._key(token)] = (sub, float(exp))
+            self._entries.move_to_end(self._key(token))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_jwks_caches: dict[str, JWKSCache] = {}
+_jwks_lock = threading.Lock()
+token_cache = TokenCache()
+
+
+def jwks_url() -> str | None:
+    """SUPABASE_JWKS_URL overrides the URL derived from SUPABASE_URL (e.g. a local stand-in)."""
+    if url := os.getenv("SUPABASE_JWKS_URL"):
+        return url
+    supabase_url = os.getenv("SUPABASE_URL")
+    return f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json" if supabase_url else None
+
+
+def get_jwks_cache(url: str) -> JWKSCache:
+    with _jwks_lock:
+        if url not in _jwks_caches:
+            _jwks_caches[url] = JWKSCache(url)
+        return _jwks_caches[url]
+
+
+def verify_token(token: str) -> str | None:
+    """Return the token's sub if it verifies against the JWKS or the legacy HS256 secret."""
+    sub = token_cache.get(token)
+    if sub is not None:
+        return sub
+    import jwt  # deferred: PyJWT pulls in cryptography, which requests without a token never need
+
+    payload = None
+    url = jwks_url()
+    if url:
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            payload = jwt.decode(
+                token,
+                get_jwks_cache(url).get_signing_key(kid),
+                algorithms=ASYMMETRIC_ALGORITHMS,
+                audience=AUDIENCE,
+                options={"verify_exp": True},
+            )
+        except Exception as e:
+            logger.debug("JWKS verification failed: %s", e)
+
+    secret = os.getenv("SUPABASE_JWT_SECRET")
+    if payload is None and secret:
+        try:
+            payload = jwt.decode(token, secret, algorithms=["HS256"], audience=AUDIENCE)
+        except jwt.InvalidTokenError as e:
+            logger.debug("HS256 verification failed: %s", e)
+
+    if payload is None:
+        return None
+    sub = payload.get("sub")
+    token_cache.set(token, sub, payload.get("exp"))
+    return sub
+
+
+async def verify_token_async(token: str) -> str | None:
+    """verify_token for async handlers. A cached token is answered on the event loop; a miss
+    (signature check, possibly a JWKS fetch) runs on the I/O pool so it never blocks the loop."""
+    sub = token_cache.get(token)
+    if sub is not None:
+        return sub
+    return await run_io(verify_token, token)
@@ -0,0 +1,68 @@
+"""
+Keyword categorizer: every category keyword compiled into one trie-shaped regex, so each
+description is scanned once instead of once per keyword.
+The first matching category in dict order wins, as with a nested keyword loop.
+"""
+import re
+from functools import lru_cache
+
+DEFAULT_MEMO_SIZE = 8192
+
+
+def _trie_pattern(words: list[str]) -> str:
+    """Regex alternation factored by common prefix. Optional tails are greedy, so at any
+    position the longest matching keyword is the one reported."""
+    trie: dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordCategorizer:
+    """Map a description to the highest-priority category whose keyword it contains."""
+
+    def __init__(self, keywords: dict[str, list[str]], default: str = "Other",
+                 memo_size: int = DEFAULT_MEMO_SIZE):
+        self.categories = list(keywords)
+        self.default = default
+        priority: dict[str, int] = {}
+        for rank, kws in enumerate(keywords.values()):
+            for kw in kws:
+                if kw:
+                    priority.setdefault(kw.lower(), rank)
+        # A match reports the longest keyword at its position; every shorter keyword that is
+        # a prefix of it matches there too, so fold their priorities in up front.
+        self._best = {
+            kw: min(p for other, p in priority.items() if kw.startswith(other))
+            for kw in priority
+        }
+        self._pattern = re.compile(_trie_pattern(list(priority))) if priority else None
+        self.categorize = lru_cache(maxsize=memo_size)(self._categorize)
+
+    def _categorize(self, description: str | None) -> str:
+        if not description or self._pattern is None:
+            return self.default
+        text = description.lower()
+        best = len(self.categories)
+        search = self._pattern.search
+        m = search(text)
+        while m is not None:
+            rank = self._best[m.group()]
+            if rank < best:
+                best = rank
+                if best == 0:
+                    break
+            # Resume one character later so keywords overlapping this match are still seen
+            m = search(text, m.start() + 1)
+        return self.categories[best] if best < len(self.categories) else self.default
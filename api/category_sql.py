@@ -0,0 +1,36 @@
+"""
+Rows of public.category_keywords, generated from analysis.CATEGORY_KEYWORDS so that the
+Postgres categorizer (infer_transaction_category) uses the same list. After editing the
+keywords, write them into a new migration and over the block that ends supabase_schema.sql:
+
+    python -m api.category_sql > supabase/migrations/<timestamp>_category_keywords.sql
+"""
+import sys
+
+from .analysis import CATEGORY_KEYWORDS
+
+HEADER = "-- Generated by python -m api.category_sql from CATEGORY_KEYWORDS in api/analysis.py; do not edit."
+
+
+def _quote(text: str) -> str:
+    return "'" + text.replace("'", "''") + "'"
+
+
+def category_keywords_sql(keywords: dict[str, list[str]] = CATEGORY_KEYWORDS) -> str:
+    """Statements replacing the table's rows: (priority, category, keyword), priority in dict
+    order and keywords lower-cased, as KeywordCategorizer reads them."""
+    rows, seen = [], set()
+    for priority, (category, kws) in enumerate(keywords.items()):
+        for kw in kws:
+            if kw and (category, kw.lower()) not in seen:
+                seen.add((category, kw.lower()))
+                rows.append(f"  ({priority}, {_quote(category)}, {_quote(kw.lower())})")
+    lines = [HEADER, "delete from public.category_keywords;"]
+    if rows:
+        lines.append("insert into public.category_keywords (priority, category, keyword) values")
+        lines.append(",\n".join(rows) + ";")
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    sys.stdout.write(category_keywords_sql())
@@ -1,75 +1,70 @@
+import asyncio
+import base64
+import hmac
 import json
 import logging
 import os
-import tempfile
+from contextlib import aclosing
 from datetime import date, timedelta
 from pathlib import Path
 
 _ROOT = Path(__file__).resolve().parent.parent
 
-# Log to console; skip file logging on Vercel (read-only filesystem)
-IS_VERCEL = os.environ.get("VERCEL") == "1"
-if not IS_VERCEL:
-    LOG_DIR = _ROOT / "logs"
-    LOG_DIR.mkdir(exist_ok=True)
-    LOG_FILE = LOG_DIR / "statement_uploads.log"
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
-if not IS_VERCEL:
-    file_handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
-    logging.getLogger().addHandler(file_handler)
-logger = logging.getLogger(__name__)
-file_logger = logging.getLogger("statement_upload_file")
-if IS_VERCEL:
-    file_logger.addHandler(logging.StreamHandler())
-else:
-    file_logger.addHandler(file_handler)
-file_logger.setLevel(logging.INFO)
-file_logger.propagate = False
-
-from fastapi import FastAPI, Body, File, UploadFile, Header, HTTPException, Request
+from fastapi import FastAPI, Body, File, UploadFile, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 
-env_path = _ROOT / ".env"
-env_local = _ROOT / ".env.local"
-load_dotenv(dotenv_path=env_path)
-if env_local.exists():
-    load_dotenv(dotenv_path=env_local, override=True)
-
-print("--- SYSTEM CHECK ---")
-print(f"Looking for .env at: {env_path}")
-print(f"File exists? {env_path.exists()}")
-print(f"Client ID loaded: {os.getenv('PLAID_CLIENT_ID') is not None}")
-print("--------------------")
-
-import plaid
-from plaid.api import plaid_api
-from plaid.model.link_token_create_request import LinkTokenCreateRequest
-from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
-from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
-from plaid.model.products import Products
-from plaid.model.country_code import CountryCode
-from plaid.model.transactions_get_request import TransactionsGetRequest
-
-import jwt
-
-from .analysis import analyze_transactions
-from .pdf_parser import parse_statement
-try:
-    from .supabase_client import supabase
-except ImportError:
-    supabase = None
-
-load_dotenv()
+# Load .env, then .env.local on top, before the modules below read their configuration
+load_dotenv(dotenv_path=_ROOT / ".env")
+if (_ROOT / ".env.local").exists():
+    load_dotenv(dotenv_path=_ROOT / ".env.local", override=True)
+
+from .logging_setup import (
+    IS_VERCEL,
+    UPLOAD_LOG_DETAIL,
+    UPLOAD_LOG_SAMPLE_ROWS,
+    UPLOAD_LOGGER,
+    CappedJSON,
+    configure_logging,
+    sample_upload_payload,
+    shutdown_logging,
+)
+
+configure_logging(None if IS_VERCEL else _ROOT / "logs")
+logger = logging.getLogger(__name__)
+file_logger = logging.getLogger(UPLOAD_LOGGER)
+
+# The PDF stack (pdfplumber), Plaid and Supabase are imported on first use, not here:
+# most requests need at most one of them and cold starts pay for every import
+from .analysis import (
+    analyze_parts,
+    analyze_transactions,
+    filter_transactions,
+    finalize_partial,
+    is_current_partial,
+    merge_partials,
+    newest_first,
+    partial_analysis,
+)
+from .auth import verify_token_async
+from .io_pool import run_io, shutdown_io_executor
+from .jobs import get_job_queue, get_job_runner, public_view, shutdown_job_runner, submit, valid_job_id
+from .parse_cache import get_parse_cache
+from .parse_executor import parse_upload, shutdown_parse_executor
+from .plaid_client import PLAID_TIMEOUT, get_plaid_client
+from .plaid_sync import get_transaction_store, plaid_to_common, sync_transactions
+from .responses import CompressionMiddleware, FastJSONResponse, index_ranges, json_bytes
+from .uploads import UploadError, discard, iter_spooled_uploads, spool_upload_file
+from .supabase_client import get_supabase
+from .timing import METRICS_TOKEN, TIMING_ENABLED, TimingMiddleware, metrics_text, stage, timed
+from .transactions import TransactionBatch
 
 app = FastAPI()
+app.router.on_shutdown.append(shutdown_job_runner)
+app.router.on_shutdown.append(shutdown_parse_executor)
+app.router.on_shutdown.append(shutdown_io_executor)
+app.router.on_shutdown.append(shutdown_logging)
 
 # CORS: localhost for dev, Vercel for deployed frontend (same-origin when both on Vercel)
 _cors_origins = ["http://localhost:3000", "http://127.0.0.1:3000"]
@@ -83,33 +78,24 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# gzip/brotli per Accept-Encoding; small bodies are left alone
+app.add_middleware(CompressionMiddleware)
+# Server-Timing header + /api/metrics histograms (outermost, so compression is included)
+if TIMING_ENABLED:
+    app.add_middleware(TimingMiddleware)
 
-# Configuration for Plaid
-PLAID_CLIENT_ID = os.getenv('PLAID_CLIENT_ID')
-PLAID_SECRET = os.getenv('PLAID_SECRET')
-
-# This will stop the code and tell you EXACTLY if the keys are missing
-if not PLAID_CLIENT_ID or not PLAID_SECRET:
-    print("❌ ERROR: Plaid keys not found in .env file!")
-    print(f"DEBUG -> Client ID: {PLAID_CLIENT_ID}")
-    print(f"DEBUG -> Secret: {PLAID_SECRET}")
-else:
-    print("✅ Plaid keys loaded successfully.")
-
-configuration = plaid.Configuration(
-    host=plaid.Environment.Sandbox,
-    api_key={
-        'clientId': PLAID_CLIENT_ID,
-        'secret': PLAID_SECRET,
-        'plaidVersion': '2020-09-14'
-    }
-)
-api_client = plaid.ApiClient(configuration)
-client = plaid_api.PlaidApi(api_client)
+# PLAID_TRANSACTIONS_MODE: "sync" (incremental /transactions/sync + local store) or "get" (90-day pull)
+PLAID_TRANSACTIONS_MODE = os.getenv("PLAID_TRANSACTIONS_MODE", "sync").lower()
 
 
 @app.post("/api/create_link_token")
 async def create_link_token():
+    import plaid
+    from plaid.model.country_code import CountryCode
+    from plaid.model.link_token_create_request import LinkTokenCreateRequest
+    from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
+    from plaid.model.products import Products
+
     try:
         request = LinkTokenCreateRequest(
             products=[Products('transactions')],
@@ -118,7 +104,8 @@ async def create_link_token():
             user=LinkTokenCreateRequestUser(client_user_id='unique-user-id-123'),
             client_name="Canada Wealth Dashboard"
         )
-        response = client.link_token_create(request)
+        with stage("plaid"):
+            response = await run_io(get_plaid_client().link_token_create, request, _request_timeout=PLAID_TIMEOUT)
         return response.to_dict()
     except plaid.ApiException as e:
         logger.error(f"Plaid link token error: {e}")
@@ -131,6 +118,9 @@ async def create_link_token():
 
 @app.post("/api/exchange_public_token")
 async def exchange_public_token(payload: dict = Body(...)):
+    import plaid
+    from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
+
     public_token = payload.get("public_token")
     if not public_token:
         return {"error": "No public token provided"}
@@ -139,22 +129,65 @@ async def exchange_public_token(payload: dict = Body(...)):
         exchange_request = ItemPublicTokenExchangeRequest(
             public_token=public_token
         )
-        exchange_response = client.item_public_token_exchange(exchange_request)
+        with stage("plaid"):
+            exchange_response = await run_io(
+                get_plaid_client().item_public_token_exchange, exchange_request, _request_timeout=PLAID_TIMEOUT
+            )
         access_token = exchange_response['access_token']
         item_id = exchange_response['item_id']
-        print(f"✅ Success! Access Token: {access_token}")
+        logger.info("Exchanged public token for item %s", item_id)
         return {"status": "success", "item_id": item_id, "access_token": access_token}
     except plaid.ApiException as e:
-        print(f"❌ Plaid Error: {e}")
+        logger.error("Plaid token exchange error: %s", e)
         return {"error": str(e)}
 
 
 MAX_STATEMENTS = 12
 
 
+def _log_upload(parts: list[TransactionBatch], analysis: dict) -> None:
+    """One compact summary line per upload (parts: each file's transactions, in order). Rows are
+    dumped only per UPLOAD_LOG_DETAIL and the sampling rate, capped in size and serialized by
+    the log writer thread, not here."""
+    if UPLOAD_LOG_DETAIL == "off":
+        return
+    count = sum(len(p) for p in parts)
+    logger.info(
+        "Upload: transactions=%d income=%.2f expenses=%.2f cash_flow=%.2f",
+        count,
+        analysis.get("total_income", 0),
+        analysis.get("total_expenses", 0),
+        analysis.get("cash_flow", 0),
+    )
+    if not count or not sample_upload_payload():
+        return
+    if UPLOAD_LOG_DETAIL == "full":
+        file_logger.info("Transactions (%d): %s", count, CappedJSON(TransactionBatch.concat(parts)))
+        file_logger.info("Breakdown: %s", CappedJSON({
+            k: analysis.get(k) for k in ("by_category", "top_merchants", "cash_flow_by_month")
+        }))
+    else:
+        sample, need = [], UPLOAD_LOG_SAMPLE_ROWS
+        for p in parts:
+            if need <= 0:
+                break
+            sample.append(p[:need])
+            need -= len(sample[-1])
+        file_logger.info(
+            "First %d of %d transactions: %s",
+            min(UPLOAD_LOG_SAMPLE_ROWS, count),
+            count,
+            CappedJSON(TransactionBatch.concat(sample)),
+        )
+
+
 @app.post("/api/upload_statement")
-async def upload_statement(request: Request):
-    """Accept 1–12 PDF bank statements, parse and return combined transactions."""
+async def upload_statement(request: Request, dedupe: bool = False, job: bool = False):
+    """Accept 1–12 PDF bank statements, parse and return combined transactions.
+    dedupe=true: files[] carry transactions_range ([start, end) into transactions) instead
+    of repeating each file's rows.
+    job=true: queue the statements and answer 202 {job_id, status_url} right away; poll
+    GET /api/jobs/{job_id} for progress and the result."""
     logger.info("=== UPLOAD STATEMENT(S) ===")
     form = await request.form()
     statements = form.getlist("statements") or form.getlist("statement")
@@ -165,59 +198,183 @@ async def upload_statement(request: Request):
     if len(statements) > MAX_STATEMENTS:
         return {"error": f"Maximum {MAX_STATEMENTS} statements allowed"}
 
-    all_transactions = []
-    files_breakdown = []
+    filenames = []
     for idx, stmt in enumerate(statements):
         fname = stmt.filename or f"file_{idx}"
         if not fname.lower().endswith(".pdf"):
             logger.warning("Rejected: %s is not a PDF", fname)
             return {"error": f"Only PDF files accepted. '{fname}' is not a PDF."}
-        logger.info("Processing: %s", fname)
-        try:
-            content = await stmt.read()
-            logger.info("Received %d bytes", len(content))
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                tmp.write(content)
-                tmp_path = tmp.name
+        filenames.append(fname)
+
+    # Spool each upload to disk in chunks, then resolve all of them concurrently:
+    # repeat uploads come from the parse cache, the rest are parsed on the worker pool
+    cache = get_parse_cache()
+    spools = []
+    try:
+        for idx, (fname, stmt) in enumerate(zip(filenames, statements)):
+            logger.info("Processing: %s", fname)
             try:
-                transactions = parse_statement(tmp_path)
-            finally:
-                Path(tmp_path).unlink(missing_ok=True)
-            logger.info("Parsed %d transactions from %s", len(transactions), fname)
-            all_transactions.extend(transactions)
-            files_breakdown.append({"filename": fname, "transactions": transactions})
-        except Exception as e:
-            logger.exception("Failed to parse %s: %s", fname, e)
-            return {"error": f"Failed to parse '{fname}': {str(e)}"}
-
-    transactions = all_transactions
-    logger.info("Total transactions across all statements: %d", len(transactions))
-    if transactions:
-        logger.info("First 10 transactions: %s", json.dumps(transactions[:10], indent=2, default=str))
-        if len(transactions) > 10:
-            logger.info("... and %d more", len(transactions) - 10)
-        file_logger.info("All transactions:\n%s", json.dumps(transactions, indent=2, default=str))
-
-    analysis = analyze_transactions(transactions)
-    logger.info(
-        "Analysis: income=%.2f expenses=%.2f cash_flow=%.2f",
-        analysis.get("total_income", 0),
-        analysis.get("total_expenses", 0),
-        analysis.get("cash_flow", 0),
+                spool = await spool_upload_file(stmt, idx)
+            except Exception as e:
+                logger.exception("Failed to read %s: %s", fname, e)
+                return {"error": f"Failed to parse '{fname}': {str(e)}"}
+            logger.info("Received %d bytes", spool["size"])
+            spools.append(spool)
+        if job:
+            return await _queue_upload(spools, dedupe)
+        results = await asyncio.gather(*(parse_upload(sp, cache) for sp in spools), return_exceptions=True)
+    finally:
+        for sp in spools:
+            discard(sp)
+
+    files_breakdown = []
+    for fname, result in zip(filenames, results):
+        if isinstance(result, BaseException):
+            logger.error("Failed to parse %s: %s", fname, result, exc_info=result)
+            return {"error": f"Failed to parse '{fname}': {str(result)}"}
+        logger.info("Parsed %d transactions from %s", len(result), fname)
+        files_breakdown.append({"filename": fname, "transactions": result})
+
+    parts = [f["transactions"] for f in files_breakdown]
+    analysis = analyze_parts(parts)
+    _log_upload(parts, analysis)
+    transactions = TransactionBatch.concat(parts)
+
+    if dedupe:
+        index_ranges(files_breakdown)
+    return FastJSONResponse({"transactions": transactions, "analysis": analysis, "source": "pdf", "files": files_breakdown})
+
+
+async def _queue_upload(spools: list, dedupe: bool) -> FastJSONResponse:
+    queued = await run_io(submit, get_job_queue(), spools, dedupe)
+    runner = get_job_runner()
+    if runner is not None:
+        runner.notify()
+    logger.info("Queued job %s (%d files)", queued["id"], len(spools))
+    status_url = f"/api/jobs/{queued['id']}"
+    return FastJSONResponse(
+        {"job_id": queued["id"], "status": queued["status"], "status_url": status_url},
+        status_code=202,
+        headers={"Location": status_url},
     )
-    file_logger.info(
-        "Analysis: income=%.2f expenses=%.2f cash_flow=%.2f\nBy category: %s\nTop merchants: %s\nCash flow by month: %s",
-        analysis.get("total_income", 0),
-        analysis.get("total_expenses", 0),
-        analysis.get("cash_flow", 0),
-        json.dumps(analysis.get("by_category", {}), indent=2),
-        json.dumps(analysis.get("top_merchants", []), indent=2),
-        json.dumps(analysis.get("cash_flow_by_month", {}), indent=2),
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of a queued upload: per-file progress, then the upload result once done."""
+    record = await run_io(get_job_queue().get, job_id) if valid_job_id(job_id) else None
+    if record is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return FastJSONResponse(public_view(record))
+
+
+def _ndjson(record: dict) -> bytes:
+    return json_bytes(record) + b"\n"
+
+
+async def _stream_file_record(spool: dict, cache) -> dict:
+    """Parse one spooled upload into its NDJSON record ({type: file, ...transactions | error})."""
+    fname = spool["filename"]
+    record = {"type": "file", "index": spool["index"], "filename": fname}
+    try:
+        record["transactions"] = await parse_upload(spool, cache)
+        logger.info("Parsed %d transactions from %s", len(record["transactions"]), fname)
+    except Exception as e:
+        logger.exception("Failed to parse %s: %s", fname, e)
+        record["error"] = f"Failed to parse '{fname}': {str(e)}"
+    finally:
+        discard(spool)
+    return record
+
+
+@app.post("/api/upload_statement/stream")
+async def upload_statement_stream(request: Request):
+    """Streaming variant of upload_statement. Files are spooled to disk as the body arrives and
+    parsing starts as soon as each one is complete. Responds with NDJSON: one {type: file} record
+    per statement in completion order, then a {type: summary} record with the combined analysis.
+    Like upload_statement, a non-PDF or too many files rejects the whole upload: the response is
+    then a single {type: error} record."""
+    logger.info("=== UPLOAD STATEMENT(S) (stream) ===")
+    cache = get_parse_cache()
+    spools = []
+    tasks = []
+    error = None
+
+    def cleanup():
+        for task in tasks:
+            task.cancel()
+        for sp in spools:
+            discard(sp)
+
+    try:
+        # aclosing: stopping early still deletes the parts spooled after this one right away
+        async with aclosing(iter_spooled_uploads(request)) as uploads:
+            async for spool in uploads:
+                spools.append(spool)
+                if len(spools) > MAX_STATEMENTS:
+                    error = f"Maximum {MAX_STATEMENTS} statements allowed"
+                    break
+                fname = spool["filename"]
+                if not fname.lower().endswith(".pdf"):
+                    logger.warning("Rejected: %s is not a PDF", fname)
+                    error = f"Only PDF files accepted. '{fname}' is not a PDF."
+                    break
+                tasks.append(asyncio.create_task(_stream_file_record(spool, cache)))
+    except UploadError as e:
+        error = str(e)
+    except BaseException:
+        cleanup()
+        raise
+    if not error and not spools:
+        error = "At least one PDF file is required"
+    if error:
+        cleanup()
+        return StreamingResponse(iter([_ndjson({"type": "error", "error": error})]), media_type="application/x-ndjson")
+
+    async def records():
+        by_index = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                record = await next_done
+                by_index[record["index"]] = record.get("transactions") or []
+                yield _ndjson(record)
+            # Analyze in upload order so the result matches the non-streaming endpoint
+            parts = [by_index[idx] for idx in sorted(by_index)]
+            analysis = analyze_parts(parts)
+            logger.info("Streamed %d files", len(tasks))
+            _log_upload(parts, analysis)
+            yield _ndjson({
+                "type": "summary",
+                "analysis": analysis,
+                "source": "pdf",
+                "file_count": len(tasks),
+                "transaction_count": sum(len(p) for p in parts),
+            })
+        finally:
+            cleanup()
+
+    return StreamingResponse(
+        records(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    logger.info("=== END UPLOAD ===")
-    file_logger.info("=== END UPLOAD ===")
 
-    return {"transactions": transactions, "analysis": analysis, "source": "pdf", "files": files_breakdown}
+
+@app.get("/api/parse_cache/stats")
+async def parse_cache_stats():
+    """Hit/miss counters for the content-addressed parse cache."""
+    return get_parse_cache().stats()
+
+
+@app.get("/api/metrics")
+async def metrics(authorization: str = Header(None, alias="Authorization")):
+    """Request, stage and parse histograms for this process, in Prometheus text format.
+    Only served when METRICS_TOKEN is set, to callers sending it as a bearer token."""
+    if not TIMING_ENABLED or not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    if not hmac.compare_digest((authorization or "").encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics_text(), media_type="text/plain; version=0.0.4")
 
 
 @app.post("/api/analyze_transactions")
@@ -230,81 +387,57 @@ async def analyze_transactions_endpoint(payload: dict = Body(...)):
     return result
 
 
-def _plaid_to_common(txn: dict) -> dict:
-    """Convert Plaid transaction to common format. Plaid: + = outflow, - = inflow."""
-    amount = float(txn.get("amount", 0))
-    normalized_amount = -amount
-    cat = None
-    if "personal_finance_category" in txn and txn["personal_finance_category"]:
-        pfc = txn["personal_finance_category"]
-        if isinstance(pfc, dict):
-            cat = pfc.get("primary") or pfc.get("detailed")
-        elif isinstance(pfc, str):
-            cat = pfc
-    return {
-        "date": txn.get("date"),
-        "description": txn.get("name") or txn.get("merchant_name") or "Unknown",
-        "amount": round(normalized_amount, 2),
-        "category": cat,
-    }
-
-
 @app.post("/api/transactions")
 async def get_plaid_transactions(payload: dict = Body(...)):
-    """Fetch transactions from Plaid using access_token. Returns normalized transactions + analysis."""
+    """Transactions for an access_token, normalized + analysis. In sync mode only the changes since
+    the item's last cursor are fetched and the response is read from the local store."""
+    import plaid
+
     access_token = payload.get("access_token")
     if not access_token:
         return {"error": "access_token required"}
-    end = date.today()
-    start = end - timedelta(days=90)
     try:
-        req = TransactionsGetRequest(
-            access_token=access_token,
-            start_date=start,
-            end_date=end,
-        )
-        resp = client.transactions_get(req)
-        raw = resp.to_dict() if hasattr(resp, "to_dict") else dict(resp)
-        plaid_txns = raw.get("transactions", [])
-        transactions = [_plaid_to_common(t) for t in plaid_txns]
+        client = get_plaid_client()
+        if PLAID_TRANSACTIONS_MODE == "sync":
+            with stage("plaid"):
+                synced = await run_io(
+                    sync_transactions, client, access_token, get_transaction_store(), timeout=PLAID_TIMEOUT
+                )
+            transactions = synced["transactions"]
+        else:
+            from plaid.model.transactions_get_request import TransactionsGetRequest
+
+            end = date.today()
+            start = end - timedelta(days=90)
+            req = TransactionsGetRequest(
+                access_token=access_token,
+                start_date=start,
+                end_date=end,
+            )
+            with stage("plaid"):
+                resp = await run_io(client.transactions_get, req, _request_timeout=PLAID_TIMEOUT)
+            raw = resp.to_dict() if hasattr(resp, "to_dict") else dict(resp)
+            plaid_txns = raw.get("transactions", [])
+            transactions = TransactionBatch.from_dicts(plaid_to_common(t) for t in plaid_txns)
         analysis = analyze_transactions(transactions)
-        return {"transactions": transactions, "analysis": analysis, "source": "plaid"}
+        return FastJSONResponse({"transactions": transactions, "analysis": analysis, "source": "plaid"})
     except plaid.ApiException as e:
         return {"error": str(e)}
+    except Exception as e:
+        logger.error(f"Plaid transactions error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch transactions. Ensure the backend is configured with valid Plaid credentials.")
 
 
-def _get_user_from_token(authorization: str = None):
+async def _get_user_from_token(authorization: str = None):
     """Extract and verify Supabase JWT, return user_id. Supports both JWKS (ES256/RS256) and legacy HS256."""
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
     token = authorization.split(" ")[1]
-    supabase_url = os.getenv("SUPABASE_URL")
-    jwks_url = f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json" if supabase_url else None
-
-    try:
-        if jwks_url:
-            jwks_client = jwt.PyJWKClient(jwks_url)
-            signing_key = jwks_client.get_signing_key_from_jwt(token)
-            payload = jwt.decode(
-                token,
-                signing_key.key,
-                algorithms=["RS256", "ES256"],
-                audience="authenticated",
-                options={"verify_exp": True},
-            )
-            return payload.get("sub")
-    except Exception:
-        pass
-
-    secret = os.getenv("SUPABASE_JWT_SECRET")
-    if secret:
-        try:
-            payload = jwt.decode(token, secret, algorithms=["HS256"], audience="authenticated")
-            return payload.get("sub")
-        except jwt.InvalidTokenError:
-            pass
-
-    raise HTTPException(status_code=401, detail="Invalid token")
+    with stage("auth"):
+        user_id = await verify_token_async(token)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return user_id
 
 
 @app.post("/api/save_analysis")
@@ -313,48 +446,265 @@ async def save_analysis(
     authorization: str = Header(None, alias="Authorization"),
 ):
     """Save analysis to Supabase. Requires Bearer token from Supabase Auth."""
-    user_id = _get_user_from_token(authorization)
+    user_id = await _get_user_from_token(authorization)
+    supabase = get_supabase()
     if not supabase:
         raise HTTPException(status_code=500, detail="Database not configured")
     source = payload.get("source", "pdf")
     summary = payload.get("summary", {})
     access_token = payload.get("access_token")
     try:
-        supabase.table("analyses").insert({
-            "user_id": user_id,
-            "source": source,
-            "summary": summary,
-        }).execute()
+        writes = [
+            supabase.table("analyses").insert({
+                "user_id": user_id,
+                "source": source,
+                "summary": summary,
+            })
+        ]
         if access_token:
             item_id = payload.get("item_id") or "unknown"
-            supabase.table("plaid_items").upsert({
+            writes.append(supabase.table("plaid_items").upsert({
                 "user_id": user_id,
                 "access_token": access_token,
                 "item_id": item_id,
-            }, on_conflict="user_id").execute()
+            }, on_conflict="user_id"))
+        # Independent writes: issue them concurrently
+        with stage("supabase"):
+            await asyncio.gather(*(run_io(w.execute) for w in writes))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     return {"status": "saved"}
 
 
+# ANALYSIS_BACKEND: "python" (merge per-statement partials) or "sql" (analyze_user_transactions RPC)
+ANALYSIS_BACKEND = os.getenv("ANALYSIS_BACKEND", "python").lower()
+
+
+# Columns for statement metadata (no transactions array)
+STATEMENT_METADATA_COLUMNS = "id, user_id, filename, created_at, analysis_partial"
+USER_DATA_MAX_PAGE = 1000
+# Statement rows fetched per request when their transactions are loaded. Each page is compacted
+# into TransactionBatches before the next is fetched, so only one page of decoded JSON is held.
+STATEMENT_FETCH_PAGE = int(os.getenv("STATEMENT_FETCH_PAGE") or 25)
+
+
+def _compact_statement(s: dict) -> dict:
+    txns = s.get("transactions")
+    if isinstance(txns, list):
+        s["transactions"] = TransactionBatch.from_dicts(txns)
+    return s
+
+
+def _statement_transactions(s: dict) -> TransactionBatch:
+    """A statement row's transactions, fetched separately if the row was loaded without them."""
+    if "transactions" not in s:
+        resp = get_supabase().table("user_statements").select("transactions").eq("id", s["id"]).execute()
+        rows = resp.data or []
+        return _statement_transactions(rows[0]) if rows else TransactionBatch()
+    txns = _compact_statement(s)["transactions"]
+    return txns if isinstance(txns, TransactionBatch) else TransactionBatch()
+
+
+def _statement_partials(statements: list, recompute: bool = False) -> list:
+    """Per-statement partial aggregates. Missing or stale partials (e.g. after a categorizer
+    change), or all of them when recompute=True, are rebuilt from the row's transactions
+    and written back. Also sets each row's transaction_count."""
+    partials = []
+    for s in statements:
+        partial = s.pop("analysis_partial", None)
+        if recompute or not is_current_partial(partial):
+            partial = partial_analysis(_statement_transactions(s))
+            try:
+                get_supabase().table("user_statements").update({"analysis_partial": partial}).eq("id", s["id"]).execute()
+            except Exception as e:
+                logger.warning("Could not store analysis partial for statement %s: %s", s.get("id"), e)
+        s["transaction_count"] = partial["count"]
+        partials.append(partial)
+    return partials
+
+
+def _flatten_transactions(statements: list) -> TransactionBatch:
+    return TransactionBatch.concat(
+        s["transactions"] for s in statements if isinstance(s.get("transactions"), (list, TransactionBatch))
+    )
+
+
+def _with_transactions(result: dict, statements: list, dedupe: bool = False) -> dict:
+    """Add the flattened transactions; with dedupe, statements keep only their index range."""
+    result["transactions"] = _flatten_transactions(statements)
+    if dedupe:
+        index_ranges(statements)
+    return result
+
+
+def _sql_analysis(user_id: str, date_from: date | None = None, date_to: date | None = None,
+                  category: str | None = None) -> dict:
+    """analyze_transactions-shaped result aggregated in Postgres over the transactions table."""
+    params = {"p_user_id": user_id}
+    if date_from:
+        params["p_from"] = date_from.isoformat()
+    if date_to:
+        params["p_to"] = date_to.isoformat()
+    if category:
+        params["p_category"] = category
+    resp = get_supabase().rpc("analyze_user_transactions", params).execute()
+    return resp.data
+
+
+def _fetch_user_statements(user_id: str, recompute: bool, columns: str) -> tuple[list, list]:
+    def query():
+        return get_supabase().table("user_statements").select(columns).eq("user_id", user_id).order("created_at", desc=False)
+
+    if columns == STATEMENT_METADATA_COLUMNS:
+        statements = query().execute().data or []
+    else:
+        statements = []
+        while True:
+            start = len(statements)
+            resp = query().order("id").range(start, start + STATEMENT_FETCH_PAGE - 1).execute()
+            page = resp.data or []
+            statements.extend(_compact_statement(s) for s in page)
+            if len(page) < STATEMENT_FETCH_PAGE:
+                break
+    return statements, _statement_partials(statements, recompute)
+
+
+async def _load_user_statements(user_id: str, recompute: bool = False, columns: str = "*",
+                                analyze: bool = True) -> tuple[list, dict | None]:
+    """User's statements (oldest first) and their analysis: merged from per-statement
+    partials, or aggregated in Postgres when ANALYSIS_BACKEND=sql. analyze=False skips it."""
+    if analyze and ANALYSIS_BACKEND == "sql" and not recompute:
+        # The RPC does not need the statement rows; run both queries at once
+        with stage("supabase"):
+            (statements, _), analysis = await asyncio.gather(
+                run_io(_fetch_user_statements, user_id, recompute, columns),
+                run_io(_sql_analysis, user_id),
+            )
+        return statements, analysis
+    with stage("supabase"):
+        statements, partials = await run_io(_fetch_user_statements, user_id, recompute, columns)
+    if not analyze:
+        return statements, None
+    return statements, finalize_partial(merge_partials(partials))
+
+
+def _encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode()).decode()
+
+
+def _decode_cursor(cursor: str | None) -> int:
+    if not cursor:
+        return 0
+    try:
+        offset = int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["offset"])
+    except (ValueError, KeyError, TypeError, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+
+def _sql_transaction_page(user_id: str, offset: int, limit: int, date_from: date | None,
+                          date_to: date | None, category: str | None) -> list:
+    """Newest-first page from the transactions table, in the common transaction format."""
+    query = (
+        get_supabase().table("transactions")
+        .select("statement_id, date, date_raw, description, amount, category")
+        .eq("user_id", user_id)
+    )
+    if date_from:
+        query = query.gte("date", date_from.isoformat())
+    if date_to:
+        query = query.lte("date", date_to.isoformat())
+    if category:
+        query = query.eq("category", category)
+    resp = query.order("date", desc=True, nullsfirst=False).order("id", desc=True).range(offset, offset + limit - 1).execute()
+    return [
+        {
+            "date": r.get("date_raw") or r.get("date"),
+            "description": r.get("description"),
+            "amount": float(r.get("amount") or 0),
+            "category": r.get("category"),
+            "statement_id": r.get("statement_id"),
+        }
+        for r in resp.data or []
+    ]
+
+
 @app.get("/api/user_data")
-async def get_user_data(authorization: str = Header(None, alias="Authorization")):
-    """Fetch user's saved statements and computed analysis. Requires Bearer token."""
-    user_id = _get_user_from_token(authorization)
-    if not supabase:
+async def get_user_data(
+    authorization: str = Header(None, alias="Authorization"),
+    date_from: date | None = None,
+    date_to: date | None = None,
+    category: str | None = None,
+    limit: int | None = Query(None, ge=1, le=USER_DATA_MAX_PAGE),
+    cursor: str | None = None,
+    include_transactions: bool = True,
+    dedupe: bool = False,
+):
+    """Fetch user's saved statements and computed analysis. Requires Bearer token.
+
+    Optional: date_from/date_to (YYYY-MM-DD) and category narrow the transactions and the
+    analysis to that window. limit pages the flattened transactions newest first; pass the
+    returned next_cursor to get the following page. include_transactions=false returns
+    statement metadata (with transaction_count) without the per-statement arrays.
+    dedupe=true (unfiltered, unpaged): statements carry transactions_range into the
+    top-level transactions instead of their own copy.
+    """
+    user_id = await _get_user_from_token(authorization)
+    if not get_supabase():
         raise HTTPException(status_code=500, detail="Database not configured")
+    filtered = bool(date_from or date_to or category)
+    paged = limit is not None
+    offset = _decode_cursor(cursor)
+    use_sql = ANALYSIS_BACKEND == "sql"
+    # Transactions arrays are only needed when returned, or to filter/page in Python
+    need_rows = include_transactions or (not use_sql and (filtered or paged))
     try:
-        resp = supabase.table("user_statements").select("*").eq("user_id", user_id).order("created_at", desc=False).execute()
-        statements = resp.data or []
-        all_transactions = []
-        for s in statements:
-            txns = s.get("transactions") or []
-            if isinstance(txns, list):
-                all_transactions.extend(txns)
+        # In SQL mode the filtered aggregate and the page don't depend on the statement rows
+        sql_queries = {}
+        if use_sql and filtered:
+            sql_queries["analysis"] = timed("supabase", run_io(_sql_analysis, user_id, date_from, date_to, category))
+        if use_sql and paged:
+            sql_queries["page"] = timed("supabase", run_io(_sql_transaction_page, user_id, offset, limit, date_from, date_to, category))
+        (statements, analysis), *sql_results = await asyncio.gather(
+            _load_user_statements(user_id, columns="*" if need_rows else STATEMENT_METADATA_COLUMNS, analyze=not filtered),
+            *sql_queries.values(),
+        )
+        sql = dict(zip(sql_queries, sql_results))
+        result = {"statements": statements, "analysis": analysis, "source": "pdf"}
+        if not filtered and not paged:
+            if include_transactions:
+                _with_transactions(result, statements, dedupe)
+            return FastJSONResponse(result)
+
+        if use_sql:
+            if filtered:
+                result["analysis"] = sql["analysis"]
+            if paged:
+                page = sql["page"]
+        else:
+            # Filtered statement by statement; only the matching rows are concatenated
+            parts = [
+                filter_transactions(s["transactions"], date_from, date_to, category)
+                for s in statements if isinstance(s.get("transactions"), (list, TransactionBatch))
+            ]
+            if filtered:
+                result["analysis"] = analyze_parts(parts)
+            window = TransactionBatch.concat(parts)
+            if paged:
+                page = newest_first(window)[offset:offset + limit]
             else:
-                all_transactions.extend(txns) if hasattr(txns, "__iter__") else []
-        analysis = analyze_transactions(all_transactions)
-        return {"statements": statements, "transactions": all_transactions, "analysis": analysis, "source": "pdf"}
+                result["transactions"] = window
+        if paged:
+            result["transactions"] = page
+            result["next_cursor"] = _encode_cursor(offset + limit) if len(page) == limit else None
+        if not include_transactions:
+            for s in statements:
+                s.pop("transactions", None)
+        return FastJSONResponse(result)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -365,7 +715,8 @@ async def save_statements(
     authorization: str = Header(None, alias="Authorization"),
 ):
     """Save uploaded statement(s) to Supabase. Each PDF = one row with filename + transactions."""
-    user_id = _get_user_from_token(authorization)
+    user_id = await _get_user_from_token(authorization)
+    supabase = get_supabase()
     if not supabase:
         raise HTTPException(status_code=500, detail="Database not configured")
     items = payload.get("statements", [])
@@ -378,54 +729,49 @@ async def save_statements(
             txns = item.get("transactions") or []
             if not isinstance(txns, list):
                 txns = []
-            rows.append({"user_id": user_id, "filename": fn, "transactions": txns})
-        supabase.table("user_statements").insert(rows).execute()
-        all_transactions = []
-        for r in rows:
-            all_transactions.extend(r["transactions"])
-        analysis = analyze_transactions(all_transactions)
-        return {"status": "saved", "analysis": analysis, "transactions": all_transactions}
+            rows.append({
+                "user_id": user_id,
+                "filename": fn,
+                "transactions": txns,
+                "analysis_partial": partial_analysis(txns),
+            })
+        with stage("supabase"):
+            # The transactions table is filled from these rows by a trigger, in the same transaction
+            await run_io(supabase.table("user_statements").insert(rows).execute)
+        all_transactions = _flatten_transactions(rows)
+        analysis = finalize_partial(merge_partials([r["analysis_partial"] for r in rows]))
+        return FastJSONResponse({"status": "saved", "analysis": analysis, "transactions": all_transactions})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.delete("/api/statements/{statement_id}")
-async def delete_statement(statement_id: str, authorization: str = Header(None, alias="Authorization")):
-    """Delete a statement by id. Recompute and return updated analysis."""
-    user_id = _get_user_from_token(authorization)
+async def delete_statement(statement_id: str, authorization: str = Header(None, alias="Authorization"),
+                           dedupe: bool = False):
+    """Delete a statement by id. Recompute and return updated analysis (dedupe as in user_data)."""
+    user_id = await _get_user_from_token(authorization)
+    supabase = get_supabase()
     if not supabase:
         raise HTTPException(status_code=500, detail="Database not configured")
     try:
-        supabase.table("user_statements").delete().eq("id", statement_id).eq("user_id", user_id).execute()
-        resp = supabase.table("user_statements").select("*").eq("user_id", user_id).order("created_at", desc=False).execute()
-        statements = resp.data or []
-        all_transactions = []
-        for s in statements:
-            txns = s.get("transactions") or []
-            if isinstance(txns, list):
-                all_transactions.extend(txns)
-        analysis = analyze_transactions(all_transactions)
-        return {"statements": statements, "transactions": all_transactions, "analysis": analysis}
+        with stage("supabase"):
+            await run_io(supabase.table("user_statements").delete().eq("id", statement_id).eq("user_id", user_id).execute)
+        statements, analysis = await _load_user_statements(user_id)
+        return FastJSONResponse(_with_transactions({"statements": statements, "analysis": analysis}, statements, dedupe))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/rerun_analysis")
-async def rerun_analysis(authorization: str = Header(None, alias="Authorization")):
-    """Recompute analysis from all saved statements (no changes to statements)."""
-    user_id = _get_user_from_token(authorization)
-    if not supabase:
+async def rerun_analysis(authorization: str = Header(None, alias="Authorization"), dedupe: bool = False):
+    """Recompute analysis from all saved statements (no changes to statements).
+    Rebuilds every stored per-statement partial from its transactions (dedupe as in user_data)."""
+    user_id = await _get_user_from_token(authorization)
+    if not get_supabase():
         raise HTTPException(status_code=500, detail="Database not configured")
     try:
-        resp = supabase.table("user_statements").select("*").eq("user_id", user_id).order("created_at", desc=False).execute()
-        statements = resp.data or []
-        all_transactions = []
-        for s in statements:
-            txns = s.get("transactions") or []
-            if isinstance(txns, list):
-                all_transactions.extend(txns)
-        analysis = analyze_transactions(all_transactions)
-        return {"statements": statements, "transactions": all_transactions, "analysis": analysis}
+        statements, analysis = await _load_user_statements(user_id, recompute=True)
+        return FastJSONResponse(_with_transactions({"statements": statements, "analysis": analysis}, statements, dedupe))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,40 @@
+"""
+Bounded thread pool for blocking upstream I/O (Plaid SDK, supabase-py).
+Handlers await these calls instead of running them on the event loop, so one slow
+upstream request no longer stalls every other request on the worker.
+"""
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# IO_WORKERS: concurrent upstream calls per worker process (also sizes the HTTP connection pools)
+IO_WORKERS = int(os.getenv("IO_WORKERS") or 32)
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Return the shared I/O pool, created on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+    return _executor
+
+
+def shutdown_io_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run_io(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking call on the I/O pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), functools.partial(func, *args, **kwargs))
+
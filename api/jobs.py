@@ -0,0 +1,489 @@
+"""
+Background parse jobs. In job mode an upload is persisted, answered with 202 and a job id,
+and parsed + analyzed by a worker that records progress per file; GET /api/jobs/{id}
+returns the status and, once done, the same body the synchronous upload returns.
+
+The queue lives in SQLite (default) or plain files under JOB_DIR. Jobs run either on
+background tasks in the API process (JOB_RUNNER=local) or in separate worker processes
+(`python -m api.worker`, JOB_RUNNER=external) sharing the same JOB_DIR. On serverless
+hosts, where nothing runs after the response, use external workers.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any
+
+from .io_pool import run_io
+from .transactions import TransactionBatch, json_default
+
+logger = logging.getLogger(__name__)
+
+# JOB_BACKEND: "sqlite" or "dir"
+# JOB_DIR: queue database/files and the uploads waiting to be parsed
+# JOB_RUNNER: "local" (API process runs jobs) or "external" (only api.worker processes do)
+# JOB_WORKERS: jobs run at once per runner (each job parses its files concurrently)
+# JOB_TTL_SECONDS: finished jobs are deleted after this long
+JOB_BACKEND = os.getenv("JOB_BACKEND", "sqlite").lower()
+JOB_DIR = os.getenv("JOB_DIR") or str(Path(tempfile.gettempdir()) / "twoloonies-jobs")
+JOB_RUNNER = os.getenv("JOB_RUNNER", "local").lower()
+JOB_WORKERS = int(os.getenv("JOB_WORKERS") or 2)
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS") or 24 * 3600)
+# A running job not updated for this long is assumed orphaned (its worker died) and requeued
+JOB_STALE_SECONDS = 15 * 60
+# Workers refresh their running jobs this often, however long a single file takes to parse
+JOB_HEARTBEAT_SECONDS = 60
+JOB_MAX_ATTEMPTS = 2
+# Idle runners look for new jobs this often (local submissions wake them immediately)
+JOB_POLL_SECONDS = 2.0
+PURGE_INTERVAL_SECONDS = 600
+
+FINISHED = ("done", "failed")
+
+
+def new_job(spools: list[dict], dedupe: bool = False) -> dict[str, Any]:
+    """Job record for spooled uploads; the spool files still have to be moved in (see submit)."""
+    now = time.time()
+    return {
+        "id": uuid.uuid4().hex,
+        "status": "queued",
+        "created_at": now,
+        "updated_at": now,
+        "attempts": 0,
+        "dedupe": dedupe,
+        "files": [
+            {"index": sp["index"], "filename": sp["filename"], "size": sp["size"], "sha256": sp["sha256"],
+             "path": sp["path"], "status": "queued"}
+            for sp in spools
+        ],
+        "result": None,
+        "error": None,
+    }
+
+
+def valid_job_id(job_id: str) -> bool:
+    """uuid4 hex, as new_job makes them; anything else never reaches a backend (or a path)."""
+    return len(job_id) == 32 and all(c in "0123456789abcdef" for c in job_id)
+
+
+def public_view(job: dict) -> dict[str, Any]:
+    """Job as returned by GET /api/jobs/{id}: no storage paths, per-file progress counts."""
+    files = [{k: v for k, v in f.items() if k not in ("path", "sha256")} for f in job["files"]]
+    view = {k: job[k] for k in ("id", "status", "created_at", "updated_at", "error")}
+    view["progress"] = {"done": sum(f["status"] in FINISHED for f in files), "total": len(files)}
+    view["files"] = files
+    if job["status"] == "done":
+        view["result"] = job["result"]
+    return view
+
+
+class SQLiteQueue:
+    """Jobs in one SQLite table; the record is JSON, status and timestamps are columns for claiming."""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.path = self.root / "jobs.sqlite3"
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL, record TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per call: calls come from any I/O pool thread, and from other processes
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def create(self, job: dict) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute("INSERT INTO jobs VALUES (?, ?, ?, ?, ?)",
+                         (job["id"], job["status"], job["created_at"], job["updated_at"], json.dumps(job, default=json_default)))
+
+    def get(self, job_id: str) -> dict | None:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT record FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, job: dict) -> bool:
+        """Write the record if its claim still holds; False once another worker has claimed it."""
+        job["updated_at"] = time.time()
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, record = ? "
+                "WHERE id = ? AND json_extract(record, '$.claim') IS ?",
+                (job["status"], job["updated_at"], json.dumps(job, default=json_default), job["id"], job.get("claim")),
+            )
+            return cur.rowcount == 1
+
+    def heartbeat(self, job: dict) -> bool:
+        """Keep a running job from going stale; False once another worker has claimed it."""
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = 'running' "
+                "AND json_extract(record, '$.claim') IS ?",
+                (time.time(), job["id"], job.get("claim")),
+            )
+            return cur.rowcount == 1
+
+    def claim(self) -> dict | None:
+        """Oldest queued (or orphaned) job, marked running; None when there is none."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT record FROM jobs WHERE status = 'queued' OR (status = 'running' AND updated_at < ?) "
+                    "ORDER BY created_at LIMIT 1", (now - JOB_STALE_SECONDS,)
+                ).fetchone()
+                job = json.loads(row[0]) if row else None
+                if job is not None:
+                    _mark_claimed(job, now)
+                    conn.execute("UPDATE jobs SET status = ?, updated_at = ?, record = ? WHERE id = ?",
+                                 (job["status"], now, json.dumps(job, default=json_default), job["id"]))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return job
+
+    def purge(self, max_age: float) -> int:
+        with closing(self._connect()) as conn:
+            cur = conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                               (time.time() - max_age,))
+            return cur.rowcount
+
+
+class DirectoryQueue:
+    """One JSON file per job plus a marker file per queued/running job. Claiming renames the
+    marker from queued/ to running/, which exactly one worker wins."""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.jobs = self.root / "jobs"
+        self.queued = self.root / "queued"
+        self.running = self.root / "running"
+        for d in (self.jobs, self.queued, self.running):
+            d.mkdir(parents=True, exist_ok=True)
+
+    def _write(self, job: dict) -> None:
+        # Write-then-rename so a reader never sees a partial record
+        with tempfile.NamedTemporaryFile(dir=self.jobs, delete=False, suffix=".tmp", mode="w") as tmp:
+            json.dump(job, tmp, default=json_default)
+        os.replace(tmp.name, self.jobs / f"{job['id']}.json")
+
+    def create(self, job: dict) -> None:
+        self._write(job)
+        (self.queued / f"{job['created_at']:017.6f}-{job['id']}").touch()
+
+    def get(self, job_id: str) -> dict | None:
+        try:
+            return json.loads((self.jobs / f"{job_id}.json").read_bytes())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @contextmanager
+    def _locked(self, job_id: str):
+        # Serializes claiming and claim-checked writes of one job across processes. POSIX only,
+        # imported here so the API still starts where only the SQLite queue is available
+        import fcntl
+
+        with open(self.jobs / f"{job_id}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _holds_claim(self, job: dict) -> bool:
+        stored = self.get(job["id"])
+        return (self.running / job["id"]).exists() and stored is not None and stored.get("claim") == job.get("claim")
+
+    def save(self, job: dict) -> bool:
+        """Write the record if its claim still holds; False once the job was requeued or
+        claimed by another worker."""
+        with self._locked(job["id"]):
+            if not self._holds_claim(job):
+                return False
+            job["updated_at"] = time.time()
+            self._write(job)
+            marker = self.running / job["id"]
+            if job["status"] in FINISHED:
+                marker.unlink(missing_ok=True)
+            else:
+                os.utime(marker)
+            return True
+
+    def heartbeat(self, job: dict) -> bool:
+        """Keep a running job from going stale (see _requeue_stale); False once the claim is lost."""
+        with self._locked(job["id"]):
+            if not self._holds_claim(job):
+                return False
+            os.utime(self.running / job["id"])
+            return True
+
+    def _requeue_stale(self, now: float) -> None:
+        for marker in self.running.iterdir():
+            try:
+                if marker.stat().st_mtime < now - JOB_STALE_SECONDS:
+                    os.rename(marker, self.queued / f"{0:017.6f}-{marker.name}")
+            except FileNotFoundError:
+                continue
+
+    def claim(self) -> dict | None:
+        now = time.time()
+        self._requeue_stale(now)
+        for marker in sorted(self.queued.iterdir()):
+            job_id = marker.name.rsplit("-", 1)[-1]
+            try:
+                os.rename(marker, self.running / job_id)
+            except FileNotFoundError:
+                continue  # another worker got it
+            with self._locked(job_id):
+                job = self.get(job_id)
+                if job is None or job["status"] in FINISHED:
+                    # Gone, or finished by a worker that still held its claim when it saved
+                    (self.running / job_id).unlink(missing_ok=True)
+                    continue
+                _mark_claimed(job, now)
+                self._write(job)
+                if job["status"] in FINISHED:
+                    (self.running / job_id).unlink(missing_ok=True)
+                else:
+                    os.utime(self.running / job_id)  # the marker kept its queued-at mtime
+            return job
+        return None
+
+    def purge(self, max_age: float) -> int:
+        removed = 0
+        cutoff = time.time() - max_age
+        for path in self.jobs.glob("*.json"):
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                job = json.loads(path.read_bytes())
+            except (FileNotFoundError, ValueError):
+                continue
+            if job["status"] in FINISHED:
+                path.unlink(missing_ok=True)
+                path.with_suffix(".lock").unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+def _mark_claimed(job: dict, now: float) -> None:
+    job["attempts"] += 1
+    job["updated_at"] = now
+    # Saves and heartbeats only land while this claim is current
+    job["claim"] = uuid.uuid4().hex
+    if job["attempts"] > JOB_MAX_ATTEMPTS:
+        # Its workers keep dying on it (e.g. out of memory); don't retry forever
+        job["status"] = "failed"
+        job["error"] = "Job was interrupted too many times"
+    else:
+        job["status"] = "running"
+
+
+_queue: SQLiteQueue | DirectoryQueue | None = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> SQLiteQueue | DirectoryQueue:
+    """Process-wide queue configured from the environment."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = DirectoryQueue(JOB_DIR) if JOB_BACKEND == "dir" else SQLiteQueue(JOB_DIR)
+        return _queue
+
+
+def _upload_dir(job_id: str) -> Path:
+    return Path(JOB_DIR) / "uploads" / job_id
+
+
+def submit(queue: Any, spools: list[dict], dedupe: bool = False) -> dict:
+    """Move spooled uploads into job storage and queue them. Returns the job record."""
+    job = new_job(spools, dedupe)
+    target = _upload_dir(job["id"])
+    target.mkdir(parents=True, exist_ok=True)
+    for f in job["files"]:
+        dest = target / f"{f['index']}.pdf"
+        shutil.move(f["path"], dest)
+        f["path"] = str(dest)
+    queue.create(job)
+    return job
+
+
+def _snapshot(job: dict) -> dict:
+    # Saved from an I/O thread while other files' coroutines keep updating their entries
+    return {**job, "files": [dict(f) for f in job["files"]]}
+
+
+async def run_job(queue: Any, job: dict) -> None:
+    """Parse every file of a claimed job (parse cache first, else the parse pool), then analyze
+    the combined transactions. Progress is saved as each file finishes and the job is kept
+    alive by a heartbeat; saves only land while this worker still holds the claim."""
+    from .analysis import analyze_parts
+    from .parse_cache import get_parse_cache
+    from .parse_executor import parse_upload, run_parse
+    from .responses import index_ranges
+
+    if job["status"] != "running":
+        await run_io(queue.save, job)
+        await run_io(shutil.rmtree, _upload_dir(job["id"]), True)
+        return
+    cache = get_parse_cache()
+    start = time.perf_counter()
+    heartbeat = asyncio.create_task(_heartbeat(queue, job))
+
+    async def parse_file(f: dict) -> TransactionBatch:
+        f["status"] = "running"
+        try:
+            transactions = await parse_upload(f, cache)
+        except Exception as e:
+            logger.error("Job %s: failed to parse %s: %s", job["id"], f["filename"], e, exc_info=e)
+            f["status"], f["error"] = "failed", f"Failed to parse '{f['filename']}': {str(e)}"
+            raise
+        f["status"], f["transaction_count"] = "done", len(transactions)
+        await run_io(queue.save, _snapshot(job))
+        return transactions
+
+    try:
+        results = await asyncio.gather(*(parse_file(f) for f in job["files"]), return_exceptions=True)
+        failed = next((f for f in job["files"] if f["status"] == "failed"), None)
+        if failed is not None:
+            # Same all-or-nothing outcome as the synchronous upload
+            job["status"], job["error"] = "failed", failed["error"]
+        else:
+            analysis = await run_parse(analyze_parts, results)
+            transactions = TransactionBatch.concat(results)
+            files = [{"filename": f["filename"], "transactions": r} for f, r in zip(job["files"], results)]
+            if job["dedupe"]:
+                index_ranges(files)
+            job["result"] = {"transactions": transactions, "analysis": analysis, "source": "pdf", "files": files}
+            job["status"] = "done"
+    except Exception as e:
+        logger.exception("Job %s failed: %s", job["id"], e)
+        job["status"], job["error"] = "failed", str(e)
+    finally:
+        heartbeat.cancel()
+    logger.info("Job %s %s: %d files in %.2fs", job["id"], job["status"], len(job["files"]),
+                time.perf_counter() - start)
+    if not await run_io(queue.save, job):
+        # Requeued and claimed elsewhere meanwhile: that worker owns the record and the uploads
+        logger.warning("Job %s: claim lost, result discarded", job["id"])
+        return
+    # The statements themselves are not kept once parsed
+    await run_io(shutil.rmtree, _upload_dir(job["id"]), True)
+
+
+async def _heartbeat(queue: Any, job: dict) -> None:
+    """Refresh the job every JOB_HEARTBEAT_SECONDS while it runs, so a slow parse is not
+    taken for an orphaned job and claimed by a second worker."""
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        try:
+            held = await run_io(queue.heartbeat, job)
+        except Exception as e:
+            logger.warning("Job %s: heartbeat failed: %s", job["id"], e)
+            continue
+        if not held:
+            logger.warning("Job %s: claimed by another worker", job["id"])
+            return
+
+
+class JobRunner:
+    """Tasks on the running event loop that claim and run jobs, JOB_WORKERS at a time."""
+
+    def __init__(self, queue: Any, concurrency: int = JOB_WORKERS):
+        self.queue = queue
+        self.concurrency = max(1, concurrency)
+        self._tasks: list[asyncio.Task] = []
+        self._wake: asyncio.Event | None = None
+        self._last_purge = 0.0
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._wake = asyncio.Event()
+        # In a fresh context: started from a request handler, the tasks would otherwise carry
+        # that request's stage timings along into every job
+        self._tasks = [contextvars.Context().run(asyncio.create_task, self._work())
+                       for _ in range(self.concurrency)]
+        logger.info("Job runner: %d workers on %s", self.concurrency, type(self.queue).__name__)
+
+    def notify(self) -> None:
+        """A job was queued: wake idle workers now rather than at their next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _work(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                job = await run_io(self.queue.claim)
+            except Exception as e:
+                logger.warning("Job queue claim failed: %s", e)
+                job = None
+            if job is not None:
+                await run_job(self.queue, job)
+                continue
+            await self._purge()
+            try:
+                await asyncio.wait_for(self._wake.wait(), JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _purge(self) -> None:
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            removed = await run_io(self.queue.purge, JOB_TTL_SECONDS)
+        except Exception as e:
+            logger.warning("Job purge failed: %s", e)
+            return
+        if removed:
+            logger.info("Purged %d finished jobs", removed)
+
+    async def run_forever(self) -> None:
+        self.start()
+        await asyncio.gather(*self._tasks)
+
+    async def stop(self) -> None:
+        # Jobs cut off here stay "running" and are picked up again once stale
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_runner: JobRunner | None = None
+
+
+def get_job_runner() -> JobRunner | None:
+    """The API process's runner (JOB_RUNNER=local), started on first use; else None."""
+    global _runner
+    if JOB_RUNNER != "local":
+        return None
+    if _runner is None:
+        _runner = JobRunner(get_job_queue())
+    _runner.start()
+    return _runner
+
+
+async def shutdown_job_runner() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.stop()
+        _runner = None
@@ -0,0 +1,125 @@
+"""
+Logging: records are queued and written by a background QueueListener thread, so message
+formatting and file I/O stay off the request path. Upload payload dumps are sampled and
+size-capped; how much is logged is set per environment.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from pathlib import Path
+from typing import Any
+
+from .transactions import TransactionBatch
+
+# Log to console; skip file logging on Vercel (read-only filesystem)
+IS_VERCEL = os.environ.get("VERCEL") == "1"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# UPLOAD_LOG_DETAIL: "off", "summary" (one line per upload), "sample" (+ first rows),
+# "full" (+ every row and the analysis breakdown). Production defaults to summary.
+UPLOAD_LOG_DETAIL = (os.getenv("UPLOAD_LOG_DETAIL") or ("summary" if IS_VERCEL else "sample")).lower()
+UPLOAD_LOG_SAMPLE_ROWS = int(os.getenv("UPLOAD_LOG_SAMPLE_ROWS") or 10)
+# Fraction of uploads whose rows are dumped at "sample"/"full"
+UPLOAD_LOG_SAMPLE_RATE = float(os.getenv("UPLOAD_LOG_SAMPLE_RATE") or 1.0)
+# Cap on each dumped payload
+UPLOAD_LOG_MAX_BYTES = int(os.getenv("UPLOAD_LOG_MAX_BYTES") or 64 * 1024)
+
+UPLOAD_LOGGER = "statement_upload_file"
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    """Queue the record as-is. The stock handler formats it before enqueueing (for
+    cross-process queues), which would put the formatting back on the caller's thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class CappedJSON:
+    """Log argument rendered as compact JSON only when the record is written, cut off
+    after max_bytes (lists stop serializing once the cap is reached)."""
+
+    __slots__ = ("value", "max_bytes")
+
+    def __init__(self, value: Any, max_bytes: int = UPLOAD_LOG_MAX_BYTES):
+        self.value = value
+        self.max_bytes = max_bytes
+
+    def __str__(self) -> str:
+        if not isinstance(self.value, (list, TransactionBatch)):
+            text = json.dumps(self.value, separators=(",", ":"), default=str)
+            return text if len(text) <= self.max_bytes else text[:self.max_bytes] + "...(truncated)"
+        parts, size = [], 2
+        for i, item in enumerate(self.value):
+            part = json.dumps(item, separators=(",", ":"), default=str)
+            size += len(part) + 1
+            if size > self.max_bytes:
+                parts.append(f'"...{len(self.value) - i} more"')
+                break
+            parts.append(part)
+        return "[" + ",".join(parts) + "]"
+
+
+def sample_upload_payload() -> bool:
+    """Whether this upload's rows should be dumped (detail level + sampling rate)."""
+    return UPLOAD_LOG_DETAIL in ("sample", "full") and random.random() < UPLOAD_LOG_SAMPLE_RATE
+
+
+def _handlers(log_dir: Path | None) -> list[logging.Handler]:
+    formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+    console = logging.StreamHandler()
+    console.setFormatter(formatter)
+    if log_dir is None:
+        return [console]
+    log_dir.mkdir(exist_ok=True)
+    file_handler = logging.FileHandler(log_dir / "statement_uploads.log", encoding="utf-8")
+    file_handler.setFormatter(formatter)
+    # Upload payload dumps go to the file only
+    console.addFilter(lambda record: record.name != UPLOAD_LOGGER)
+    return [console, file_handler]
+
+
+def _write_directly() -> None:
+    # Used once no listener thread drains the queue: in a forked worker (e.g. the parse
+    # pool) and after shutdown. Attach the listener's handlers to the root logger instead.
+    global _listener
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, _InProcessQueueHandler):
+            root.removeHandler(handler)
+    for handler in _listener.handlers:
+        root.addHandler(handler)
+    _listener = None
+
+
+def configure_logging(log_dir: Path | None = None) -> None:
+    """Route the root logger through a queue to console (+ log_dir file) handlers. Idempotent."""
+    global _listener
+    if _listener is not None:
+        return
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, *_handlers(log_dir), respect_handler_level=True)
+    _listener.start()
+    root = logging.getLogger()
+    root.addHandler(_InProcessQueueHandler(records))
+    root.setLevel(LOG_LEVEL)
+    logging.getLogger(UPLOAD_LOGGER).setLevel(logging.INFO)
+    atexit.register(shutdown_logging)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_write_directly)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread; later records are written directly."""
+    if _listener is not None:
+        _listener.stop()
+        _write_directly()
@@ -0,0 +1,201 @@
+"""
+Content-addressed cache of parse results, keyed by SHA-256 of the PDF bytes + PARSER_VERSION.
+Two tiers: an in-process LRU bounded by size, and an optional persistent backend
+(local directory or a Supabase table next to user_statements).
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from .parsers import PARSER_VERSION
+from .transactions import TransactionBatch, json_default
+
+logger = logging.getLogger(__name__)
+
+# PARSE_CACHE_MAX_BYTES: memory tier budget (0 disables it)
+# PARSE_CACHE_BACKEND: "" (memory only), "dir" or "supabase"
+# PARSE_CACHE_DIR: location for the "dir" backend
+PARSE_CACHE_MAX_BYTES = int(os.getenv("PARSE_CACHE_MAX_BYTES") or 64 * 1024 * 1024)
+PARSE_CACHE_BACKEND = os.getenv("PARSE_CACHE_BACKEND", "").lower()
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR") or str(Path(tempfile.gettempdir()) / "twoloonies-parse-cache")
+PARSE_CACHE_TABLE = "parse_cache"
+
+
+class DirectoryBackend:
+    """One JSON file per entry under <root>/<parser_version>/<hash[:2]>/<hash>.json."""
+
+    def __init__(self, root: str | Path, parser_version: str = PARSER_VERSION):
+        self.root = Path(root) / parser_version
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest}.json"
+
+    def get(self, digest: str) -> bytes | None:
+        try:
+            return self._path(digest).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def set(self, digest: str, payload: bytes) -> None:
+        path = self._path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial file
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False, suffix=".tmp") as tmp:
+            tmp.write(payload)
+        os.replace(tmp.name, path)
+
+
+class SupabaseBackend:
+    """Rows in public.parse_cache (content_hash, parser_version, transactions)."""
+
+    def __init__(self, client: Any, parser_version: str = PARSER_VERSION, table: str = PARSE_CACHE_TABLE):
+        self.client = client
+        self.parser_version = parser_version
+        self.table = table
+
+    def get(self, digest: str) -> bytes | None:
+        resp = (
+            self.client.table(self.table)
+            .select("transactions")
+            .eq("content_hash", digest)
+            .eq("parser_version", self.parser_version)
+            .limit(1)
+            .execute()
+        )
+        rows = resp.data or []
+        return json.dumps(rows[0]["transactions"]).encode() if rows else None
+
+    def set(self, digest: str, payload: bytes) -> None:
+        self.client.table(self.table).upsert({
+            "content_hash": digest,
+            "parser_version": self.parser_version,
+            "transactions": json.loads(payload),
+        }, on_conflict="content_hash,parser_version").execute()
+
+
+class ParseCache:
+    """LRU of encoded transaction lists with an optional persistent tier behind it."""
+
+    def __init__(self, max_bytes: int = PARSE_CACHE_MAX_BYTES, backend: Any = None,
+                 parser_version: str = PARSER_VERSION):
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.parser_version = parser_version
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.backend_errors = 0
+
+    def _key(self, digest: str) -> str:
+        return f"{self.parser_version}:{digest}"
+
+    def _count(self, counter: str) -> None:
+        # Counters share the LRU lock so concurrent parses don't lose increments
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _remember(self, key: str, payload: bytes) -> None:
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = payload
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def get(self, digest: str) -> TransactionBatch | None:
+        """Cached transactions for this content hash, or None."""
+        key = self._key(digest)
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+        if payload is None and self.backend is not None:
+            try:
+                payload = self.backend.get(digest)
+            except Exception as e:
+                self._count("backend_errors")
+                logger.warning("Parse cache backend read failed: %s", e)
+            if payload is not None:
+                self._count("persistent_hits")
+                self._remember(key, payload)
+        if payload is None:
+            self._count("misses")
+            return None
+        return TransactionBatch.from_dicts(json.loads(payload))
+
+    def set(self, digest: str, transactions: TransactionBatch) -> None:
+        payload = json.dumps(transactions, separators=(",", ":"), default=json_default).encode()
+        self._remember(self._key(digest), payload)
+        if self.backend is not None:
+            try:
+                self.backend.set(digest, payload)
+            except Exception as e:
+                self._count("backend_errors")
+                logger.warning("Parse cache backend write failed: %s", e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            memory_hits, persistent_hits, misses = self.memory_hits, self.persistent_hits, self.misses
+            entries, size, evictions = len(self._entries), self._bytes, self.evictions
+            backend_errors = self.backend_errors
+        hits = memory_hits + persistent_hits
+        lookups = hits + misses
+        return {
+            "parser_version": self.parser_version,
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "hits": hits,
+            "memory_hits": memory_hits,
+            "persistent_hits": persistent_hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "evictions": evictions,
+            "backend_errors": backend_errors,
+        }
+
+
+_cache: ParseCache | None = None
+
+
+def _create_backend() -> Any:
+    if PARSE_CACHE_BACKEND == "dir":
+        return DirectoryBackend(PARSE_CACHE_DIR)
+    if PARSE_CACHE_BACKEND == "supabase":
+        from .supabase_client import get_supabase
+        supabase = get_supabase()
+        if supabase is None:
+            logger.warning("PARSE_CACHE_BACKEND=supabase but Supabase is not configured; memory tier only")
+            return None
+        return SupabaseBackend(supabase)
+    return None
+
+
+def get_parse_cache() -> ParseCache:
+    """Process-wide cache configured from the environment."""
+    global _cache
+    if _cache is None:
+        _cache = ParseCache(PARSE_CACHE_MAX_BYTES, _create_backend())
+    return _cache
@@ -0,0 +1,83 @@
+"""
+Worker pool for CPU-heavy statement parsing.
+Keeps pdfplumber work off the event loop; one process per core by default.
+"""
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from .io_pool import run_io
+from .timing import TIMING_ENABLED, collect, record_parse, stage
+from .transactions import TransactionBatch
+
+logger = logging.getLogger(__name__)
+
+# PARSE_EXECUTOR: "process" (default), "thread", or "inline" (run in the default thread pool)
+# PARSE_WORKERS: pool size; defaults to the CPU count
+PARSE_EXECUTOR = os.getenv("PARSE_EXECUTOR", "process").lower()
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS") or 0) or (os.cpu_count() or 1)
+
+_executor: Executor | None = None
+
+
+def _create_executor() -> Executor | None:
+    if PARSE_EXECUTOR == "inline":
+        return None
+    if PARSE_EXECUTOR == "process":
+        try:
+            return ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+        except (OSError, NotImplementedError, ValueError) as e:
+            # Some serverless sandboxes have no working semaphores (/dev/shm)
+            logger.warning("Process pool unavailable (%s), using threads for parsing", e)
+    return ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix="parse")
+
+
+def get_parse_executor() -> Executor | None:
+    """Return the shared parse executor, created on first use. None = default thread pool."""
+    global _executor
+    if _executor is None and PARSE_EXECUTOR != "inline":
+        _executor = _create_executor()
+        logger.info("Parse executor: %s (%d workers)", type(_executor).__name__, PARSE_WORKERS)
+    return _executor
+
+
+def shutdown_parse_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run_parse(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a picklable, module-level function on the parse executor and await its result."""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_parse_executor(), func, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM); rebuild the pool on the next call
+        shutdown_parse_executor()
+        raise
+
+
+async def parse_upload(spool: dict, cache: Any) -> TransactionBatch:
+    """Transactions for one spooled upload ({filename, path, sha256}): parse cache first, else
+    the parse pool. Shared by the upload endpoints and the background job worker."""
+    from .pdf_parser import parse_statement
+
+    with stage("parse_cache"):
+        cached = await run_io(cache.get, spool["sha256"])
+    if cached is not None:
+        logger.info("Parse cache hit for %s", spool["filename"])
+        return cached
+    if TIMING_ENABLED:
+        # Stages run in the worker; bring its timings back into this request
+        transactions, timings = await run_parse(collect, parse_statement, spool["path"])
+        record_parse(timings)
+    else:
+        transactions = await run_parse(parse_statement, spool["path"])
+    with stage("parse_cache"):
+        await run_io(cache.set, spool["sha256"], transactions)
+    return transactions
@@ -1,6 +1,17 @@
 """
 Bank statement parsers. Template-by-template support with generic fallback.
 """
-from .registry import parse_statement
+# Bump whenever a template or the generic fallback changes its output;
+# cached parse results from older versions are then ignored.
+PARSER_VERSION = "5"
 
-__all__ = ["parse_statement"]
+__all__ = ["PARSER_VERSION", "parse_statement"]
+
+
+def __getattr__(name):
+    # parse_statement pulls in pdfplumber; import it on first use so that reading
+    # PARSER_VERSION (e.g. from the parse cache) stays cheap
+    if name == "parse_statement":
+        from .registry import parse_statement
+        return parse_statement
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,11 +2,14 @@
 Shared utilities for bank statement parsers.
 """
 import re
+from datetime import date, timedelta
+from functools import lru_cache
 from typing import Any
 
-# Regex patterns for dates and amounts
+# Regex patterns for dates and amounts. The first must not start inside a longer number,
+# or it would read "25-03-28" out of "2025-03-28".
 DATE_PATTERNS = [
-    r"(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})",
+    r"(?<!\d)(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})",
     r"(\d{4}[/\-]\d{1,2}[/\-]\d{1,2})",
     r"(\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{2,4})",
 ]
@@ -17,6 +20,22 @@ PAREN_AMOUNT_PATTERN = re.compile(r"\(\s*\$?\s*([\d,]+(?:\.\d{2})?)\s*\)")
 SIGNED_AMOUNT_PATTERN = re.compile(r"[-–—]\s*\$?\s*([\d,]+\.\d{2})")
 # Positive tx amount followed by balance: "$5.46 $5,953.73" - capture first amount
 POSITIVE_TXN_AMOUNT_PATTERN = re.compile(r"\$\s*([\d,]+\.\d{2})\s+(?=\$?[\d,])")
+# Date detection is case-sensitive; stripping dates out of descriptions is not
+DATE_REGEXES = [re.compile(p) for p in DATE_PATTERNS]
+_DATE_STRIP_REGEXES = [re.compile(p, re.I) for p in DATE_PATTERNS]
+_DIGIT = re.compile(r"\d")
+_NON_NUMERIC = re.compile(r"[^\d.-]")
+_STREET_ADDRESS = re.compile(r"\d+\s*-\s*\d+\s+\w+\s+(?:st|ave|rd|blvd)", re.I)
+
+# Amount kinds in preference order: signed (-$16.00), parenthesized, positive followed by a
+# balance ($5.46 $5,953.73), then the trailing amount. Negative for the first two.
+TEXT_AMOUNT_KINDS = (
+    ("signed", SIGNED_AMOUNT_PATTERN, True),
+    ("paren", PAREN_AMOUNT_PATTERN, True),
+    ("positive", POSITIVE_TXN_AMOUNT_PATTERN, False),
+    ("trailing", AMOUNT_PATTERN, False),
+)
+CELL_AMOUNT_KINDS = tuple(k for k in TEXT_AMOUNT_KINDS if k[0] != "positive")
 
 # Rows that look like headers/summaries, not transactions
 SKIP_DESCRIPTIONS = frozenset({
@@ -27,6 +46,140 @@ SKIP_DESCRIPTIONS = frozenset({
 })
 
 
+MONTH_NAMES = ("january", "february", "march", "april", "may", "june", "july",
+               "august", "september", "october", "november", "december")
+_ISO_DATE = re.compile(r"(\d{4})[/\-](\d{1,2})[/\-](\d{1,2})")
+_NUMERIC_DATE = re.compile(r"(\d{1,2})[/\-](\d{1,2})(?:[/\-](\d{4}|\d{2}))?")
+_DAY_MONTH_DATE = re.compile(r"(\d{1,2})(?:st|nd|rd|th)?\s+([a-z]{3,9})\.?,?(?:\s+(\d{4}|\d{2}))?", re.I)
+_MONTH_DAY_DATE = re.compile(r"([a-z]{3,9})\.?\s+(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}|\d{2}))?", re.I)
+_DATE_TOKEN = (r"(?:\d{4}[/\-]\d{1,2}[/\-]\d{1,2}|\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4}"
+               r"|[a-z]{3,9}\.?\s+\d{1,2}(?:st|nd|rd|th)?(?:,?\s+\d{4})?|\d{1,2}\s+[a-z]{3,9}\.?(?:,?\s+\d{4})?)")
+_PERIOD_RANGE = re.compile(rf"(?<![\w/-])({_DATE_TOKEN})\s*(?:-|–|—|to|through)\s*({_DATE_TOKEN})", re.I)
+_MONTH_YEAR = re.compile(r"\b([a-z]{3,9})\.?,?\s+(\d{4})\b", re.I)
+# Dates printed without a year may fall this far outside the statement period (posting lag)
+PERIOD_SLACK = timedelta(days=31)
+# Distinct (date text, period) pairs remembered by normalize_date
+DATE_MEMO_SIZE = 4096
+# Years a statement date can have; anything else is stray text that happens to look like one
+STATEMENT_YEARS = range(1900, 2101)
+
+
+def _month_number(name: str) -> int | None:
+    """1-12 for a month name or abbreviation ("Mar", "Sept", "March"), else None."""
+    name = name.lower()
+    for number, full in enumerate(MONTH_NAMES, 1):
+        if len(name) >= 3 and full.startswith(name):
+            return number
+    return None
+
+
+def _full_year(digits: str) -> int:
+    # Two-digit years as strptime's %y reads them
+    year = int(digits)
+    if len(digits) > 2:
+        return year
+    return year + (1900 if year >= 69 else 2000)
+
+
+def _in_period(d: date, period: tuple[date, date]) -> bool:
+    return period[0] - PERIOD_SLACK <= d <= period[1] + PERIOD_SLACK
+
+
+def _dated(year: int | None, month: int, day: int, period: tuple[date, date] | None) -> date | None:
+    """The date, taking the year from the period when it isn't given: the period year the date
+    falls in (or nearest to)."""
+    if year is not None:
+        if year not in STATEMENT_YEARS:
+            return None
+        try:
+            return date(year, month, day)
+        except ValueError:
+            return None
+    if period is None:
+        return None
+    candidates = []
+    for y in sorted({period[0].year, period[1].year}):
+        try:
+            candidates.append(date(y, month, day))
+        except ValueError:
+            continue
+    if not candidates:
+        return None
+    mid = period[0] + (period[1] - period[0]) / 2
+    return min(candidates, key=lambda d: (not _in_period(d, period), abs(d - mid)))
+
+
+def read_date(text: str, period: tuple[date, date] | None = None) -> date | None:
+    """A statement date: YYYY-MM-DD, DD/MM/YYYY (MM/DD when only that fits the period),
+    "3 Mar 2025", "Mar 3, 2025", or any of these without a year when the period supplies it.
+    None when the text isn't one of those."""
+    text = text.strip()
+    m = _ISO_DATE.fullmatch(text)
+    if m:
+        return _dated(int(m.group(1)), int(m.group(2)), int(m.group(3)), None)
+    m = _NUMERIC_DATE.fullmatch(text)
+    if m:
+        year = _full_year(m.group(3)) if m.group(3) else None
+        a, b = int(m.group(1)), int(m.group(2))
+        day_first = _dated(year, b, a, period)
+        if period is None or (day_first is not None and _in_period(day_first, period)):
+            return day_first
+        month_first = _dated(year, a, b, period)
+        if month_first is not None and _in_period(month_first, period):
+            return month_first
+        return day_first
+    m = _DAY_MONTH_DATE.fullmatch(text)
+    if m:
+        day, month, year = m.group(1), _month_number(m.group(2)), m.group(3)
+    else:
+        m = _MONTH_DAY_DATE.fullmatch(text)
+        if not m:
+            return None
+        month, day, year = _month_number(m.group(1)), m.group(2), m.group(3)
+    if month is None:
+        return None
+    return _dated(_full_year(year) if year else None, month, int(day), period)
+
+
+@lru_cache(maxsize=DATE_MEMO_SIZE)
+def _normalized_date(text: str, period: tuple[date, date] | None) -> str:
+    d = read_date(text, period)
+    return d.isoformat() if d else text
+
+
+def normalize_date(raw: str | None, period: tuple[date, date] | None = None) -> str | None:
+    """ISO YYYY-MM-DD for a date as printed on a statement (see read_date), so later readers
+    never re-parse it; the stripped text when it can't be read. Memoized."""
+    if not raw:
+        return None
+    return _normalized_date(raw.strip(), period)
+
+
+def statement_period(text: str) -> tuple[date, date] | None:
+    """(first, last) day of the statement period named in the text: a date range such as
+    "March 1 - March 28, 2025" or "2025-03-01 to 2025-03-31" (the start may omit the year),
+    else the first "Month YYYY", taken as that whole month. Years outside STATEMENT_YEARS are
+    skipped. None when neither is found."""
+    for m in _PERIOD_RANGE.finditer(text):
+        end = read_date(m.group(2))
+        if end is None:
+            continue
+        start = read_date(m.group(1)) or read_date(m.group(1), (end - timedelta(days=366), end))
+        if start is not None and start <= end <= start + timedelta(days=400):
+            return start, end
+    for m in _MONTH_YEAR.finditer(text):
+        month = _month_number(m.group(1))
+        if month is None:
+            continue
+        year = int(m.group(2))
+        if year not in STATEMENT_YEARS:
+            continue
+        first = date(year, month, 1)
+        last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+        return first, last
+    return None
+
+
 def looks_like_pagination_or_footer(desc: str) -> bool:
     """Return True if description looks like pagination or footer, not a transaction."""
     if not desc or len(desc) < 5:
@@ -36,7 +189,7 @@ def looks_like_pagination_or_footer(desc: str) -> bool:
         return True
     if "inc." in d or "inc," in d:
         return True
-    if re.search(r"\d+\s*-\s*\d+\s+\w+\s+(?:st|ave|rd|blvd)", d, re.I):
+    if _STREET_ADDRESS.search(d):
         return True
     return False
 
@@ -45,7 +198,7 @@ def normalize_amount(raw: str) -> float:
     """Parse amount string to float. Parentheses and leading minus/en-dash = negative."""
     raw = str(raw).strip().replace(",", "").replace("–", "-").replace("—", "-")
     is_negative = raw.startswith("(") or raw.startswith("-")
-    n = float(re.sub(r"[^\d.-]", "", raw.replace("(", "-")))
+    n = float(_NON_NUMERIC.sub("", raw.replace("(", "-")))
     return -abs(n) if is_negative else abs(n)
 
 
@@ -61,10 +214,29 @@ def looks_like_header_or_summary(desc: str) -> bool:
     return False
 
 
-def find_header_row(table: list, header_keywords: tuple = (
+# Column header words; two of them in one row make it a header row
+HEADER_KEYWORDS = (
     "date", "desc", "description", "amount", "debit", "credit",
     "post", "posted", "withdrawal", "deposit", "balance", "particulars", "details"
-)) -> int:
+)
+
+
+def looks_like_header_line(line: str, header_keywords: tuple = HEADER_KEYWORDS) -> bool:
+    """Whether a text line (lower case, no spaces) is a table header: two or more header
+    keywords making up at least half of it. Prose that mentions a date or a balance is not."""
+    covered = bytearray(len(line))
+    found = 0
+    for kw in header_keywords:
+        start = line.find(kw)
+        if start >= 0:
+            found += 1
+        while start >= 0:
+            covered[start:start + len(kw)] = b"\x01" * len(kw)
+            start = line.find(kw, start + 1)
+    return found >= 2 and 2 * sum(covered) >= len(line)
+
+
+def find_header_row(table: list, header_keywords: tuple = HEADER_KEYWORDS) -> int:
     """Find the 0-based row index that contains column headers."""
     for i, row in enumerate(table):
         if not row:
@@ -74,3 +246,86 @@ def find_header_row(table: list, header_keywords: tuple = (
         if matches >= 2:
             return i
     return 0
+
+
+def match_cell_amount(cell: str) -> tuple[re.Match, bool] | None:
+    """Amount in a table cell: signed, else parenthesized, else trailing.
+    Returns (match, is_negative) with is_negative for the first two kinds."""
+    for _, pattern, negative in CELL_AMOUNT_KINDS:
+        m = _search_trailing(cell) if pattern is AMOUNT_PATTERN else pattern.search(cell)
+        if m:
+            return m, negative
+    return None
+
+
+def _may_end_with_amount(text: str) -> bool:
+    # AMOUNT_PATTERN is anchored at the end: the last non-space character must be a digit or comma
+    tail = text.rstrip()[-1:]
+    return tail == "," or tail.isdecimal()
+
+
+def _search_trailing(text: str) -> re.Match | None:
+    # Unanchored search retries the pattern at every offset; rule most lines out first
+    return AMOUNT_PATTERN.search(text) if _may_end_with_amount(text) else None
+
+
+class TextLine:
+    """A statement text line split into date, amount and description (see tokenize_line)."""
+
+    __slots__ = ("date", "date_span", "amount", "amount_span", "negative", "description")
+
+    def __init__(self, date: str | None, date_span: tuple[int, int] | None, amount: float | None,
+                 amount_span: tuple[int, int], negative: bool, description: str):
+        self.date = date
+        self.date_span = date_span
+        self.amount = amount
+        self.amount_span = amount_span
+        self.negative = negative
+        self.description = description
+
+
+def tokenize_line(line: str) -> TextLine | None:
+    """Split a stripped text line into its amount (first kind of TEXT_AMOUNT_KINDS that matches),
+    date (first of DATE_PATTERNS, in list order, that matches) and the description left after
+    removing every amount and date. None when the line has no amount; amount is None when the
+    matched digits don't parse.
+
+    Each pattern runs at most once per line; a removal pass is skipped when the literal it needs
+    ("$", "(", a trailing digit, any digit for dates) is absent, and the searches already made
+    to pick the amount are reused."""
+    negative = True
+    m = signed = SIGNED_AMOUNT_PATTERN.search(line)
+    if m is None:
+        m = PAREN_AMOUNT_PATTERN.search(line)
+    if m is None:
+        negative = False
+        m = POSITIVE_TXN_AMOUNT_PATTERN.search(line) or _search_trailing(line)
+        if m is None:
+            return None
+    # The captured digits are [\d,]+(.dd)?, so this is normalize_amount without the sign handling
+    try:
+        amount = float(m.group(1).replace(",", ""))
+        amount = -amount if negative else amount
+    except ValueError:
+        amount = None
+
+    date = date_span = None
+    for pattern in DATE_REGEXES:
+        dm = pattern.search(line)
+        if dm:
+            date, date_span = dm.group(1), dm.span(1)
+            break
+
+    # Removal order: signed, positive-with-balance, trailing, parenthesized, then dates
+    desc = SIGNED_AMOUNT_PATTERN.sub("", line) if signed else line
+    if "$" in desc:
+        desc = POSITIVE_TXN_AMOUNT_PATTERN.sub("", desc)
+    if _may_end_with_amount(desc):
+        desc = AMOUNT_PATTERN.sub("", desc)
+    desc = desc.strip()
+    if "(" in desc:
+        desc = PAREN_AMOUNT_PATTERN.sub("", desc).strip()
+    if _DIGIT.search(desc):
+        for pattern in _DATE_STRIP_REGEXES:
+            desc = pattern.sub("", desc).strip()
+    return TextLine(date, date_span, amount, m.span(), negative, " ".join(desc.split()) or "Unknown")
@@ -0,0 +1,133 @@
+"""
+Parsed-document wrapper shared by bank detection, templates and the generic fallback.
+Each page's text, words and tables are extracted lazily and at most once per parse.
+"""
+from typing import Any
+
+import pdfplumber
+from pdfplumber.table import TableSettings
+from pdfplumber.utils import cluster_objects
+
+from ..timing import stage
+
+
+def _settings_key(settings: dict | None) -> tuple:
+    return tuple(sorted((settings or {}).items(), key=lambda kv: kv[0]))
+
+
+# Characters whose tops are this close (points) share a line, as in pdfplumber's default y_tolerance
+LINE_TOLERANCE = 3
+
+
+class StatementPage:
+    """One PDF page with memoized pdfplumber extractions."""
+
+    def __init__(self, page: Any, index: int):
+        self.page = page
+        self.index = index
+        self._text: str | None = None
+        self._words: list[dict] | None = None
+        self._char_lines: list[str] | None = None
+        self._line_chars: list[list[dict]] = []
+        self._has_rules: bool | None = None
+        self._tables: dict[tuple, list] = {}
+        self._table_objects: dict[tuple, list] = {}
+
+    @property
+    def text(self) -> str:
+        """page.extract_text(), '' when the page has no text."""
+        if self._text is None:
+            with stage("extract_text"):
+                self._text = self.page.extract_text() or ""
+        return self._text
+
+    @property
+    def words(self) -> list[dict]:
+        if self._words is None:
+            with stage("extract_words"):
+                self._words = self.page.extract_words() or []
+        return self._words
+
+    @property
+    def char_lines(self) -> list[str]:
+        """Text lines rebuilt from character positions alone (chars clustered by top within
+        LINE_TOLERANCE, top to bottom, then left to right), lower-cased with whitespace dropped.
+        A cheap probe: no word or layout analysis."""
+        if self._char_lines is None:
+            self._group_chars()
+        return self._char_lines
+
+    def _group_chars(self) -> None:
+        with stage("page_probe"):
+            chars = [c for c in self.page.chars if not c["text"].isspace()]
+            self._line_chars = [
+                sorted(line, key=lambda c: c["x0"]) for line in cluster_objects(chars, "top", LINE_TOLERANCE)
+            ]
+            self._char_lines = ["".join(c["text"] for c in chars).lower() for chars in self._line_chars]
+
+    def line_geometry(self, index: int, gap: float = 3) -> tuple[float, tuple[int, ...]]:
+        """(top, rounded x0 of each word) for char_lines[index]; a word break is a gap wider than
+        `gap` points, as in pdfplumber's default x_tolerance."""
+        if self._char_lines is None:
+            self._group_chars()
+        chars = sorted(self._line_chars[index], key=lambda c: c["x0"])
+        starts, prev_x1 = [], None
+        for c in chars:
+            if prev_x1 is None or c["x0"] - prev_x1 > gap:
+                starts.append(round(c["x0"]))
+            prev_x1 = c["x1"]
+        return min(c["top"] for c in chars), tuple(starts)
+
+    def contains(self, keyword: str) -> bool:
+        """Whether keyword (lower case, no spaces) occurs on one of the page's char_lines."""
+        return any(keyword in line for line in self.char_lines)
+
+    @property
+    def has_rules(self) -> bool:
+        """Whether the page draws any lines or rectangles. The default (lines) table strategy
+        finds no tables without them."""
+        if self._has_rules is None:
+            with stage("page_probe"):
+                self._has_rules = bool(self.page.edges)
+        return self._has_rules
+
+    def table_objects(self, settings: dict | None = None) -> list:
+        """page.find_tables(settings): pdfplumber Table objects, with their geometry."""
+        key = _settings_key(settings)
+        if key not in self._table_objects:
+            with stage("extract_tables"):
+                self._table_objects[key] = self.page.find_tables(settings)
+        return self._table_objects[key]
+
+    def tables(self, settings: dict | None = None) -> list:
+        """page.extract_tables(settings), memoized per settings; row lists in table_objects order."""
+        key = _settings_key(settings)
+        if key not in self._tables:
+            found = self.table_objects(settings)
+            with stage("extract_tables"):
+                text_settings = TableSettings.resolve(settings).text_settings or {}
+                self._tables[key] = [table.extract(**text_settings) for table in found]
+        return self._tables[key]
+
+
+class StatementDocument:
+    """pdfplumber.PDF plus a per-page extraction cache."""
+
+    def __init__(self, pdf: pdfplumber.PDF):
+        self.pdf = pdf
+        self._pages: list[StatementPage] | None = None
+
+    @classmethod
+    def wrap(cls, pdf: "pdfplumber.PDF | StatementDocument") -> "StatementDocument":
+        """Accept either a raw pdfplumber.PDF or an existing document."""
+        return pdf if isinstance(pdf, cls) else cls(pdf)
+
+    @property
+    def pages(self) -> list[StatementPage]:
+        if self._pages is None:
+            self._pages = [StatementPage(p, i) for i, p in enumerate(self.pdf.pages)]
+        return self._pages
+
+    def sample_text(self, max_pages: int = 2) -> str:
+        """Lower-cased text of the first few pages (bank detection, layout hints)."""
+        return " ".join(p.text for p in self.pages[:max_pages] if p.text).lower()
@@ -3,32 +3,38 @@ Generic parser for Canadian bank statement PDFs.
 Fallback when no bank-specific template matches.
 """
 import logging
-import re
-from typing import Any
+from datetime import date
+from typing import Iterator
 
 import pdfplumber
 
 from .base import (
-    AMOUNT_PATTERN,
-    DATE_PATTERNS,
-    PAREN_AMOUNT_PATTERN,
-    POSITIVE_TXN_AMOUNT_PATTERN,
-    SIGNED_AMOUNT_PATTERN,
     find_header_row,
     looks_like_header_or_summary,
     looks_like_pagination_or_footer,
+    match_cell_amount,
     normalize_amount,
+    normalize_date,
+    statement_period,
+    tokenize_line,
 )
+from ..transactions import TransactionBatch
+from .document import StatementDocument, StatementPage
 
 logger = logging.getLogger(__name__)
 
 
-def _extract_from_tables(pdf: pdfplumber.PDF) -> list[dict[str, Any]]:
+def _table_pages(doc: StatementDocument) -> Iterator[StatementPage]:
+    """Pages worth running table extraction on: those with rules. The default (lines) table
+    strategy finds nothing on the others, so skipping them leaves the output unchanged."""
+    return (page for page in doc.pages if page.has_rules)
+
+
+def _extract_from_tables(doc: StatementDocument, period: tuple[date, date] | None = None) -> TransactionBatch:
     """Extract transactions from table structures."""
-    transactions = []
-    for page in pdf.pages:
-        tables = page.extract_tables()
-        for table in tables or []:
+    transactions = TransactionBatch()
+    for page in _table_pages(doc):
+        for table in page.tables():
             if not table or len(table) < 2:
                 continue
             header_row_idx = find_header_row(table)
@@ -58,42 +64,28 @@ def _extract_from_tables(pdf: pdfplumber.PDF) -> list[dict[str, Any]]:
                 amount_val = str(row[amount_col] or "").strip()
                 if not amount_val:
                     continue
-                amt_match = (
-                    SIGNED_AMOUNT_PATTERN.search(amount_val)
-                    or PAREN_AMOUNT_PATTERN.search(amount_val)
-                    or AMOUNT_PATTERN.search(amount_val)
-                )
-                if not amt_match:
+                found = match_cell_amount(amount_val)
+                if not found:
                     continue
+                amt_match, is_neg = found
                 try:
                     raw = amt_match.group(1) if amt_match.lastindex else amt_match.group(0)
-                    is_neg = bool(
-                        SIGNED_AMOUNT_PATTERN.search(amount_val)
-                        or PAREN_AMOUNT_PATTERN.search(amount_val)
-                    )
                     amount = -abs(normalize_amount(raw)) if is_neg else normalize_amount(raw)
                 except (ValueError, TypeError):
                     continue
                 if looks_like_header_or_summary(desc_val):
                     continue
-                transactions.append({
-                    "date": date_val or None,
-                    "description": desc_val or "Unknown",
-                    "amount": round(amount, 2),
-                })
+                transactions.append(normalize_date(date_val, period), desc_val or "Unknown", round(amount, 2))
     return transactions
 
 
-def _extract_from_text(pdf: pdfplumber.PDF) -> list[dict[str, Any]]:
+def _extract_from_text(doc: StatementDocument, period: tuple[date, date] | None = None) -> TransactionBatch:
     """Fallback: extract from raw text using regex."""
-    transactions = []
+    transactions = TransactionBatch()
     past_activity = False
-    sample_text = " ".join(
-        p.extract_text() or "" for p in list(pdf.pages)[:2]
-    ).lower()
-    require_activity = "wealthsimple" in sample_text
-    for page in pdf.pages:
-        text = page.extract_text()
+    require_activity = "wealthsimple" in doc.sample_text()
+    for page in doc.pages:
+        text = page.text
         if not text:
             continue
         for line in text.split("\n"):
@@ -106,46 +98,27 @@ def _extract_from_text(pdf: pdfplumber.PDF) -> list[dict[str, Any]]:
             if require_activity and not past_activity:
                 continue
             # Prefer transaction amount over balance: signed (-$16), positive ($5.46), then trailing
-            signed_match = SIGNED_AMOUNT_PATTERN.search(line)
-            paren_match = PAREN_AMOUNT_PATTERN.search(line)
-            positive_txn_match = POSITIVE_TXN_AMOUNT_PATTERN.search(line)
-            end_match = AMOUNT_PATTERN.search(line)
-            amt_match = signed_match or paren_match or positive_txn_match or end_match
-            if not amt_match:
-                continue
-            is_negative = bool(signed_match or paren_match)
-            date_val = None
-            for pat in DATE_PATTERNS:
-                m = re.search(pat, line)
-                if m:
-                    date_val = m.group(1)
-                    break
-            try:
-                raw = amt_match.group(1) if amt_match.lastindex else amt_match.group(0)
-                amount = -abs(normalize_amount(raw)) if is_negative else normalize_amount(raw)
-            except (ValueError, TypeError):
+            tokens = tokenize_line(line)
+            if tokens is None or tokens.amount is None:
                 continue
+            date_val, amount, desc = tokens.date, tokens.amount, tokens.description
             if abs(amount) < 0.01 or abs(amount) > 999_999:
                 continue
-            desc = re.sub(SIGNED_AMOUNT_PATTERN, "", line)
-            desc = re.sub(POSITIVE_TXN_AMOUNT_PATTERN, "", desc)
-            desc = re.sub(AMOUNT_PATTERN, "", desc).strip()
-            desc = re.sub(PAREN_AMOUNT_PATTERN, "", desc).strip()
-            for p in DATE_PATTERNS:
-                desc = re.sub(p, "", desc, flags=re.I).strip()
-            desc = re.sub(r"\s+", " ", desc).strip() or "Unknown"
             if looks_like_header_or_summary(desc) or looks_like_pagination_or_footer(desc) or len(desc) < 3:
                 continue
             # Skip lines that look like address/account (no date, short or numeric desc)
             if not date_val and (len(desc) < 10 or desc.replace(" ", "").isdigit()):
                 continue
-            transactions.append({"date": date_val, "description": desc, "amount": round(amount, 2)})
+            transactions.append(normalize_date(date_val, period), desc, round(amount, 2))
     return transactions
 
 
-def parse_generic(pdf: pdfplumber.PDF) -> list[dict[str, Any]]:
+def parse_generic(pdf: pdfplumber.PDF | StatementDocument) -> TransactionBatch:
     """Parse using generic table/text extraction."""
-    txns = _extract_from_tables(pdf)
+    doc = StatementDocument.wrap(pdf)
+    # Dates are stored as ISO; ones printed without a year take it from the statement period
+    period = statement_period(doc.sample_text())
+    txns = _extract_from_tables(doc, period)
     if not txns:
-        txns = _extract_from_text(pdf)
+        txns = _extract_from_text(doc, period)
     return txns
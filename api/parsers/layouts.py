@@ -0,0 +1,232 @@
+"""
+Learned table layouts for bank templates. The first time a template finds its transaction
+table by full-page detection, it records the table's column rules and its offset from the
+header line, keyed by bank plus a layout fingerprint (page size, header word positions).
+Later pages and later statements with the same fingerprint read the table straight off the
+learned grid (explicit columns, row rules found inside the table's bounding box) with no
+table detection; a result that doesn't validate drops the layout and the template falls
+back to full-page detection.
+"""
+import bisect
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from pdfplumber import utils
+
+from ..timing import stage
+from .document import StatementPage
+
+logger = logging.getLogger(__name__)
+
+# LAYOUT_CACHE_SIZE: learned layouts kept per process (0 disables learning)
+LAYOUT_CACHE_SIZE = int(os.getenv("LAYOUT_CACHE_SIZE") or 64)
+
+# How far apart two rule segments may be and still count as one rule (pdfplumber's
+# default snap and join tolerance)
+RULE_TOLERANCE = 3
+
+
+class TableLayout:
+    """Where a template's table sits relative to its header line, and how its columns map."""
+
+    __slots__ = ("columns", "top_offset", "header", "column_map")
+
+    def __init__(self, columns: tuple[float, ...], top_offset: float, header: tuple[str, ...],
+                 column_map: tuple[int, ...]):
+        self.columns = columns
+        self.top_offset = top_offset
+        self.header = header
+        self.column_map = column_map
+
+    @classmethod
+    def learn(cls, table: Any, rows: list[list], header_row: int, header_top: float,
+              column_map: tuple[int, ...]) -> "TableLayout | None":
+        """Layout of a pdfplumber Table found by full-page detection (rows: its extract()).
+        None unless it is a plain grid, where explicit column lines reproduce the same cells."""
+        cells = table.rows[header_row].cells
+        if any(cell is None for cell in cells) or any(
+            len(row.cells) != len(cells) or None in row.cells for row in table.rows
+        ):
+            return None
+        columns = tuple(cell[0] for cell in cells) + (cells[-1][2],)
+        header = tuple((h or "").lower() for h in rows[header_row])
+        return cls(columns, table.bbox[1] - header_top, header, column_map)
+
+    def extract(self, page: StatementPage, header_top: float) -> list[list] | None:
+        """Rows of the table under this header line, header row first; None when the region
+        isn't a plain grid on the learned columns or its first row isn't the learned header."""
+        x0, x1 = self.columns[0], self.columns[-1]
+        top = header_top + self.top_offset
+        bottom = _rule_bottom(page, x0, top)
+        if bottom is None:
+            return None
+        bbox = (x0 - RULE_TOLERANCE, top - RULE_TOLERANCE, x1 + RULE_TOLERANCE, bottom + RULE_TOLERANCE)
+        rules = _row_rules(page, bbox, self.columns)
+        if rules is None or len(rules) < 2:
+            return None
+        rows = _grid_text(page.page.chars, self.columns, rules)
+        if tuple(h.lower() for h in rows[0]) != self.header:
+            return None
+        return rows
+
+
+def _in_bbox(edge: dict, bbox: tuple) -> bool:
+    return edge["x1"] > bbox[0] and edge["x0"] < bbox[2] and edge["bottom"] > bbox[1] and edge["top"] < bbox[3]
+
+
+def _rule_bottom(page: StatementPage, x: float, top: float) -> float | None:
+    """Bottom of the vertical rule at x that starts at the table top, joining segments (tables
+    drawn cell by cell rule each row separately)."""
+    segments = sorted(
+        (e["top"], e["bottom"]) for e in page.page.edges
+        if e["orientation"] == "v" and abs(e["x0"] - x) <= RULE_TOLERANCE
+        and e["bottom"] > top - RULE_TOLERANCE
+    )
+    bottom = None
+    for seg_top, seg_bottom in segments:
+        if bottom is None:
+            if seg_top > top + RULE_TOLERANCE:
+                return None
+        elif seg_top > bottom + RULE_TOLERANCE:
+            break
+        bottom = seg_bottom if bottom is None else max(bottom, seg_bottom)
+    return bottom
+
+
+def _row_rules(page: StatementPage, bbox: tuple, columns: tuple[float, ...]) -> list[float] | None:
+    """y of each horizontal rule in bbox, top to bottom, when the region is a plain grid: every
+    vertical rule sits on a learned column and every horizontal rule spans all columns (segments
+    joined as pdfplumber snaps and joins them). None otherwise."""
+    x0, x1 = columns[0], columns[-1]
+    horizontal, ruled = [], set()
+    for e in page.page.edges:
+        if not _in_bbox(e, bbox):
+            continue
+        if e["orientation"] == "v":
+            on = [i for i, x in enumerate(columns) if abs(e["x0"] - x) <= RULE_TOLERANCE]
+            if not on:
+                return None
+            ruled.update(on)
+        else:
+            horizontal.append(e)
+    if len(ruled) != len(columns):
+        return None
+    horizontal.sort(key=lambda e: e["top"])
+
+    rules, group = [], []
+    for e in horizontal + [None]:
+        if group and (e is None or e["top"] - group[0]["top"] > RULE_TOLERANCE):
+            reach = x0
+            for seg in sorted(group, key=lambda g: g["x0"]):
+                if seg["x0"] > reach + RULE_TOLERANCE:
+                    break
+                reach = max(reach, seg["x1"])
+            if reach < x1 - RULE_TOLERANCE:
+                return None
+            rules.append(sum(g["top"] for g in group) / len(group))
+            group = []
+        if e is not None:
+            group.append(e)
+    return rules
+
+
+def _grid_text(chars: list[dict], columns: tuple[float, ...], rules: list[float]) -> list[list[str]]:
+    """Cell text of the grid between consecutive column x and rule y values, assembled as
+    Table.extract does (a char belongs to the cell holding its midpoint; default text settings).
+    One bisection per char instead of every row and cell scanning every char."""
+    cells = [[[] for _ in columns[1:]] for _ in rules[1:]]
+    last_col, last_row = len(columns) - 1, len(rules) - 1
+    for char in chars:
+        v_mid = (char["top"] + char["bottom"]) / 2
+        r = bisect.bisect_right(rules, v_mid) - 1
+        if r < 0 or r >= last_row:
+            continue
+        c = bisect.bisect_right(columns, (char["x0"] + char["x1"]) / 2) - 1
+        if 0 <= c < last_col:
+            cells[r][c].append(char)
+    return [[utils.extract_text(found) if found else "" for found in row] for row in cells]
+
+
+class LayoutCache:
+    """LRU of learned layouts by (bank, fingerprint)."""
+
+    def __init__(self, max_size: int = LAYOUT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple, TableLayout] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def get(self, key: tuple) -> TableLayout | None:
+        with self._lock:
+            layout = self._entries.get(key)
+            if layout is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return layout
+
+    def set(self, key: tuple, layout: TableLayout) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = layout
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def reject(self, key: tuple) -> None:
+        """Drop a layout whose extraction didn't validate; the page is re-learned."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self.rejected += 1
+        logger.debug("Learned table layout rejected: %s", key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected": self.rejected,
+        }
+
+
+def layout_key(bank: str, page: StatementPage, header_line: int) -> tuple:
+    """(bank, page width, page height, header word x positions), in whole points."""
+    _, word_x0s = page.line_geometry(header_line)
+    return (bank, round(page.page.width), round(page.page.height), word_x0s)
+
+
+def extract_with_layout(cache: LayoutCache, key: tuple, page: StatementPage,
+                        header_line: int) -> tuple[TableLayout, list[list]] | None:
+    """(layout, rows) from the learned layout for key, or None (nothing learned, or rejected)."""
+    layout = cache.get(key)
+    if layout is None:
+        return None
+    with stage("layout_extract"):
+        rows = layout.extract(page, page.line_geometry(header_line)[0])
+    if rows is None:
+        cache.reject(key)
+        return None
+    return layout, rows
+
+
+_cache: LayoutCache | None = None
+
+
+def get_layout_cache() -> LayoutCache:
+    """Process-wide layout cache; parse workers each learn their own."""
+    global _cache
+    if _cache is None:
+        _cache = LayoutCache()
+    return _cache
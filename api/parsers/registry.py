@@ -2,10 +2,12 @@
 Bank detection and parser dispatch.
 """
 import logging
-from typing import Any
 
 import pdfplumber
 
+from ..timing import label, stage
+from ..transactions import TransactionBatch
+from .document import StatementDocument
 from .generic import parse_generic
 from .wealthsimple import parse_wealthsimple
 
@@ -24,45 +26,48 @@ BANK_TEMPLATES = [
 ]
 
 
-def _sample_pdf_text(pdf: pdfplumber.PDF, max_pages: int = 2) -> str:
+def _sample_pdf_text(doc: StatementDocument, max_pages: int = 2) -> str:
     """Extract text from first few pages for bank detection."""
-    text_parts = []
-    for i, page in enumerate(pdf.pages):
-        if i >= max_pages:
-            break
-        t = page.extract_text()
-        if t:
-            text_parts.append(t)
-    return " ".join(text_parts).lower()
+    return doc.sample_text(max_pages)
 
 
-def detect_bank(pdf: pdfplumber.PDF) -> str:
+@stage("detect_bank")
+def detect_bank(pdf: pdfplumber.PDF | StatementDocument) -> str:
     """Return bank_id if detected, else 'generic'."""
-    sample = _sample_pdf_text(pdf)
+    sample = _sample_pdf_text(StatementDocument.wrap(pdf))
     for bank_id, keywords, _ in BANK_TEMPLATES:
         if any(kw.lower() in sample for kw in keywords):
             return bank_id
     return "generic"
 
 
-def parse_statement(file_path: str) -> list[dict[str, Any]]:
+def parse_statement(file_path: str) -> TransactionBatch:
     """
     Parse a bank statement PDF. Detects bank and uses appropriate template.
-    Returns list of { date, description, amount }.
+    Returns a TransactionBatch of { date, description, amount }.
     """
-    with pdfplumber.open(file_path) as pdf:
-        bank_id = detect_bank(pdf)
+    with stage("pdf_open"):
+        pdf = pdfplumber.open(file_path)
+    with pdf:
+        # One document per parse: detection, template and fallback share page extractions
+        doc = StatementDocument(pdf)
+        bank_id = detect_bank(doc)
         logger.info("Detected bank: %s", bank_id)
+        label(bank=bank_id, pages=len(doc.pages), fallback=False)
 
         for bid, _, parser_func in BANK_TEMPLATES:
             if bid == bank_id:
-                txns = parser_func(pdf)
+                with stage("template"):
+                    txns = parser_func(doc)
                 logger.info("Extracted %d transactions from %s template", len(txns), bank_id)
                 if not txns:
                     logger.warning("%s template returned 0 transactions, falling back to generic", bank_id)
-                    txns = parse_generic(pdf)
+                    label(fallback=True)
+                    with stage("fallback"):
+                        txns = parse_generic(doc)
                 return txns
 
-        txns = parse_generic(pdf)
+        with stage("generic"):
+            txns = parse_generic(doc)
         logger.info("Extracted %d transactions from generic template", len(txns))
         return txns
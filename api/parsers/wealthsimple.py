@@ -4,19 +4,23 @@ Columns: DATE, POSTED DATE, DESCRIPTION, AMOUNT (CAD), BALANCE (CAD)
 Amount: positive = deposit, negative = withdrawal (matches our convention).
 """
 import logging
-from typing import Any
+from typing import Iterator
 
 import pdfplumber
 
 from .base import (
-    AMOUNT_PATTERN,
-    PAREN_AMOUNT_PATTERN,
-    SIGNED_AMOUNT_PATTERN,
     find_header_row,
+    looks_like_header_line,
     looks_like_header_or_summary,
     looks_like_pagination_or_footer,
+    match_cell_amount,
     normalize_amount,
+    normalize_date,
+    statement_period,
 )
+from .document import StatementDocument, StatementPage
+from ..transactions import TransactionBatch
+from .layouts import TableLayout, extract_with_layout, get_layout_cache, layout_key
 
 logger = logging.getLogger(__name__)
 
@@ -47,55 +51,90 @@ def _detect_columns(headers: list[str]) -> tuple[int, int, int]:
     return date_col, desc_col, amount_col
 
 
-def _page_has_activity(page) -> bool:
-    """Check if page text contains Activity section (transaction table)."""
-    text = page.extract_text() or ""
-    return "activity" in text.lower()
+def _is_activity_header(line: str) -> bool:
+    return "description" in line and "amount" in line and looks_like_header_line(line)
 
 
-def parse_wealthsimple(pdf: pdfplumber.PDF) -> list[dict[str, Any]]:
-    """Parse Wealthsimple Cash statement. Skips header, finds Activity table."""
-    transactions = []
-    for page in pdf.pages:
-        if not _page_has_activity(page):
+def _has_activity_header(lines: list[str]) -> bool:
+    """Whether one line, or two adjacent lines read together (header cells that wrap or sit on
+    different baselines), make up an Activity header."""
+    return any(_is_activity_header(line) for line in lines) or any(
+        _is_activity_header(first + second) for first, second in zip(lines, lines[1:])
+    )
+
+
+def _page_has_activity(page: StatementPage) -> bool:
+    """Whether the page holds the Activity table: ruled, says "activity" and has a header with
+    description and amount. Probes character positions only (no text or table extraction)."""
+    return page.has_rules and page.contains("activity") and _has_activity_header(page.char_lines)
+
+
+def _activity_pages(doc: StatementDocument) -> Iterator[StatementPage]:
+    """Pages worth running table extraction on. Every page is probed, since an Activity section
+    can resume after a non-Activity page; the probe keeps the others from being extracted."""
+    return (page for page in doc.pages if _page_has_activity(page))
+
+
+def _activity_tables(page: StatementPage) -> Iterator[tuple[tuple[int, int, int], list[list]]]:
+    """((date_col, desc_col, amount_col), data rows) for each Activity table on the page.
+    A page laid out like one seen before is cropped to the learned table; otherwise the page
+    goes through full table detection and a single Activity table teaches its layout. A learned
+    layout covers one table, so pages with more than one Activity header line, or a header
+    split over two lines, always get full detection."""
+    cache = get_layout_cache()
+    header_lines = [i for i, line in enumerate(page.char_lines) if _is_activity_header(line)]
+    key = layout_key("wealthsimple", page, header_lines[0]) if len(header_lines) == 1 else None
+    if key is not None:
+        learned = extract_with_layout(cache, key, page, header_lines[0])
+        if learned is not None:
+            layout, rows = learned
+            yield layout.column_map, rows[1:]
+            return
+
+    found = []
+    for table, rows in zip(page.table_objects(), page.tables()):
+        if not rows or len(rows) < 2:
+            continue
+        header_row_idx = find_header_row(rows)
+        headers = [str(h).lower() if h else "" for h in rows[header_row_idx]]
+        header_text = " ".join(headers)
+        if "description" not in header_text or "amount" not in header_text:
             continue
-        tables = page.extract_tables()
-        for table in tables or []:
-            if not table or len(table) < 2:
-                continue
-            header_row_idx = find_header_row(table)
-            headers = [str(h).lower() if h else "" for h in table[header_row_idx]]
-            header_text = " ".join(headers)
-            if "description" not in header_text or "amount" not in header_text:
-                continue
-            date_col, desc_col, amount_col = _detect_columns(headers)
-            data_start = header_row_idx + 1
-
-            for row in table[data_start:]:
+        found.append((table, rows, header_row_idx, _detect_columns(headers)))
+    if key is not None and len(found) == 1 and found[0][2] == 0:
+        table, rows, _, columns = found[0]
+        layout = TableLayout.learn(table, rows, 0, page.line_geometry(header_lines[0])[0], columns)
+        if layout is not None:
+            cache.set(key, layout)
+    for _, rows, header_row_idx, columns in found:
+        yield columns, rows[header_row_idx + 1:]
+
+
+def parse_wealthsimple(pdf: pdfplumber.PDF | StatementDocument) -> TransactionBatch:
+    """Parse Wealthsimple Cash statement. Skips header, finds Activity table."""
+    doc = StatementDocument.wrap(pdf)
+    # Activity dates are printed without a year ("Mar 3"); the statement period supplies it
+    period = statement_period(doc.sample_text())
+    transactions = TransactionBatch()
+    for page in _activity_pages(doc):
+        for (date_col, desc_col, amount_col), rows in _activity_tables(page):
+            for row in rows:
                 if not row or len(row) <= max(date_col, desc_col, amount_col):
                     continue
                 amount_val = str(row[amount_col] or "").strip()
                 if not amount_val:
                     continue
-                amt_match = (
-                    SIGNED_AMOUNT_PATTERN.search(amount_val)
-                    or PAREN_AMOUNT_PATTERN.search(amount_val)
-                    or AMOUNT_PATTERN.search(amount_val)
-                )
-                if not amt_match:
+                found = match_cell_amount(amount_val)
+                if not found:
                     continue
                 try:
-                    raw = amt_match.group(0)  # Full match preserves sign (e.g. –$16.00)
+                    raw = found[0].group(0)  # Full match preserves sign (e.g. –$16.00)
                     amount = normalize_amount(raw)
                 except (ValueError, TypeError):
                     continue
                 desc_val = str(row[desc_col] or "").strip()
                 if looks_like_header_or_summary(desc_val) or looks_like_pagination_or_footer(desc_val):
                     continue
-                date_val = str(row[date_col] or "").strip() or None
-                transactions.append({
-                    "date": date_val,
-                    "description": desc_val or "Unknown",
-                    "amount": round(amount, 2),
-                })
+                date_val = normalize_date(str(row[date_col] or ""), period)
+                transactions.append(date_val, desc_val or "Unknown", round(amount, 2))
     return transactions
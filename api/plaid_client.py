@@ -0,0 +1,44 @@
+"""
+Plaid API client, built on first use. The plaid package (thousands of generated models)
+is the slowest import in the API and most requests never touch it.
+"""
+import logging
+import os
+import threading
+
+from .io_pool import IO_WORKERS
+
+logger = logging.getLogger(__name__)
+
+PLAID_CLIENT_ID = os.getenv("PLAID_CLIENT_ID")
+PLAID_SECRET = os.getenv("PLAID_SECRET")
+# PLAID_HOST: override the API host (e.g. a local fake Plaid server for testing); default Sandbox
+PLAID_HOST = os.getenv("PLAID_HOST")
+# PLAID_TIMEOUT: seconds before a Plaid request gives up
+PLAID_TIMEOUT = float(os.getenv("PLAID_TIMEOUT") or 30)
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_plaid_client():
+    """Shared PlaidApi; its urllib3 keep-alive pool is sized for the I/O pool."""
+    global _client
+    with _lock:
+        if _client is None:
+            import plaid
+            from plaid.api import plaid_api
+
+            if not PLAID_CLIENT_ID or not PLAID_SECRET:
+                logger.error("Plaid keys not found: set PLAID_CLIENT_ID and PLAID_SECRET in .env")
+            configuration = plaid.Configuration(
+                host=PLAID_HOST or plaid.Environment.Sandbox,
+                api_key={
+                    'clientId': PLAID_CLIENT_ID,
+                    'secret': PLAID_SECRET,
+                    'plaidVersion': '2020-09-14'
+                }
+            )
+            configuration.connection_pool_maxsize = IO_WORKERS
+            _client = plaid_api.PlaidApi(plaid.ApiClient(configuration))
+        return _client
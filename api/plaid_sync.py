@@ -0,0 +1,248 @@
+"""
+Incremental Plaid sync: /transactions/sync deltas applied to a local transaction store.
+Each item keeps a cursor, so a refresh fetches only what changed since the last call and
+history outlives Plaid's lookback window. Reads are served from the store.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+from .transactions import TransactionBatch
+
+logger = logging.getLogger(__name__)
+
+# PLAID_STORE_BACKEND: "supabase", "dir" or "memory" (tests only: cursors die with the process).
+#   Unset: "supabase" when Supabase is configured, else "dir".
+# PLAID_STORE_DIR: location for the "dir" backend
+# PLAID_SYNC_PAGE_SIZE: transactions per /transactions/sync page (Plaid max 500)
+PLAID_STORE_BACKEND = os.getenv("PLAID_STORE_BACKEND", "").lower()
+PLAID_STORE_DIR = os.getenv("PLAID_STORE_DIR") or str(Path(tempfile.gettempdir()) / "twoloonies-plaid")
+PLAID_SYNC_PAGE_SIZE = int(os.getenv("PLAID_SYNC_PAGE_SIZE") or 500)
+# Restarts allowed when Plaid reports the item changed mid-pagination
+SYNC_MAX_RESTARTS = 3
+
+
+def item_key(access_token: str) -> str:
+    """Store key for an item. Derived from the access token so only its holder can read it."""
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+
+def plaid_to_common(txn: dict) -> dict:
+    """Convert Plaid transaction to common format. Plaid: + = outflow, - = inflow."""
+    amount = float(txn.get("amount", 0))
+    normalized_amount = -amount
+    cat = None
+    if "personal_finance_category" in txn and txn["personal_finance_category"]:
+        pfc = txn["personal_finance_category"]
+        if isinstance(pfc, dict):
+            cat = pfc.get("primary") or pfc.get("detailed")
+        elif isinstance(pfc, str):
+            cat = pfc
+    return {
+        "date": txn.get("date"),
+        "description": txn.get("name") or txn.get("merchant_name") or "Unknown",
+        "amount": round(normalized_amount, 2),
+        "category": cat,
+    }
+
+
+def _stored_record(txn: dict) -> dict:
+    record = plaid_to_common(txn)
+    if isinstance(record["date"], date):
+        record["date"] = record["date"].isoformat()
+    record["transaction_id"] = txn["transaction_id"]
+    return record
+
+
+def _newest_first(records: list[dict]) -> list[dict]:
+    # Same order as /transactions/get: newest date first
+    return sorted(records, key=lambda r: (r.get("date") or "", r["transaction_id"]), reverse=True)
+
+
+class MemoryStore:
+    """Per-process store; cursors survive only while the instance stays warm."""
+
+    def __init__(self):
+        self._items: dict[str, tuple[str | None, dict[str, dict]]] = {}
+        self._lock = threading.Lock()
+
+    def get_cursor(self, key: str) -> str | None:
+        return self._items.get(key, (None, {}))[0]
+
+    def apply(self, key: str, upserts: list[dict], removed: list[str], cursor: str) -> None:
+        with self._lock:
+            _, txns = self._items.get(key, (None, {}))
+            txns = dict(txns)
+            for record in upserts:
+                txns[record["transaction_id"]] = record
+            for txn_id in removed:
+                txns.pop(txn_id, None)
+            self._items[key] = (cursor, txns)
+
+    def transactions(self, key: str) -> list[dict]:
+        return _newest_first(list(self._items.get(key, (None, {}))[1].values()))
+
+
+class DirectoryStore:
+    """One JSON file per item: {cursor, transactions: {transaction_id: record}}."""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def _load(self, key: str) -> dict:
+        try:
+            return json.loads(self._path(key).read_bytes())
+        except FileNotFoundError:
+            return {"cursor": None, "transactions": {}}
+
+    def get_cursor(self, key: str) -> str | None:
+        return self._load(key)["cursor"]
+
+    def apply(self, key: str, upserts: list[dict], removed: list[str], cursor: str) -> None:
+        with self._lock:
+            state = self._load(key)
+            txns = state["transactions"]
+            for record in upserts:
+                txns[record["transaction_id"]] = record
+            for txn_id in removed:
+                txns.pop(txn_id, None)
+            state["cursor"] = cursor
+            self.root.mkdir(parents=True, exist_ok=True)
+            # Write-then-rename so the cursor and the transactions change together
+            with tempfile.NamedTemporaryFile(dir=self.root, delete=False, suffix=".tmp", mode="w") as tmp:
+                json.dump(state, tmp, separators=(",", ":"))
+            os.replace(tmp.name, self._path(key))
+
+    def transactions(self, key: str) -> list[dict]:
+        return _newest_first(list(self._load(key)["transactions"].values()))
+
+
+class SupabaseStore:
+    """Rows in public.plaid_transactions; cursor in public.plaid_sync_state."""
+
+    BATCH = 1000
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    def get_cursor(self, key: str) -> str | None:
+        resp = self.client.table("plaid_sync_state").select("cursor").eq("item_key", key).limit(1).execute()
+        rows = resp.data or []
+        return rows[0]["cursor"] if rows else None
+
+    def apply(self, key: str, upserts: list[dict], removed: list[str], cursor: str) -> None:
+        table = self.client.table
+        rows = [{"item_key": key, **r} for r in upserts]
+        for i in range(0, len(rows), self.BATCH):
+            table("plaid_transactions").upsert(rows[i:i + self.BATCH], on_conflict="item_key,transaction_id").execute()
+        for i in range(0, len(removed), self.BATCH):
+            table("plaid_transactions").delete().eq("item_key", key).in_("transaction_id", removed[i:i + self.BATCH]).execute()
+        # Cursor last: if a write above fails, the next sync replays the same delta
+        table("plaid_sync_state").upsert({"item_key": key, "cursor": cursor}, on_conflict="item_key").execute()
+
+    def transactions(self, key: str) -> list[dict]:
+        records, offset = [], 0
+        while True:
+            resp = (
+                self.client.table("plaid_transactions")
+                .select("transaction_id, date, description, amount, category")
+                .eq("item_key", key)
+                .order("date", desc=True)
+                .order("transaction_id", desc=True)
+                .range(offset, offset + self.BATCH - 1)
+                .execute()
+            )
+            page = resp.data or []
+            records.extend(page)
+            if len(page) < self.BATCH:
+                break
+            offset += self.BATCH
+        for r in records:
+            r["amount"] = float(r["amount"])
+        return records
+
+
+def _fetch_changes(client: Any, access_token: str, cursor: str | None,
+                   timeout: float | None = None) -> tuple[list[dict], list[str], str]:
+    """Page through /transactions/sync from cursor until has_more is false.
+    Returns (added + modified, removed ids, next cursor)."""
+    from plaid.model.transactions_sync_request import TransactionsSyncRequest
+
+    for _ in range(SYNC_MAX_RESTARTS + 1):
+        upserts: dict[str, dict] = {}
+        removed: list[str] = []
+        next_cursor = cursor
+        try:
+            while True:
+                kwargs = {"access_token": access_token, "count": PLAID_SYNC_PAGE_SIZE}
+                if next_cursor:
+                    kwargs["cursor"] = next_cursor
+                resp = client.transactions_sync(TransactionsSyncRequest(**kwargs), _request_timeout=timeout)
+                page = resp.to_dict() if hasattr(resp, "to_dict") else dict(resp)
+                for txn in page.get("added", []) + page.get("modified", []):
+                    upserts[txn["transaction_id"]] = _stored_record(txn)
+                for txn in page.get("removed", []):
+                    upserts.pop(txn["transaction_id"], None)
+                    removed.append(txn["transaction_id"])
+                next_cursor = page["next_cursor"]
+                if not page.get("has_more"):
+                    return list(upserts.values()), removed, next_cursor
+        except Exception as e:
+            # Plaid asks clients to restart the whole pagination from the original cursor
+            if "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION" not in str(getattr(e, "body", "") or e):
+                raise
+            logger.info("Plaid item changed during sync pagination; restarting")
+    raise RuntimeError("Plaid sync did not settle after repeated restarts")
+
+
+def sync_transactions(client: Any, access_token: str, store: Any, timeout: float | None = None) -> dict[str, Any]:
+    """Apply every change since the item's stored cursor, then read its transactions from the store.
+    Returns {transactions, added, removed}."""
+    key = item_key(access_token)
+    upserts, removed, cursor = _fetch_changes(client, access_token, store.get_cursor(key), timeout)
+    store.apply(key, upserts, removed, cursor)
+    logger.info("Plaid sync: %d added/modified, %d removed", len(upserts), len(removed))
+    transactions = TransactionBatch()
+    for r in store.transactions(key):
+        transactions.append(r["date"], r["description"], r["amount"], category=r["category"])
+    return {"transactions": transactions, "added": len(upserts), "removed": len(removed)}
+
+
+_store: Any = None
+
+
+def _create_store() -> Any:
+    backend = PLAID_STORE_BACKEND
+    if backend == "memory":
+        return MemoryStore()
+    if backend == "dir":
+        return DirectoryStore(PLAID_STORE_DIR)
+    if backend not in ("", "supabase"):
+        raise ValueError(f"Unknown PLAID_STORE_BACKEND: {backend!r}")
+    from .supabase_client import get_supabase
+    supabase = get_supabase()
+    if supabase is not None:
+        return SupabaseStore(supabase)
+    if backend == "supabase":
+        # A lost cursor means the next sync pulls the item's whole history
+        raise RuntimeError("PLAID_STORE_BACKEND=supabase but Supabase is not configured")
+    logger.warning("Supabase is not configured; keeping Plaid sync state in %s", PLAID_STORE_DIR)
+    return DirectoryStore(PLAID_STORE_DIR)
+
+
+def get_transaction_store() -> Any:
+    """Process-wide store configured from the environment."""
+    global _store
+    if _store is None:
+        _store = _create_store()
+    return _store
@@ -0,0 +1,475 @@
+"""
+Offline bulk reprocessing: re-run the parsers and the analysis over a statement corpus after
+a template or CATEGORY_KEYWORDS change, without anyone re-uploading.
+
+    python -m api.reprocess pdfs DIR -o out.jsonl [--previous old.jsonl] [--resume]
+    python -m api.reprocess statements -o out.parquet [--format parquet] [--resume]
+
+"pdfs" parses and analyzes every PDF under DIR. "statements" exports all user_statements rows
+and re-analyzes their stored transactions (the PDFs themselves are not kept, so they can't be
+re-parsed). Work is sent to a process pool in chunks; results are written as they arrive, as
+JSONL or as a directory of Parquet parts (needs pyarrow). Both are their own checkpoint:
+--resume skips every id already written. --previous compares each record with an earlier
+output and reports what changed. Throughput (statements, pages and transactions per second)
+is printed while running.
+"""
+import argparse
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+from dotenv import load_dotenv
+
+_ROOT = Path(__file__).resolve().parent.parent
+
+# Same configuration sources as the API, loaded before the modules below read them
+load_dotenv(dotenv_path=_ROOT / ".env")
+if (_ROOT / ".env.local").exists():
+    load_dotenv(dotenv_path=_ROOT / ".env.local", override=True)
+
+from .analysis import PARTIAL_VERSION, analyze_transactions  # noqa: E402
+from .logging_setup import configure_logging, shutdown_logging  # noqa: E402
+from .parsers import PARSER_VERSION  # noqa: E402
+from .responses import json_bytes  # noqa: E402
+from .timing import collect  # noqa: E402
+from .transactions import json_default  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 16
+# user_statements rows fetched per request (keyset pagination on id)
+STATEMENT_PAGE_SIZE = 500
+# Parquet rows per part file (at most); a part is also cut, and JSONL fsynced, this often
+PARQUET_PART_ROWS = 5000
+CHECKPOINT_SECONDS = 30
+PROGRESS_SECONDS = 5
+COLUMNS = ("id", "source", "filename", "user_id", "sha256", "bank", "pages", "transaction_count",
+           "transactions", "analysis", "seconds", "error", "diff")
+# Serialized as JSON strings in Parquet, so parts written by different versions share a schema
+JSON_COLUMNS = ("transactions", "analysis", "diff")
+
+
+# --- Work items and workers -------------------------------------------------------------
+
+def iter_pdfs(root: Path) -> Iterator[dict[str, Any]]:
+    """{id: path relative to root, path} for every .pdf under root, in path order."""
+    for path in sorted(p for p in root.rglob("*") if p.suffix.lower() == ".pdf" and p.is_file()):
+        yield {"id": path.relative_to(root).as_posix(), "path": str(path)}
+
+
+def iter_statement_rows(page_size: int = STATEMENT_PAGE_SIZE) -> Iterator[dict[str, Any]]:
+    """Every user_statements row, in id order, a page at a time."""
+    from .supabase_client import get_supabase
+
+    supabase = get_supabase()
+    if supabase is None:
+        raise SystemExit("Supabase is not configured (SUPABASE_URL and SUPABASE_SECRET_KEY)")
+    last_id = None
+    while True:
+        query = (supabase.table("user_statements").select("id, user_id, filename, transactions")
+                 .order("id").limit(page_size))
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data or []
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def _record(item_id: str, source: str, **fields: Any) -> dict[str, Any]:
+    record = dict.fromkeys(COLUMNS)
+    record.update(id=item_id, source=source, **fields)
+    return record
+
+
+def reparse_chunk(items: list[dict]) -> list[dict]:
+    """Parse and analyze a chunk of PDFs (runs in a pool worker)."""
+    from .parsers.registry import parse_statement
+
+    records = []
+    for item in items:
+        path = Path(item["path"])
+        record = _record(item["id"], "pdf", filename=path.name)
+        start = time.perf_counter()
+        try:
+            record["sha256"] = hashlib.sha256(path.read_bytes()).hexdigest()
+            transactions, timings = collect(parse_statement, str(path))
+            record.update(bank=timings["labels"].get("bank"), pages=timings["labels"].get("pages"),
+                          transaction_count=len(transactions), transactions=transactions,
+                          analysis=analyze_transactions(transactions))
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["seconds"] = round(time.perf_counter() - start, 4)
+        records.append(record)
+    return records
+
+
+def reanalyze_chunk(rows: list[dict]) -> list[dict]:
+    """Analyze a chunk of user_statements rows' stored transactions (runs in a pool worker)."""
+    records = []
+    for row in rows:
+        transactions = row.get("transactions") or []
+        transactions = transactions if isinstance(transactions, list) else []
+        record = _record(row["id"], "user_statements", filename=row.get("filename"), user_id=row.get("user_id"),
+                         transaction_count=len(transactions), transactions=transactions)
+        start = time.perf_counter()
+        try:
+            record["analysis"] = analyze_transactions(transactions)
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["seconds"] = round(time.perf_counter() - start, 4)
+        records.append(record)
+    return records
+
+
+def chunked(items: Iterable[dict], size: int, skip: set[str], limit: int | None = None) -> Iterator[list[dict]]:
+    chunk, taken = [], 0
+    for item in items:
+        if item["id"] in skip:
+            continue
+        if limit is not None and taken >= limit:
+            break
+        chunk.append(item)
+        taken += 1
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_pool(worker: Callable[[list[dict]], list[dict]], chunks: Iterator[list[dict]],
+             workers: int) -> Iterator[list[dict]]:
+    """Results of worker(chunk) in completion order. At most two chunks per process are in
+    flight, so a source that pages from the database is read only as fast as it is processed."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: set[Future] = set()
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < 2 * workers:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                else:
+                    pending.add(pool.submit(worker, chunk))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+# --- Output --------------------------------------------------------------------------------
+
+class JsonlSink:
+    """One record per line, appended as chunks finish."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = None
+        self._synced = time.monotonic()
+
+    def done_ids(self) -> set[str]:
+        """Ids already written; a line cut off by a crash is dropped so it gets redone."""
+        if not self.path.exists():
+            return set()
+        ids, good_bytes = set(), 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    ids.add(json.loads(line)["id"])
+                except (ValueError, KeyError):
+                    break
+                good_bytes += len(line)
+        if good_bytes < self.path.stat().st_size:
+            with open(self.path, "rb+") as f:
+                f.truncate(good_bytes)
+        return ids
+
+    def write(self, records: list[dict]) -> None:
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "ab")
+        self._file.write(b"".join(json_bytes(r) + b"\n" for r in records))
+        self._file.flush()
+        if time.monotonic() - self._synced >= CHECKPOINT_SECONDS:
+            os.fsync(self._file.fileno())
+            self._synced = time.monotonic()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+
+class ParquetSink:
+    """A directory of part-NNNNN.parquet files of up to PARQUET_PART_ROWS rows each. The parts
+    are also the resume checkpoint: a part is cut at least every CHECKPOINT_SECONDS and made
+    durable before it becomes visible, so a crash only loses buffered rows, which resume redoes."""
+
+    def __init__(self, path: Path, part_rows: int = PARQUET_PART_ROWS):
+        if importlib.util.find_spec("pyarrow") is None:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow)")
+        self.path = path
+        self.part_rows = part_rows
+        self._buffer: list[dict] = []
+        self._flushed = time.monotonic()
+
+    def _parts(self) -> list[Path]:
+        return sorted(self.path.glob("part-*.parquet")) if self.path.is_dir() else []
+
+    def done_ids(self) -> set[str]:
+        import pyarrow.parquet as pq
+
+        return {i for part in self._parts() for i in pq.read_table(part, columns=["id"]).column("id").to_pylist()}
+
+    def write(self, records: list[dict]) -> None:
+        self._buffer.extend(records)
+        if len(self._buffer) >= self.part_rows or time.monotonic() - self._flushed >= CHECKPOINT_SECONDS:
+            self._flush()
+
+    def _flush(self) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._flushed = time.monotonic()
+        if not self._buffer:
+            return
+        rows = [{k: (json.dumps(r[k], default=json_default) if k in JSON_COLUMNS and r[k] is not None else r[k]) for k in COLUMNS}
+                for r in self._buffer]
+        schema = pa.schema([
+            (k, pa.int64() if k in ("pages", "transaction_count") else pa.float64() if k == "seconds" else pa.string())
+            for k in COLUMNS
+        ])
+        self.path.mkdir(parents=True, exist_ok=True)
+        target = self.path / f"part-{len(self._parts()):05d}.parquet"
+        # Write, fsync, rename: a part is either complete or absent, so resume can trust every part
+        tmp = target.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pq.write_table(pa.Table.from_pylist(rows, schema=schema), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, target)
+        _fsync_dir(self.path)
+        self._buffer = []
+
+    def close(self) -> None:
+        self._flush()
+
+
+def _fsync_dir(path: Path) -> None:
+    # Makes a rename durable; directories can't be opened for fsync on every platform
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_records(path: Path) -> Iterator[dict]:
+    """Records of an earlier JSONL file or Parquet directory."""
+    if path.is_dir():
+        import pyarrow.parquet as pq
+
+        for part in sorted(path.glob("part-*.parquet")):
+            for r in pq.read_table(part).to_pylist():
+                yield {k: (json.loads(r[k]) if k in JSON_COLUMNS and r.get(k) else r.get(k)) for k in COLUMNS}
+        return
+    with open(path, "rb") as f:
+        for line in f:
+            if line.endswith(b"\n"):
+                yield json.loads(line)
+
+
+# --- Diffs and progress --------------------------------------------------------------------
+
+def _digest(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, separators=(",", ":"), default=json_default).encode()).hexdigest()
+
+
+def _summary(record: dict) -> tuple:
+    analysis = record.get("analysis") or {}
+    return (_digest(record.get("transactions")), _digest(analysis), record.get("transaction_count") or 0,
+            analysis.get("by_category") or {}, record.get("error"))
+
+
+class Comparison:
+    """Compares records with an earlier run. Keeps only digests and category totals of the
+    earlier records in memory, not their transactions."""
+
+    def __init__(self, previous: Iterable[dict]):
+        self.previous = {r["id"]: _summary(r) for r in previous}
+        self.counts = {"new": 0, "unchanged": 0, "changed": 0, "transactions_changed": 0,
+                       "analysis_changed": 0, "newly_failing": 0, "fixed": 0}
+        self.transaction_delta = 0
+        self.category_before: dict[str, float] = {}
+        self.category_after: dict[str, float] = {}
+        self.seen: set[str] = set()
+        self.examples: list[str] = []
+
+    def annotate(self, record: dict) -> None:
+        """Set record["diff"] and add it to the totals."""
+        self.seen.add(record["id"])
+        before = self.previous.get(record["id"])
+        if before is None:
+            self.counts["new"] += 1
+            record["diff"] = {"status": "new"}
+            return
+        after = _summary(record)
+        diff = {
+            "transactions": before[0] != after[0],
+            "analysis": before[1] != after[1],
+            "error": before[4] != after[4],
+            "transaction_count_delta": after[2] - before[2],
+        }
+        if before[4] is None and after[4] is not None:
+            self.counts["newly_failing"] += 1
+        if before[4] is not None and after[4] is None:
+            self.counts["fixed"] += 1
+        changed = diff["transactions"] or diff["analysis"] or diff["error"]
+        diff["status"] = "changed" if changed else "unchanged"
+        self.counts[diff["status"]] += 1
+        self.counts["transactions_changed"] += diff["transactions"]
+        self.counts["analysis_changed"] += diff["analysis"]
+        self.transaction_delta += diff["transaction_count_delta"]
+        for totals, by_category in ((self.category_before, before[3]), (self.category_after, after[3])):
+            for category, amount in by_category.items():
+                totals[category] = totals.get(category, 0.0) + amount
+        if changed and len(self.examples) < 10:
+            self.examples.append(record["id"])
+        record["diff"] = diff
+
+    def report(self, resumed: set[str]) -> dict[str, Any]:
+        missing = len(self.previous.keys() - self.seen - resumed)
+        categories = {
+            c: {"before": round(self.category_before.get(c, 0.0), 2), "after": round(self.category_after.get(c, 0.0), 2)}
+            for c in sorted(self.category_before.keys() | self.category_after.keys())
+            if abs(self.category_before.get(c, 0.0) - self.category_after.get(c, 0.0)) >= 0.005
+        }
+        return {**self.counts, "missing": missing, "transaction_count_delta": self.transaction_delta,
+                "category_totals_changed": categories, "examples": self.examples}
+
+
+class Progress:
+    """Running totals and throughput."""
+
+    def __init__(self, total: int | None = None):
+        self.total = total
+        self.start = time.perf_counter()
+        self.statements = self.pages = self.transactions = self.errors = 0
+        self._reported = self.start
+
+    def add(self, records: list[dict]) -> None:
+        for r in records:
+            self.statements += 1
+            self.pages += r.get("pages") or 0
+            self.transactions += r.get("transaction_count") or 0
+            self.errors += r.get("error") is not None
+        now = time.perf_counter()
+        if now - self._reported >= PROGRESS_SECONDS:
+            self._reported = now
+            print(self.line(), file=sys.stderr, flush=True)
+
+    def rates(self) -> dict[str, float]:
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return {
+            "seconds": round(elapsed, 2),
+            "statements_per_second": round(self.statements / elapsed, 2),
+            "pages_per_second": round(self.pages / elapsed, 2),
+            "transactions_per_second": round(self.transactions / elapsed, 2),
+        }
+
+    def line(self) -> str:
+        r = self.rates()
+        of = f"/{self.total}" if self.total is not None else ""
+        return (f"{self.statements}{of} statements  {r['statements_per_second']:.1f}/s  "
+                f"{r['pages_per_second']:.1f} pages/s  {r['transactions_per_second']:.0f} tx/s  "
+                f"errors {self.errors}  {r['seconds']:.0f}s")
+
+
+# --- CLI -----------------------------------------------------------------------------------
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", choices=("pdfs", "statements"))
+    parser.add_argument("directory", nargs="?", type=Path, help="PDF corpus root (pdfs)")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="JSONL file or Parquet directory")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), help="default: from the output name")
+    parser.add_argument("--resume", action="store_true", help="skip ids already in the output")
+    parser.add_argument("--previous", type=Path, help="earlier output to compare against")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--limit", type=int, help="process at most this many statements")
+    parser.add_argument("--report", type=Path, help="also write the final summary here as JSON")
+    args = parser.parse_args(argv)
+
+    if args.source == "pdfs" and (args.directory is None or not args.directory.is_dir()):
+        parser.error("pdfs needs the corpus directory")
+    fmt = args.format or ("jsonl" if args.output.suffix == ".jsonl" else "parquet")
+    if args.output.exists() and not args.resume:
+        parser.error(f"{args.output} exists; pass --resume to continue it or remove it")
+
+    configure_logging(None)
+    if "LOG_LEVEL" not in os.environ:
+        # Per-statement parser logs would drown the progress lines
+        logging.getLogger().setLevel(logging.WARNING)
+
+    sink = JsonlSink(args.output) if fmt == "jsonl" else ParquetSink(args.output)
+    resumed = sink.done_ids() if args.resume else set()
+    comparison = Comparison(read_records(args.previous)) if args.previous else None
+    if args.source == "pdfs":
+        items = list(iter_pdfs(args.directory))
+        total = len([i for i in items if i["id"] not in resumed])
+        worker = reparse_chunk
+    else:
+        items, total, worker = iter_statement_rows(), None, reanalyze_chunk
+    if args.limit is not None and total is not None:
+        total = min(total, args.limit)
+    print(f"{args.source}: {len(resumed)} already done, writing {fmt} to {args.output} "
+          f"(parser {PARSER_VERSION}, categories {PARTIAL_VERSION})", file=sys.stderr)
+
+    chunk_size = args.chunk_size
+    if total is not None:
+        # Small corpora: smaller chunks so every worker gets some
+        chunk_size = max(1, min(chunk_size, total // (4 * args.workers)))
+    progress = Progress(total)
+    try:
+        for records in run_pool(worker, chunked(items, chunk_size, resumed, args.limit), args.workers):
+            if comparison is not None:
+                for record in records:
+                    comparison.annotate(record)
+            sink.write(records)
+            progress.add(records)
+    finally:
+        sink.close()
+        shutdown_logging()
+
+    summary = {"source": args.source, "output": str(args.output), "resumed": len(resumed),
+               "statements": progress.statements, "pages": progress.pages,
+               "transactions": progress.transactions, "errors": progress.errors, **progress.rates()}
+    if comparison is not None:
+        summary["diff"] = comparison.report(resumed)
+    print(progress.line(), file=sys.stderr)
+    print(json.dumps(summary, indent=2))
+    if args.report:
+        args.report.write_text(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
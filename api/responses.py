@@ -0,0 +1,133 @@
+"""
+Response encoding for transaction-heavy endpoints: orjson instead of jsonable_encoder + json,
+gzip/brotli negotiated on Accept-Encoding, and index ranges in place of repeated rows.
+"""
+import json
+import os
+from typing import Any
+
+import anyio.to_thread
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder, IdentityResponder
+
+from .transactions import TransactionBatch, json_default
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE") or 1024)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+# Larger bodies are compressed on a worker thread instead of the event loop
+THREAD_MIN_SIZE = 128 * 1024
+# Rows turned into dicts per orjson call when a TransactionBatch is encoded
+BATCH_CHUNK_ROWS = 1000
+
+# orjson >= 3.9 embeds pre-encoded JSON
+_Fragment = getattr(orjson, "Fragment", None)
+
+
+def _batch_json(batch: TransactionBatch) -> bytes:
+    """A batch's JSON array, encoded BATCH_CHUNK_ROWS rows at a time so the whole batch never
+    exists as dicts at once."""
+    parts = [b"["]
+    for start in range(0, len(batch), BATCH_CHUNK_ROWS):
+        if start:
+            parts.append(b",")
+        parts.append(orjson.dumps(batch.to_dicts(start, start + BATCH_CHUNK_ROWS))[1:-1])
+    parts.append(b"]")
+    return b"".join(parts)
+
+
+def _orjson_default(obj: Any) -> Any:
+    if _Fragment is not None and isinstance(obj, TransactionBatch):
+        return _Fragment(_batch_json(obj))
+    return json_default(obj)
+
+
+def json_bytes(content: Any) -> bytes:
+    """Compact JSON. Dates become ISO strings, TransactionBatches lists of rows; other unknown
+    types fall back to str()."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_orjson_default)
+    return json.dumps(content, separators=(",", ":"), default=json_default).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that encodes plain dicts/lists directly. Return it from a handler to
+    skip FastAPI's jsonable_encoder pass over every transaction."""
+
+    def render(self, content: Any) -> bytes:
+        return json_bytes(content)
+
+
+def index_ranges(groups: list[dict], key: str = "transactions") -> list[dict]:
+    """Replace each group's rows with {key}_range = [start, end) into the concatenation of all
+    groups' rows, for responses that already carry that concatenation at the top level."""
+    start = 0
+    for group in groups:
+        rows = group.pop(key, None)
+        count = len(rows) if isinstance(rows, (list, TransactionBatch)) else 0
+        group[f"{key}_range"] = [start, start + count]
+        start += count
+    return groups
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int = BROTLI_QUALITY):
+        super().__init__(app, minimum_size)
+        self._compressor = None
+        self.quality = quality
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=self.quality)
+        data = self._compressor.process(body)
+        return data + (self._compressor.flush() if more_body else self._compressor.finish())
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if len(body) >= THREAD_MIN_SIZE:
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip() == coding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Starlette's GZipMiddleware, preferring brotli when the client accepts it and the
+    brotli package is installed. Streaming responses (NDJSON) are flushed chunk by chunk."""
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=GZIP_LEVEL,
+                         thread_minimum_size=THREAD_MIN_SIZE)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        if brotli is not None and _accepts(accept, "br"):
+            responder = BrotliResponder(self.app, self.minimum_size)
+        elif _accepts(accept, "gzip"):
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel,
+                                      thread_minimum_size=self.thread_minimum_size)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
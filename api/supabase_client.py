@@ -1,11 +1,33 @@
 """Supabase client for backend. Uses secret key for admin operations."""
 import os
-from supabase import create_client
+import threading
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 # Prefer new secret key (sb_secret_...); fallback to legacy service_role for compatibility
 SUPABASE_SECRET_KEY = os.getenv("SUPABASE_SECRET_KEY") or os.getenv("SUPABASE_SERVICE_KEY")
+# Seconds before a database request gives up (the library default is 120)
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT") or 15)
 
-supabase = None
-if SUPABASE_URL and SUPABASE_SECRET_KEY:
-    supabase = create_client(SUPABASE_URL, SUPABASE_SECRET_KEY)
+_client = None
+_lock = threading.Lock()
+
+
+def get_supabase():
+    """Shared client, created on first use (the supabase package is slow to import).
+    None when Supabase is not configured or not installed."""
+    global _client
+    if not (SUPABASE_URL and SUPABASE_SECRET_KEY):
+        return None
+    with _lock:
+        if _client is None:
+            try:
+                from supabase import ClientOptions, create_client
+            except ImportError:
+                return None
+            # One client per process: its HTTP session keeps connections alive across requests
+            _client = create_client(
+                SUPABASE_URL,
+                SUPABASE_SECRET_KEY,
+                options=ClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT),
+            )
+        return _client
@@ -0,0 +1,345 @@
+"""
+Per-request stage timing. Stages (pdf open, detect_bank, page extraction, template and
+fallback parsing, analysis, Supabase/Plaid round-trips, JWT verification) are reported in a
+Server-Timing response header and fed into histograms served in Prometheus text format.
+A sample of slow requests can optionally be profiled with cProfile.
+
+Outside a timed request (scripts, benchmarks, TIMING_ENABLED=0) a stage is a ContextVar
+lookup and nothing else. Metrics are per process.
+"""
+import cProfile
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterator
+
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+# TIMING_ENABLED: "0" turns off the middleware (no header, no metrics)
+# METRICS_TOKEN: /api/metrics requires "Authorization: Bearer <token>"; unset = endpoint disabled
+# PROFILE_SLOW_MS: dump a cProfile of sampled requests (and parses) slower than this; 0 = off
+# PROFILE_SAMPLE_RATE: fraction of requests and parses profiled when PROFILE_SLOW_MS is set
+# PROFILE_DIR: where .prof files go
+TIMING_ENABLED = os.getenv("TIMING_ENABLED", "1") != "0"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS") or 0)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE") or 0.05)
+PROFILE_DIR = os.getenv("PROFILE_DIR") or str(Path(tempfile.gettempdir()) / "twoloonies-profiles")
+
+METRIC_PREFIX = "twoloonies"
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Page-count label values for parse latency (upper bounds)
+PAGE_BUCKETS = (1, 2, 5, 10, 25, 50)
+
+
+class Timings:
+    """Stage durations for one request (or one parse in a worker): name -> [seconds, calls]."""
+
+    __slots__ = ("stages", "labels")
+
+    def __init__(self):
+        self.stages: dict[str, list] = {}
+        self.labels: dict[str, Any] = {}
+
+    def add(self, name: str, seconds: float, calls: int = 1) -> None:
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [seconds, calls]
+        else:
+            entry[0] += seconds
+            entry[1] += calls
+
+    def merge(self, data: dict) -> None:
+        for name, (seconds, calls) in data.get("stages", {}).items():
+            self.add(name, seconds, calls)
+
+    def server_timing(self, total: float | None = None) -> str:
+        """Header value; a stage hit more than once reports its summed time and call count."""
+        parts = [
+            f'{name};dur={seconds * 1000:.1f}' + (f';desc="{calls}x"' if calls > 1 else "")
+            for name, (seconds, calls) in self.stages.items()
+        ]
+        if total is not None:
+            parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: contextvars.ContextVar[Timings | None] = contextvars.ContextVar("timings", default=None)
+
+
+class stage:
+    """Time a block, or every call of a function, as a named stage of the current request.
+
+        with stage("detect_bank"): ...
+
+        @stage("analyze")
+        def analyze_transactions(...): ...
+
+    Stages nest; each reports its own inclusive time.
+    """
+
+    __slots__ = ("name", "_timings", "_start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "stage":
+        self._timings = _current.get()
+        if self._timings is not None:
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._timings is not None:
+            self._timings.add(self.name, time.perf_counter() - self._start)
+
+    def __call__(self, func: Callable) -> Callable:
+        name = self.name
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+async def timed(name: str, awaitable: Awaitable) -> Any:
+    """Await as a stage; for awaitables handed to asyncio.gather alongside other work."""
+    with stage(name):
+        return await awaitable
+
+
+def label(**labels: Any) -> None:
+    """Attach facts about the current parse (bank, pages, fallback) for the parse metrics."""
+    timings = _current.get()
+    if timings is not None:
+        timings.labels.update(labels)
+
+
+_profile_lock = threading.Lock()
+
+
+def _reset_profile_lock() -> None:
+    # A parse worker forked mid-request would otherwise inherit the lock held
+    global _profile_lock
+    _profile_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_profile_lock)
+
+
+@contextmanager
+def _profiled(name: str, alone: Callable[[], bool] | None = None) -> Iterator[None]:
+    """cProfile a PROFILE_SAMPLE_RATE sample of blocks when PROFILE_SLOW_MS is set; keep the
+    dump only if it was slow. One profile at a time per process. The profiler sees everything
+    on its thread, so for requests on the event loop alone() says whether no other request ran
+    during the block; a profile mixed with other requests is dropped."""
+    if (not PROFILE_SLOW_MS or (alone is not None and not alone())
+            or random.random() >= PROFILE_SAMPLE_RATE or not _profile_lock.acquire(blocking=False)):
+        yield
+        return
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        yield
+    finally:
+        profiler.disable()
+        _profile_lock.release()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms >= PROFILE_SLOW_MS and alone is not None and not alone():
+            logger.debug("Dropped profile of slow %s (%.0f ms): other requests overlapped", name, elapsed_ms)
+        elif elapsed_ms >= PROFILE_SLOW_MS:
+            Path(PROFILE_DIR).mkdir(parents=True, exist_ok=True)
+            slug = re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_")
+            path = Path(PROFILE_DIR) / f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{elapsed_ms:.0f}ms.prof"
+            profiler.dump_stats(path)
+            logger.info("Profiled slow %s (%.0f ms): %s", name, elapsed_ms, path)
+
+
+def collect(func: Callable[..., Any], *args: Any) -> tuple[Any, dict]:
+    """Run func(*args) under its own Timings and return (result, {seconds, stages, labels}).
+    Module-level so it can be sent to the parse worker pool; the caller merges the timings."""
+    timings = Timings()
+    token = _current.set(timings)
+    start = time.perf_counter()
+    try:
+        with _profiled(f"parse {getattr(func, '__name__', 'call')}"):
+            result = func(*args)
+    finally:
+        _current.reset(token)
+    return result, {
+        "seconds": time.perf_counter() - start,
+        "stages": timings.stages,
+        "labels": timings.labels,
+    }
+
+
+class Histogram:
+    """Prometheus histogram with a fixed label set."""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...],
+                 buckets: tuple[float, ...] = SECONDS_BUCKETS):
+        self.name = f"{METRIC_PREFIX}_{name}"
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: Any) -> None:
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def exposition(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for key, counts in sorted(series.items()):
+            labels = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.label_names, key))
+            sep = "," if labels else ""
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {counts[-2]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {counts[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {counts[-2]}")
+        return lines
+
+
+class Counter:
+    """Prometheus counter with a fixed label set."""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...]):
+        self.name = f"{METRIC_PREFIX}_{name}"
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: Any, amount: float = 1) -> None:
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def exposition(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            labels = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.label_names, key))
+            lines.append(f"{self.name}{{{labels}}} {value:g}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_SECONDS = Histogram("request_duration_seconds", "HTTP request latency.", ("method", "route", "status"))
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Time per request spent in each stage.", ("stage",))
+PARSE_SECONDS = Histogram("statement_parse_duration_seconds", "Statement parse latency by detected bank and page count.",
+                          ("bank", "pages"))
+PARSE_FALLBACKS = Counter("statement_parse_fallbacks_total",
+                          "Parses where the bank template found nothing and the generic parser ran.", ("bank",))
+METRICS = (REQUEST_SECONDS, STAGE_SECONDS, PARSE_SECONDS, PARSE_FALLBACKS)
+
+
+def _pages_label(pages: Any) -> str:
+    if not isinstance(pages, int):
+        return "unknown"
+    lower = 1
+    for bound in PAGE_BUCKETS:
+        if pages <= bound:
+            return str(bound) if lower == bound else f"{lower}-{bound}"
+        lower = bound + 1
+    return f"{lower}+"
+
+
+def record_parse(data: dict) -> None:
+    """Merge a worker's collect() timings into the current request and the parse metrics."""
+    timings = _current.get()
+    if timings is not None:
+        timings.merge(data)
+    labels = data.get("labels", {})
+    bank = labels.get("bank", "unknown")
+    PARSE_SECONDS.observe(data["seconds"], bank, _pages_label(labels.get("pages")))
+    if labels.get("fallback"):
+        PARSE_FALLBACKS.inc(bank)
+
+
+def metrics_text() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.exposition()) + "\n"
+
+
+class TimingMiddleware:
+    """ASGI middleware: a Timings per HTTP request, the Server-Timing header on the response and
+    request/stage histograms once the body is sent. Stages that finish after the headers go out
+    (streamed bodies) still reach the histograms."""
+
+    def __init__(self, app):
+        self.app = app
+        # Requests running and requests started so far, for _profiled's alone() (loop thread only)
+        self.in_flight = 0
+        self.arrivals = 0
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = Timings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        status = 500
+        self.in_flight += 1
+        self.arrivals += 1
+        arrival = self.arrivals
+        was_alone = self.in_flight == 1
+
+        def alone() -> bool:
+            return was_alone and self.arrivals == arrival
+
+        async def send_with_timing(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append(
+                    "Server-Timing", timings.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            with _profiled(f"{scope['method']} {scope['path']}", alone):
+                await self.app(scope, receive, send_with_timing)
+        finally:
+            self.in_flight -= 1
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], route, status)
+            for name, (seconds, _) in timings.stages.items():
+                STAGE_SECONDS.observe(seconds, name)
@@ -0,0 +1,181 @@
+"""
+Compact transaction lists. A TransactionBatch keeps transactions as parallel columns instead
+of one dict per row: amounts in a float64 array, dates and descriptions as interned strings,
+and any other key (category, transaction_id, ...) in an optional column. Parsers build
+batches, the analysis reads the columns directly, and rows become dicts only when a response,
+cache entry or job record is serialized (json_default).
+"""
+import sys
+from array import array
+from typing import Any, Iterable, Iterator
+
+
+class _Absent:
+    """Value of an optional column for a row that doesn't have the key."""
+
+    __slots__ = ()
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return "ABSENT"
+
+    def __reduce__(self) -> str:
+        # Pickled by name, so batches sent to pool workers keep the singleton
+        return "ABSENT"
+
+
+ABSENT = _Absent()
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+class TransactionBatch:
+    """Transactions in the common format ({date, description, amount, ...}) as columns.
+
+    description is stored normalized the way the analysis reads it (stripped, "Unknown" when
+    empty) and amount as a float. Iterating or indexing yields dicts; slicing and take()
+    return batches."""
+
+    __slots__ = ("dates", "descriptions", "amounts", "extra")
+
+    def __init__(self) -> None:
+        self.dates: list[Any] = []
+        self.descriptions: list[str] = []
+        self.amounts = array("d")
+        self.extra: dict[str, list[Any]] = {}
+
+    def append(self, date: Any, description: str, amount: float, **extra: Any) -> None:
+        n = len(self.amounts)
+        self.dates.append(_intern(date))
+        self.descriptions.append(sys.intern((description or "Unknown").strip()))
+        self.amounts.append(float(amount))
+        for key, value in extra.items():
+            column = self.extra.get(key)
+            if column is None:
+                column = self.extra[key] = [ABSENT] * n
+            column.append(_intern(value))
+        for key, column in self.extra.items():
+            if len(column) == n:
+                column.append(ABSENT)
+
+    @classmethod
+    def from_dicts(cls, rows: Iterable[dict[str, Any]]) -> "TransactionBatch":
+        """Batch of common-format dicts (parsed, stored or Plaid rows); extra keys are kept."""
+        batch = cls()
+        extra = batch.extra
+        add_date, add_description, add_amount = batch.dates.append, batch.descriptions.append, batch.amounts.append
+        intern = sys.intern
+        for n, t in enumerate(rows):
+            add_amount(float(t.get("amount", 0)))
+            add_description(intern((t.get("description") or t.get("name") or "Unknown").strip()))
+            date = t.get("date")
+            add_date(intern(date) if type(date) is str else date)
+            if len(t) != 3 or "date" not in t or "description" not in t or "amount" not in t:
+                for key, value in t.items():
+                    if key in ("date", "description", "amount"):
+                        continue
+                    column = extra.get(key)
+                    if column is None:
+                        column = extra[key] = [ABSENT] * n
+                    column.append(_intern(value))
+            if extra:
+                for column in extra.values():
+                    if len(column) == n:
+                        column.append(ABSENT)
+        return batch
+
+    @classmethod
+    def concat(cls, parts: Iterable["TransactionBatch | list[dict[str, Any]]"]) -> "TransactionBatch":
+        """One batch of several batches (or lists of dicts), in order."""
+        batch = cls()
+        n = 0
+        for part in parts:
+            if not isinstance(part, TransactionBatch):
+                part = cls.from_dicts(part)
+            size = len(part)
+            batch.dates.extend(part.dates)
+            batch.descriptions.extend(part.descriptions)
+            batch.amounts.extend(part.amounts)
+            for key in part.extra.keys() | batch.extra.keys():
+                column = batch.extra.get(key)
+                if column is None:
+                    column = batch.extra[key] = [ABSENT] * n
+                column.extend(part.extra.get(key) or [ABSENT] * size)
+            n += size
+        return batch
+
+    def take(self, indices: Iterable[int]) -> "TransactionBatch":
+        """Batch of the rows at these positions, in that order."""
+        indices = list(indices)
+        batch = TransactionBatch()
+        dates, descriptions, amounts = self.dates, self.descriptions, self.amounts
+        batch.dates = [dates[i] for i in indices]
+        batch.descriptions = [descriptions[i] for i in indices]
+        batch.amounts = array("d", [amounts[i] for i in indices])
+        batch.extra = {key: [column[i] for i in indices] for key, column in self.extra.items()}
+        return batch
+
+    def column(self, key: str) -> list[Any] | None:
+        """An optional column (e.g. "category"); None when no row has the key."""
+        return self.extra.get(key)
+
+    def row(self, i: int) -> dict[str, Any]:
+        t = {"date": self.dates[i], "description": self.descriptions[i], "amount": self.amounts[i]}
+        for key, column in self.extra.items():
+            value = column[i]
+            if value is not ABSENT:
+                t[key] = value
+        return t
+
+    def to_dicts(self, start: int = 0, stop: int | None = None) -> list[dict[str, Any]]:
+        """Rows [start, stop) as dicts."""
+        start, stop, _ = slice(start, stop).indices(len(self.amounts))
+        if not self.extra:
+            return [
+                {"date": d, "description": desc, "amount": a}
+                for d, desc, a in zip(self.dates[start:stop], self.descriptions[start:stop], self.amounts[start:stop])
+            ]
+        return [self.row(i) for i in range(start, stop)]
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        return map(self.row, range(len(self.amounts)))
+
+    def __getitem__(self, index: int | slice) -> "dict[str, Any] | TransactionBatch":
+        if isinstance(index, slice):
+            return self.take(range(*index.indices(len(self.amounts))))
+        if index < 0:
+            index += len(self.amounts)
+        if not 0 <= index < len(self.amounts):
+            raise IndexError("transaction index out of range")
+        return self.row(index)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, TransactionBatch):
+            other = other.to_dicts()
+        return isinstance(other, list) and self.to_dicts() == other
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"<TransactionBatch {len(self)} rows>"
+
+
+def as_batch(transactions: "TransactionBatch | Iterable[dict[str, Any]] | None") -> TransactionBatch:
+    """The transactions as a batch: batches pass through, dict lists are converted."""
+    if isinstance(transactions, TransactionBatch):
+        return transactions
+    return TransactionBatch.from_dicts(transactions or [])
+
+
+def json_default(obj: Any) -> Any:
+    """default= hook for json/orjson: batches serialize as their dicts, anything else as str()."""
+    if isinstance(obj, TransactionBatch):
+        return obj.to_dicts()
+    return str(obj)
@@ -0,0 +1,148 @@
+"""
+Upload spooling: copy uploaded PDFs to temp files in fixed-size chunks, hashing as we go,
+so a statement is never held in memory as a whole.
+"""
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+CHUNK_SIZE = 64 * 1024
+UPLOAD_FIELDS = ("statements", "statement")
+
+
+class UploadError(Exception):
+    """Malformed multipart body."""
+
+
+def _new_spool(index: int, filename: str) -> dict[str, Any]:
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+    return {
+        "index": index,
+        "filename": filename or f"file_{index}",
+        "path": tmp.name,
+        "size": 0,
+        "sha256": None,
+        "_file": tmp,
+        "_hash": hashlib.sha256(),
+    }
+
+
+def _write(spool: dict[str, Any], data: bytes) -> None:
+    spool["_file"].write(data)
+    spool["_hash"].update(data)
+    spool["size"] += len(data)
+
+
+def _finish(spool: dict[str, Any]) -> dict[str, Any]:
+    spool.pop("_file").close()
+    spool["sha256"] = spool.pop("_hash").hexdigest()
+    return spool
+
+
+def discard(spool: dict[str, Any]) -> None:
+    """Close and delete a spooled upload (finished or not)."""
+    f = spool.pop("_file", None)
+    if f is not None:
+        f.close()
+    Path(spool["path"]).unlink(missing_ok=True)
+
+
+async def spool_upload_file(upload: Any, index: int) -> dict[str, Any]:
+    """Copy a starlette UploadFile to disk chunk by chunk.
+    Returns {index, filename, path, size, sha256}; caller deletes path (see discard)."""
+    spool = _new_spool(index, upload.filename)
+    try:
+        while chunk := await upload.read(CHUNK_SIZE):
+            _write(spool, chunk)
+    except BaseException:
+        discard(spool)
+        raise
+    return _finish(spool)
+
+
+class _MultipartSpooler:
+    """python-multipart callbacks that write file parts straight to temp files."""
+
+    def __init__(self, fields: tuple[str, ...]):
+        self.fields = fields
+        self.completed: list[dict[str, Any]] = []
+        self.open: list[dict[str, Any]] = []
+        self._count = 0
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._current: dict[str, Any] | None = None
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+        self._current = None
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if name in self.fields and b"filename" in options:
+            filename = options[b"filename"].decode("utf-8", "replace")
+            self._current = _new_spool(self._count, filename)
+            self.open.append(self._current)
+            self._count += 1
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._current is not None:
+            _write(self._current, data[start:end])
+
+    def on_part_end(self) -> None:
+        if self._current is not None:
+            self.open.remove(self._current)
+            self.completed.append(_finish(self._current))
+            self._current = None
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+
+async def iter_spooled_uploads(request: Any, fields: tuple[str, ...] = UPLOAD_FIELDS) -> AsyncIterator[dict[str, Any]]:
+    """Parse a multipart request body as it arrives and yield each uploaded file
+    ({index, filename, path, size, sha256}) as soon as its part is complete."""
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise UploadError("Expected multipart/form-data with a boundary")
+    spooler = _MultipartSpooler(fields)
+    parser = MultipartParser(boundary, spooler.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            while spooler.completed:
+                yield spooler.completed.pop(0)
+        parser.finalize()
+        while spooler.completed:
+            yield spooler.completed.pop(0)
+    except FormParserError as e:
+        raise UploadError("Invalid multipart data") from e
+    finally:
+        for spool in spooler.open + spooler.completed:
+            discard(spool)
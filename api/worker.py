@@ -0,0 +1,48 @@
+"""
+Standalone parse job worker: claims jobs queued by /api/upload_statement?job=true and runs
+them, so parse capacity scales apart from the API. Point it at the API's JOB_DIR and run
+the API with JOB_RUNNER=external.
+
+    python -m api.worker [--workers N]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+_ROOT = Path(__file__).resolve().parent.parent
+
+# Same configuration sources as the API, loaded before the modules below read them
+load_dotenv(dotenv_path=_ROOT / ".env")
+if (_ROOT / ".env.local").exists():
+    load_dotenv(dotenv_path=_ROOT / ".env.local", override=True)
+
+from .jobs import JOB_WORKERS, JobRunner, get_job_queue  # noqa: E402
+from .logging_setup import configure_logging, shutdown_logging  # noqa: E402
+from .parse_executor import shutdown_parse_executor  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS, help="jobs run at once")
+    args = parser.parse_args(argv)
+
+    configure_logging(None)
+    runner = JobRunner(get_job_queue(), args.workers)
+    try:
+        asyncio.run(runner.run_forever())
+    except KeyboardInterrupt:
+        logger.info("Worker stopped")
+    finally:
+        shutdown_parse_executor()
+        shutdown_logging()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Cold-start benchmark for the serverless entry point.
+
+Imports api.index in fresh interpreters, reports the slowest modules from
+`python -X importtime`, and fails (exit 1) when the median wall-clock import exceeds
+the budget or a module that should load on first use (pdfplumber, plaid, supabase,
+numpy, jwt) is imported at startup.
+
+    python benchmarks/import_time.py [--runs 5] [--budget-ms 1000] [--top 15] [--json out.json]
+
+IMPORT_BUDGET_MS sets the default budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+ENTRY = "api.index"
+DEFERRED = ("pdfplumber", "plaid", "supabase", "numpy", "jwt")
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS") or 1000)
+
+_TIMED_IMPORT = f"""
+import json, sys, time
+t = time.perf_counter()
+import {ENTRY}
+elapsed = time.perf_counter() - t
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {DEFERRED!r} if m in sys.modules]}}))
+"""
+
+
+def _run(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+
+
+def timed_import() -> dict:
+    """Wall-clock import of the entry point in a fresh interpreter."""
+    return json.loads(_run("-c", _TIMED_IMPORT).stdout.strip().splitlines()[-1])
+
+
+def importtime_report() -> list[dict]:
+    """Per-module rows from -X importtime: {module, self_us, cumulative_us, depth}."""
+    rows = []
+    for line in _run("-X", "importtime", "-c", f"import {ENTRY}").stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+        })
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args(argv)
+
+    runs = [timed_import() for _ in range(args.runs)]
+    median_ms = statistics.median(r["ms"] for r in runs)
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    report = importtime_report()
+
+    print(f"import {ENTRY}: median {median_ms:.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print(f"\nSlowest modules by cumulative time (top {args.top}):")
+    for row in sorted(report, key=lambda r: -r["cumulative_us"])[:args.top]:
+        print(f"  {row['cumulative_us'] / 1000:8.1f} ms  {'  ' * row['depth']}{row['module']}")
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"median import {median_ms:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+    if loaded:
+        failures.append(f"deferred modules imported at startup: {', '.join(loaded)}")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps({
+            "entry": ENTRY,
+            "runs_ms": [round(r["ms"], 2) for r in runs],
+            "median_ms": round(median_ms, 2),
+            "budget_ms": args.budget_ms,
+            "deferred_loaded": loaded,
+            "modules": report,
+            "failures": failures,
+        }, indent=2))
+
+    for failure in failures:
+        print(f"\nFAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Parser and analysis benchmarks on synthetic statements (see synthetic_pdf.py).
+
+Times detect_bank, parse_wealthsimple, parse_generic (table and text paths),
+analyze_transactions at 1k-1M rows (dict lists, TransactionBatches and row iterators) and the full
+/api/upload_statement request through a TestClient, then optionally writes the results as
+JSON and compares with an earlier run.
+
+    python benchmarks/pipeline.py [--pages 5] [--rows 30] [--boilerplate 0] [--repeat 5]
+        [--analyze-rows 1000,10000,100000,1000000] [--only parse] [--json out.json] [--compare base.json]
+
+Uploads run with the parse cache disabled so every request parses.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Before api is imported: parse on every upload and keep upload logging quiet
+os.environ["PARSE_CACHE_MAX_BYTES"] = "0"
+os.environ["PARSE_CACHE_BACKEND"] = ""
+os.environ.setdefault("UPLOAD_LOG_DETAIL", "off")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from synthetic_pdf import MERCHANTS, statement_pdf  # noqa: E402
+
+from api.transactions import TransactionBatch  # noqa: E402
+
+DEFAULT_ANALYZE_ROWS = "1000,10000,100000,1000000"
+
+
+def measure(name: str, run: Callable[[Any], Any], setup: Callable[[], Any] = lambda: None,
+            repeat: int = 5, warmup: int = 1, **params: Any) -> dict[str, Any]:
+    """Time run(setup()) `repeat` times after `warmup` untimed calls; setup is not timed."""
+    for _ in range(warmup):
+        run(setup())
+    runs_ms, rows = [], None
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        result = run(arg)
+        runs_ms.append((time.perf_counter() - start) * 1000)
+        if isinstance(result, (list, TransactionBatch)):
+            rows = len(result)
+    row = {
+        "name": name,
+        "params": params,
+        "rows": rows,
+        "runs_ms": [round(ms, 3) for ms in runs_ms],
+        "median_ms": round(statistics.median(runs_ms), 3),
+        "min_ms": round(min(runs_ms), 3),
+    }
+    print(f"  {name:<40} median {row['median_ms']:10.2f} ms   min {row['min_ms']:10.2f} ms"
+          + (f"   rows {rows}" if rows is not None else ""))
+    return row
+
+
+def _opened(data: bytes) -> Callable[[], Any]:
+    """setup() returning a fresh StatementDocument per run, so no run reuses another's extractions."""
+    import pdfplumber
+    from api.parsers.document import StatementDocument
+
+    def setup():
+        return StatementDocument(pdfplumber.open(io.BytesIO(data)))
+    return setup
+
+
+def parser_cases(pdfs: dict[str, bytes], repeat: int, **params: Any) -> list[dict]:
+    from api.parsers.generic import parse_generic
+    from api.parsers.registry import detect_bank
+    from api.parsers.wealthsimple import parse_wealthsimple
+
+    return [
+        measure("detect_bank[wealthsimple]", detect_bank, _opened(pdfs["wealthsimple"]), repeat, **params),
+        measure("detect_bank[generic]", detect_bank, _opened(pdfs["generic-table"]), repeat, **params),
+        measure("parse_wealthsimple", parse_wealthsimple, _opened(pdfs["wealthsimple"]), repeat, **params),
+        measure("parse_generic[table]", parse_generic, _opened(pdfs["generic-table"]), repeat, **params),
+        measure("parse_generic[text]", parse_generic, _opened(pdfs["generic-text"]), repeat, **params),
+    ]
+
+
+def synthetic_transactions(count: int, seed: int = 0) -> list[dict[str, Any]]:
+    """Parsed-shape rows over a year: ISO dates, numbered merchants, mixed signs."""
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    return [
+        {
+            "date": (start + timedelta(days=rng.randrange(365))).isoformat(),
+            "description": f"{rng.choice(MERCHANTS)} {rng.randrange(100)}",
+            "amount": round(rng.uniform(-250, 300), 2),
+        }
+        for _ in range(count)
+    ]
+
+
+def analysis_cases(sizes: list[int], repeat: int) -> list[dict]:
+    from api.analysis import COLUMNAR_THRESHOLD, HAS_NUMPY, analyze_transactions
+
+    results = []
+    for size in sizes:
+        rows = synthetic_transactions(size)
+        engine = "columnar" if HAS_NUMPY and size >= COLUMNAR_THRESHOLD else "rows"
+        # Large inputs take seconds per call; fewer repeats keep the suite usable
+        reps = repeat if size < 100_000 else max(1, min(repeat, 3))
+        results.append(measure(f"analyze_transactions[{size}]", analyze_transactions,
+                               lambda: rows, reps, rows_in=size, engine=engine))
+        batch = TransactionBatch.from_dicts(rows)
+        results.append(measure(f"analyze_transactions[batch {size}]", analyze_transactions,
+                               lambda: batch, reps, rows_in=size, engine=engine))
+        results.append(measure(f"analyze_transactions[stream {size}]", analyze_transactions,
+                               lambda: iter(rows), reps, rows_in=size, engine="stream"))
+    return results
+
+
+def upload_cases(pdfs: dict[str, bytes], repeat: int, **params: Any) -> list[dict]:
+    from fastapi.testclient import TestClient
+
+    from api.index import app
+
+    results = []
+    with TestClient(app) as client:
+        def upload(files: list[tuple[str, bytes]]) -> list:
+            resp = client.post("/api/upload_statement", files=[
+                ("statements", (name, data, "application/pdf")) for name, data in files
+            ])
+            resp.raise_for_status()
+            return resp.json()["transactions"]
+
+        for layout, data in pdfs.items():
+            results.append(measure(f"upload_statement[{layout}]", upload,
+                                   lambda data=data, layout=layout: [(f"{layout}.pdf", data)], repeat, **params))
+        results.append(measure("upload_statement[all layouts]", upload,
+                               lambda: [(f"{k}.pdf", v) for k, v in pdfs.items()], repeat, **params))
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    """Print median change per case against an earlier --json output."""
+    baseline = {r["name"]: r for r in json.loads(Path(baseline_path).read_text())["results"]}
+    print(f"\nCompared with {baseline_path}:")
+    for row in results:
+        before = baseline.get(row["name"])
+        if not before or not before["median_ms"]:
+            print(f"  {row['name']:<40} (new)")
+            continue
+        ratio = row["median_ms"] / before["median_ms"]
+        print(f"  {row['name']:<40} {before['median_ms']:10.2f} -> {row['median_ms']:10.2f} ms  ({ratio:5.2f}x)")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=5, help="transaction pages per statement")
+    parser.add_argument("--rows", type=int, default=30, help="transactions per page")
+    parser.add_argument("--boilerplate", type=int, default=0, help="extra non-transaction pages per statement")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--analyze-rows", default=DEFAULT_ANALYZE_ROWS, help="comma-separated row counts")
+    parser.add_argument("--only", help="run only groups whose name contains this (parse, analyze, upload)")
+    parser.add_argument("--json", dest="json_path")
+    parser.add_argument("--compare", help="earlier --json output to compare against")
+    args = parser.parse_args(argv)
+
+    pdf_params = {"pages": args.pages, "rows_per_page": args.rows, "boilerplate": args.boilerplate}
+    pdfs = {
+        layout: statement_pdf(layout, args.pages, args.rows, seed=i, boilerplate=args.boilerplate)
+        for i, layout in enumerate(("wealthsimple", "generic-table", "generic-text"))
+    }
+    groups = {
+        "parse": lambda: parser_cases(pdfs, args.repeat, **pdf_params),
+        "analyze": lambda: analysis_cases([int(n) for n in args.analyze_rows.split(",") if n], args.repeat),
+        "upload": lambda: upload_cases(pdfs, args.repeat, **pdf_params),
+    }
+    results = []
+    for group, run in groups.items():
+        if args.only and args.only not in group:
+            continue
+        print(f"{group}:")
+        results += run()
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps({
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "args": vars(args),
+            },
+            "results": results,
+        }, indent=2))
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+Synthetic bank statement PDFs for benchmarks, written with a minimal pure-Python PDF
+writer (Helvetica text and ruled lines only; no dependencies, no network).
+
+Layouts:
+  wealthsimple   Wealthsimple Cash: summary page, ruled Activity table per page, legal page
+  generic-table  unbranded ruled table: Date | Description | Amount | Balance
+  generic-text   unbranded free text, one transaction per line (generic text fallback)
+
+    python benchmarks/synthetic_pdf.py --layout wealthsimple --pages 10 --rows 30 [--boilerplate 8] -o out.pdf
+"""
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+
+LAYOUTS = ("wealthsimple", "generic-table", "generic-text")
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+FONT_SIZE = 9
+ROW_HEIGHT = 20
+TEXT_LINE_HEIGHT = 14
+# Rows that fit under a page header at the row heights above
+MAX_TABLE_ROWS = 34
+MAX_TEXT_ROWS = 50
+
+MERCHANTS = (
+    "Tim Hortons #123", "Payroll deposit", "Amazon.ca", "Netflix", "Interac e-Transfer",
+    "Esso 555", "Loblaws 1234", "Shell station", "Rogers bill", "Uber Eats", "Costco Wholesale",
+    "Spotify", "Hydro One", "Starbucks 0042", "Canadian Tire", "Presto fare",
+)
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def render_pdf(pages: list[list[tuple]]) -> bytes:
+    """PDF bytes for pages of drawing ops: ("t", x, y, text) or ("l", x1, y1, x2, y2)."""
+    objects: list[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    kids = []
+    for ops in pages:
+        content = []
+        for op in ops:
+            if op[0] == "t":
+                content.append(f"BT /F1 {FONT_SIZE} Tf {op[1]} {op[2]} Td ({_escape(op[3])}) Tj ET")
+            else:
+                content.append(f"{op[1]} {op[2]} m {op[3]} {op[4]} l S")
+        stream = "\n".join(content).encode("cp1252")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids),
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _ruled_table(columns: list[int], top: int, header: list[str], rows: list[list[str]]) -> list[tuple]:
+    """Text plus horizontal/vertical rules so pdfplumber's lattice table finder picks it up."""
+    ops, rules = [], [top + 12]
+    y = top
+    for row in [header, *rows]:
+        for x, value in zip(columns, row):
+            ops.append(("t", x + 2, y, value))
+        y -= ROW_HEIGHT
+        rules.append(y + 12)
+    ops += [("l", columns[0], ry, columns[-1], ry) for ry in rules]
+    ops += [("l", x, rules[0], x, rules[-1]) for x in columns]
+    return ops
+
+
+def _money(amount: float, signed: bool = True) -> str:
+    text = f"${abs(amount):,.2f}"
+    return f"-{text}" if signed and amount < 0 else text
+
+
+def _activity(rng: random.Random, count: int, start: date) -> list[tuple[date, str, float]]:
+    days = sorted(rng.randrange(28) for _ in range(count))
+    return [
+        (start + timedelta(days=d), rng.choice(MERCHANTS), round(rng.uniform(-250, 300), 2))
+        for d in days
+    ]
+
+
+def wealthsimple_pages(pages: int, rows: int, rng: random.Random, start: date) -> list[list[tuple]]:
+    period = f"{start:%B} 1 - {start:%B} 28, {start.year}"
+    out = [[
+        ("t", 50, 740, "Wealthsimple Cash"),
+        ("t", 50, 720, f"Monthly statement {period}"),
+        ("t", 50, 700, "Account summary"),
+    ]]
+    columns = [50, 120, 190, 400, 490, 570]
+    header = ["DATE", "POSTED DATE", "DESCRIPTION", "AMOUNT (CAD)", "BALANCE (CAD)"]
+    balance = 5000.0
+    for _ in range(pages):
+        body = []
+        for day, merchant, amount in _activity(rng, rows, start):
+            balance += amount
+            label = f"{day:%b} {day.day}"
+            body.append([label, label, merchant, _money(amount), _money(balance)])
+        out.append([("t", 50, 755, "Activity"), *_ruled_table(columns, 730, header, body)])
+    out.append([("t", 50, 740, "Legal disclosures Wealthsimple Inc., 80 Spadina Ave")])
+    return out
+
+
+def generic_table_pages(pages: int, rows: int, rng: random.Random, start: date) -> list[list[tuple]]:
+    columns = [50, 130, 380, 470, 570]
+    header = ["Date", "Description", "Amount", "Balance"]
+    balance = 2500.0
+    out = []
+    for page in range(pages):
+        body = []
+        for day, merchant, amount in _activity(rng, rows, start):
+            balance += amount
+            body.append([day.isoformat(), merchant, f"{amount:,.2f}", f"{balance:,.2f}"])
+        out.append([
+            ("t", 50, 760, f"Chequing account statement - page {page + 1}"),
+            *_ruled_table(columns, 730, header, body),
+        ])
+    return out
+
+
+def generic_text_pages(pages: int, rows: int, rng: random.Random, start: date) -> list[list[tuple]]:
+    out = []
+    for _ in range(pages):
+        ops = [("t", 50, 760, "Chequing account statement")]
+        y = 740
+        for day, merchant, amount in _activity(rng, rows, start):
+            # Deposits carry a running balance after them, withdrawals are signed
+            money = _money(amount) if amount < 0 else f"{_money(amount)} $1,000.00"
+            ops.append(("t", 50, y, f"{day.isoformat()} {merchant} {money}"))
+            y -= TEXT_LINE_HEIGHT
+        out.append(ops)
+    return out
+
+
+LEGAL_TEXT = (
+    "This statement is provided for information purposes only. Please review it carefully",
+    "and report any discrepancies within 45 days of the statement date. Deposits are held",
+    "by the member institution named above and are eligible for deposit insurance within",
+    "the applicable limits. Interest is calculated daily and paid monthly on the balance.",
+)
+
+
+def boilerplate_page(index: int) -> list[tuple]:
+    """A cover/summary/disclosure page: boxed paragraphs, no amounts and no table header."""
+    ops = [("t", 50, 760, f"Important information ({index + 1})")]
+    y = 730
+    for _ in range(8):
+        for line in LEGAL_TEXT:
+            ops.append(("t", 60, y, line))
+            y -= TEXT_LINE_HEIGHT
+        y -= TEXT_LINE_HEIGHT
+    ops += [("l", 50, 745, 560, 745), ("l", 50, y, 560, y), ("l", 50, 745, 50, y), ("l", 560, 745, 560, y)]
+    return ops
+
+
+_BUILDERS = {
+    "wealthsimple": (wealthsimple_pages, MAX_TABLE_ROWS),
+    "generic-table": (generic_table_pages, MAX_TABLE_ROWS),
+    "generic-text": (generic_text_pages, MAX_TEXT_ROWS),
+}
+
+
+def statement_pdf(layout: str, pages: int = 3, rows: int = 20, seed: int = 0,
+                  start: date = date(2025, 3, 1), boilerplate: int = 0) -> bytes:
+    """A statement with `pages` transaction pages of `rows` rows each (capped to fit a page),
+    plus `boilerplate` non-transaction pages split between the front and the back."""
+    if layout not in _BUILDERS:
+        raise ValueError(f"Unknown layout {layout!r}; expected one of {', '.join(LAYOUTS)}")
+    build, max_rows = _BUILDERS[layout]
+    body = build(pages, min(rows, max_rows), random.Random(seed), start)
+    filler = [boilerplate_page(i) for i in range(boilerplate)]
+    # After the first page (the Wealthsimple cover names the bank), and at the end
+    front, back = filler[:boilerplate // 2], filler[boilerplate // 2:]
+    return render_pdf(body[:1] + front + body[1:] + back)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--layout", choices=LAYOUTS, default="wealthsimple")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=20, help="transactions per page")
+    parser.add_argument("--boilerplate", type=int, default=0, help="extra non-transaction pages")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", required=True)
+    args = parser.parse_args(argv)
+    with open(args.output, "wb") as f:
+        f.write(statement_pdf(args.layout, args.pages, args.rows, args.seed, boilerplate=args.boilerplate))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,7 @@ import { FileText, Trash2, RefreshCw, Plus } from 'lucide-react';
 import './Dashboard.css';
 
 const API_BASE = process.env.REACT_APP_API_URL ?? '';
+const USER_DATA_PAGE_SIZE = 100;
 
 export default function Dashboard() {
   const navigate = useNavigate();
@@ -27,8 +28,10 @@ export default function Dashboard() {
     setLoading(true);
     setError(null);
     try {
+      // First paint: summary + latest page only, no per-statement transaction arrays
       const res = await axios.get(`${API_BASE}/api/user_data`, {
         headers: { Authorization: `Bearer ${token}` },
+        params: { include_transactions: false, limit: USER_DATA_PAGE_SIZE },
       });
       setStatements(res.data.statements || []);
       setAnalysisData(res.data);
@@ -193,7 +196,7 @@ export default function Dashboard() {
                       <FileText size={20} strokeWidth={1.5} />
                       <span className="statement-filename">{s.filename}</span>
                       <span className="statement-meta">
-                        {(s.transactions?.length ?? 0)} transactions
+                        {(s.transaction_count ?? s.transactions?.length ?? 0)} transactions
                       </span>
                     </div>
                     <button
@@ -0,0 +1,14 @@
+-- Content-addressed parse results (PARSE_CACHE_BACKEND=supabase)
+-- Keyed by SHA-256 of the uploaded PDF + parser version; bumping PARSER_VERSION
+-- in api/parsers leaves old rows unused.
+
+create table if not exists public.parse_cache (
+  content_hash text not null,
+  parser_version text not null,
+  transactions jsonb not null default '[]',
+  created_at timestamptz default now(),
+  primary key (content_hash, parser_version)
+);
+
+-- Only the backend (secret key) reads/writes this table; no user policies
+alter table public.parse_cache enable row level security;
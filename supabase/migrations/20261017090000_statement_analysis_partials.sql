@@ -0,0 +1,6 @@
+-- Per-statement partial aggregates (income, expenses, per-category/month/merchant sums, count).
+-- The API merges these instead of re-analyzing every transaction; rows with a null or
+-- outdated partial are recomputed and written back on read.
+
+alter table public.user_statements
+  add column if not exists analysis_partial jsonb;
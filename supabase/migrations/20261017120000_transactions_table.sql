@@ -0,0 +1,187 @@
+-- Normalized transactions: one row per transaction, next to the per-statement JSONB arrays.
+-- Lets dashboards aggregate in Postgres (analyze_user_transactions) instead of pulling every
+-- statement's transactions into the API. The API writes these rows on save_statements with
+-- category/merchant computed by api/analysis.py; deleting a statement cascades.
+
+create table if not exists public.transactions (
+  id bigint generated always as identity primary key,
+  statement_id uuid not null references public.user_statements(id) on delete cascade,
+  user_id uuid references auth.users not null,
+  position int not null,            -- order within the statement
+  date date,                        -- null when the printed date could not be parsed
+  date_raw text,                    -- date as printed on the statement
+  description text not null,
+  amount numeric(14, 2) not null,   -- + inflow, - outflow
+  category text not null,
+  merchant text
+);
+
+create index if not exists transactions_user_date_idx on public.transactions (user_id, date);
+create index if not exists transactions_user_category_idx on public.transactions (user_id, category);
+create index if not exists transactions_statement_idx on public.transactions (statement_id, position);
+
+alter table public.transactions enable row level security;
+drop policy if exists "Users can read own transactions" on public.transactions;
+create policy "Users can read own transactions" on public.transactions
+  for select using (auth.uid() = user_id);
+
+-- ---------------------------------------------------------------------------
+-- Helpers mirroring api/analysis.py (_month_key formats, _infer_category, _extract_merchant).
+-- Used by the backfill below; new rows get these values from the API.
+-- ---------------------------------------------------------------------------
+
+create or replace function public.parse_statement_date(raw text)
+returns date
+language plpgsql
+immutable
+as $$
+declare
+  s text := left(btrim(coalesce(raw, '')), 10);
+  m text[];
+begin
+  if s = '' then
+    return null;
+  end if;
+  begin
+    m := regexp_match(s, '^(\d{4})-(\d{1,2})-(\d{1,2})$');
+    if m is not null then return make_date(m[1]::int, m[2]::int, m[3]::int); end if;
+    m := regexp_match(s, '^(\d{1,2})/(\d{1,2})/(\d{4})$');
+    if m is not null then return make_date(m[3]::int, m[2]::int, m[1]::int); end if;
+    m := regexp_match(s, '^(\d{1,2})-(\d{1,2})-(\d{4})$');
+    if m is not null then return make_date(m[3]::int, m[2]::int, m[1]::int); end if;
+    m := regexp_match(s, '^(\d{4})/(\d{1,2})/(\d{1,2})$');
+    if m is not null then return make_date(m[1]::int, m[2]::int, m[3]::int); end if;
+    m := regexp_match(s, '^(\d{1,2}) ([A-Za-z]{3,9}) (\d{4})$');
+    if m is not null then return to_date(m[1] || ' ' || left(m[2], 3) || ' ' || m[3], 'DD Mon YYYY'); end if;
+  exception when others then
+    return null;
+  end;
+  return null;
+end;
+$$;
+
+create or replace function public.infer_transaction_category(description text)
+returns text
+language sql
+immutable
+as $$
+  select coalesce((
+    select k.category
+    from (values
+      (1, 'Food & Dining', array['restaurant', 'cafe', 'coffee', 'uber eats', 'doordash', 'food', 'groceries', 'superstore', 'loblaws', 'sobeys', 'metro', 'tim horton', 'mcdonald', 'starbucks']),
+      (2, 'Shopping', array['amazon', 'walmart', 'costco', 'best buy', 'ebay', 'etsy', 'store', 'shop']),
+      (3, 'Transportation', array['gas', 'petro', 'esso', 'shell', 'uber', 'lyft', 'parking', 'transit', 'go transit', 'ttc', 'presto']),
+      (4, 'Bills & Utilities', array['hydro', 'enbridge', 'bell', 'rogers', 'telus', 'internet', 'electric', 'water', 'insurance']),
+      (5, 'Entertainment', array['netflix', 'spotify', 'disney', 'hulu', 'apple tv', 'prime video', 'crave', 'hbo', 'youtube premium', 'gaming', 'steam', 'playstation', 'xbox']),
+      (6, 'Travel', array['air canada', 'westjet', 'expedia', 'booking.com', 'hotel', 'marriott', 'airbnb', 'airline', 'flight', 'ticket', 'kayak', 'trip.com']),
+      (7, 'Income', array['payroll', 'deposit', 'transfer in', 'direct deposit', 'salary', 'employment']),
+      (8, 'Transfer', array['transfer', 'etransfer', 'e-transfer'])
+    ) as k(priority, category, keywords)
+    where exists (
+      select 1 from unnest(k.keywords) kw where strpos(lower(description), kw) > 0
+    )
+    order by k.priority
+    limit 1
+  ), 'Other');
+$$;
+
+create or replace function public.extract_transaction_merchant(description text)
+returns text
+language sql
+immutable
+as $$
+  select coalesce((
+    select left(tok, 50)
+    from (
+      select btrim(part, '.,-') as tok, ord
+      from regexp_split_to_table(btrim(description), '\s+') with ordinality as p(part, ord)
+    ) parts
+    where length(tok) > 2 and tok !~ '^[0-9]+$'
+    order by ord
+    limit 1
+  ), nullif(left(btrim(description), 50), ''), 'Unknown');
+$$;
+
+-- ---------------------------------------------------------------------------
+-- Aggregation RPC: same shape as api/analysis.analyze_transactions.
+-- SECURITY INVOKER, so RLS limits end users to their own rows; the API (secret key)
+-- passes p_user_id explicitly. Optional date range / category filters.
+-- ---------------------------------------------------------------------------
+
+create or replace function public.analyze_user_transactions(
+  p_user_id uuid default auth.uid(),
+  p_from date default null,
+  p_to date default null,
+  p_category text default null
+)
+returns jsonb
+language sql
+stable
+as $$
+  with t as (
+    select date, amount, category, merchant
+    from public.transactions
+    where user_id = p_user_id
+      and (p_from is null or date >= p_from)
+      and (p_to is null or date <= p_to)
+      and (p_category is null or category = p_category)
+  ),
+  totals as (
+    select
+      coalesce(sum(amount) filter (where amount > 0), 0) as income,
+      coalesce(sum(-amount) filter (where amount <= 0), 0) as expenses,
+      count(*) as n
+    from t
+  ),
+  cats as (
+    select category, sum(abs(amount)) as total from t group by category
+  ),
+  months as (
+    select to_char(date, 'YYYY-MM') as month, sum(amount) as total
+    from t where date is not null group by 1
+  ),
+  merchants as (
+    select merchant, sum(-amount) as total
+    from t where amount < 0 group by merchant
+    order by total desc, merchant
+    limit 10
+  )
+  select jsonb_build_object(
+    'total_income', round(totals.income, 2),
+    'total_expenses', round(totals.expenses, 2),
+    'cash_flow', round(totals.income - totals.expenses, 2),
+    'by_category', coalesce((select jsonb_object_agg(category, round(total, 2)) from cats), '{}'::jsonb),
+    'top_merchants', coalesce((
+      select jsonb_agg(jsonb_build_object('name', merchant, 'amount', round(total, 2)) order by total desc, merchant)
+      from merchants
+    ), '[]'::jsonb),
+    'cash_flow_by_month', coalesce((select jsonb_object_agg(month, round(total, 2)) from months), '{}'::jsonb),
+    'transaction_count', totals.n
+  )
+  from totals;
+$$;
+
+-- ---------------------------------------------------------------------------
+-- Backfill from user_statements.transactions (idempotent: skips statements already exploded)
+-- ---------------------------------------------------------------------------
+
+insert into public.transactions (statement_id, user_id, position, date, date_raw, description, amount, category, merchant)
+select
+  s.id,
+  s.user_id,
+  (e.ord - 1)::int,
+  public.parse_statement_date(e.txn ->> 'date'),
+  e.txn ->> 'date',
+  d.description,
+  round((e.txn ->> 'amount')::numeric, 2),
+  coalesce(nullif(e.txn ->> 'category', ''), public.infer_transaction_category(d.description)),
+  public.extract_transaction_merchant(d.description)
+from public.user_statements s
+cross join lateral jsonb_array_elements(
+  case when jsonb_typeof(s.transactions) = 'array' then s.transactions else '[]'::jsonb end
+) with ordinality as e(txn, ord)
+cross join lateral (
+  select btrim(coalesce(nullif(e.txn ->> 'description', ''), nullif(e.txn ->> 'name', ''), 'Unknown')) as description
+) d
+where (e.txn ->> 'amount') ~ '^\s*[-+]?[0-9]*\.?[0-9]+\s*$'
+  and not exists (select 1 from public.transactions x where x.statement_id = s.id);
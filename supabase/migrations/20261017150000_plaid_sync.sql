@@ -0,0 +1,26 @@
+-- Incremental Plaid sync (PLAID_STORE_BACKEND=supabase).
+-- plaid_sync_state keeps the /transactions/sync cursor per item, next to plaid_items;
+-- plaid_transactions is the local copy the API reads from, updated with each delta.
+-- item_key is the SHA-256 of the item's access token (see api/plaid_sync.py).
+
+create table if not exists public.plaid_sync_state (
+  item_key text primary key,
+  cursor text,
+  updated_at timestamptz default now()
+);
+
+create table if not exists public.plaid_transactions (
+  item_key text not null,
+  transaction_id text not null,
+  date date,
+  description text not null,
+  amount numeric(14, 2) not null,   -- + inflow, - outflow
+  category text,
+  primary key (item_key, transaction_id)
+);
+
+create index if not exists plaid_transactions_item_date_idx on public.plaid_transactions (item_key, date desc);
+
+-- Only the backend (secret key) reads/writes these tables; no user policies
+alter table public.plaid_sync_state enable row level security;
+alter table public.plaid_transactions enable row level security;
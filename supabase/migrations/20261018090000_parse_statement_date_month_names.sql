@@ -0,0 +1,55 @@
+-- parse_statement_date, matching api/analysis._parse_date again: numeric formats read the first
+-- 10 characters, month-name formats ("15 Jan 2025", "15 January 2025") are tried on the whole
+-- value first. The earlier version cut every value to 10 characters, so those came out null.
+
+create or replace function public.parse_statement_date(raw text)
+returns date
+language plpgsql
+immutable
+as $$
+declare
+  s text := btrim(coalesce(raw, ''));
+  prefix text := left(btrim(coalesce(raw, '')), 10);
+  candidate text;
+  m text[];
+  mon int;
+begin
+  if s = '' then
+    return null;
+  end if;
+  begin
+    m := regexp_match(prefix, '^(\d{4})-(\d{1,2})-(\d{1,2})$');
+    if m is not null then return make_date(m[1]::int, m[2]::int, m[3]::int); end if;
+    m := regexp_match(prefix, '^(\d{1,2})/(\d{1,2})/(\d{4})$');
+    if m is not null then return make_date(m[3]::int, m[2]::int, m[1]::int); end if;
+    m := regexp_match(prefix, '^(\d{1,2})-(\d{1,2})-(\d{4})$');
+    if m is not null then return make_date(m[3]::int, m[2]::int, m[1]::int); end if;
+    m := regexp_match(prefix, '^(\d{4})/(\d{1,2})/(\d{1,2})$');
+    if m is not null then return make_date(m[1]::int, m[2]::int, m[3]::int); end if;
+  exception when others then
+    return null;
+  end;
+  -- %d %b %Y / %d %B %Y: English month abbreviation or full name, any case
+  foreach candidate in array array[s, prefix] loop
+    m := regexp_match(candidate, '^(\d{1,2})\s+([A-Za-z]+)\s+(\d{4})$');
+    continue when m is null;
+    mon := coalesce(
+      array_position(array['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], lower(m[2])),
+      array_position(array['january', 'february', 'march', 'april', 'may', 'june', 'july', 'august',
+                           'september', 'october', 'november', 'december'], lower(m[2]))
+    );
+    continue when mon is null;
+    begin
+      return make_date(m[3]::int, mon, m[1]::int);
+    exception when others then
+      continue;
+    end;
+  end loop;
+  return null;
+end;
+$$;
+
+-- Rows backfilled or written before this fix
+update public.transactions
+set date = public.parse_statement_date(date_raw)
+where date is null and date_raw is not null;
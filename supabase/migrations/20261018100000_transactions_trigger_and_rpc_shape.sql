@@ -0,0 +1,212 @@
+-- Normalized transactions, part 2.
+-- * Rows are exploded from user_statements by a trigger, in the same transaction as the
+--   statement insert. The API no longer writes them separately, so a statement can't be saved
+--   without its rows (and deployments without this migration simply don't mirror).
+-- * infer_transaction_category reads public.category_keywords, generated from the Python
+--   CATEGORY_KEYWORDS (python -m api.category_sql), instead of a hand-copied list.
+-- * analyze_user_transactions returns json in analyze_transactions' order: by_category in
+--   first-seen order, top_merchants ties in first-seen order, months sorted. "First seen"
+--   follows statements by (created_at, id), then position, as the API loads them. Amounts
+--   are float8, so they serialize like Python floats (12.5, not 12.50).
+
+create table if not exists public.category_keywords (
+  priority int not null,            -- CATEGORY_KEYWORDS order; the lowest matching one wins
+  category text not null,
+  keyword text not null,            -- lower case, matched as a substring
+  primary key (category, keyword)
+);
+
+alter table public.category_keywords enable row level security;
+
+create or replace function public.infer_transaction_category(description text)
+returns text
+language sql
+stable
+as $$
+  select coalesce((
+    select k.category
+    from public.category_keywords k
+    where strpos(lower(description), k.keyword) > 0
+    order by k.priority
+    limit 1
+  ), 'Other');
+$$;
+
+create or replace function public.explode_statement_transactions()
+returns trigger
+language plpgsql
+as $$
+begin
+  insert into public.transactions (statement_id, user_id, position, date, date_raw, description, amount, category, merchant)
+  select
+    s.id,
+    s.user_id,
+    (e.ord - 1)::int,
+    public.parse_statement_date(e.txn ->> 'date'),
+    e.txn ->> 'date',
+    d.description,
+    round(coalesce(e.txn ->> 'amount', '0')::numeric, 2),
+    coalesce(nullif(e.txn ->> 'category', ''), public.infer_transaction_category(d.description)),
+    public.extract_transaction_merchant(d.description)
+  from new_statements s
+  cross join lateral jsonb_array_elements(
+    case when jsonb_typeof(s.transactions) = 'array' then s.transactions else '[]'::jsonb end
+  ) with ordinality as e(txn, ord)
+  cross join lateral (
+    select btrim(coalesce(nullif(e.txn ->> 'description', ''), nullif(e.txn ->> 'name', ''), 'Unknown')) as description
+  ) d;
+  return null;
+end;
+$$;
+
+drop trigger if exists user_statements_explode_transactions on public.user_statements;
+create trigger user_statements_explode_transactions
+  after insert on public.user_statements
+  referencing new table as new_statements
+  for each statement
+  execute function public.explode_statement_transactions();
+
+drop function if exists public.analyze_user_transactions(uuid, date, date, text);
+create function public.analyze_user_transactions(
+  p_user_id uuid default auth.uid(),
+  p_from date default null,
+  p_to date default null,
+  p_category text default null
+)
+returns json
+language sql
+stable
+as $$
+  with t as (
+    select
+      tx.date, tx.amount, tx.category, tx.merchant,
+      row_number() over (order by s.created_at, s.id, tx.position) as seq
+    from public.transactions tx
+    join public.user_statements s on s.id = tx.statement_id
+    where tx.user_id = p_user_id
+      and (p_from is null or tx.date >= p_from)
+      and (p_to is null or tx.date <= p_to)
+      and (p_category is null or tx.category = p_category)
+  ),
+  totals as (
+    select
+      coalesce(sum(amount) filter (where amount > 0), 0) as income,
+      coalesce(sum(-amount) filter (where amount <= 0), 0) as expenses,
+      count(*) as n
+    from t
+  ),
+  cats as (
+    select category, sum(abs(amount)) as total, min(seq) as first_seq from t group by category
+  ),
+  months as (
+    select to_char(date, 'YYYY-MM') as month, sum(amount) as total
+    from t where date is not null group by 1
+  ),
+  merchants as (
+    select merchant, round(sum(-amount), 2) as total, min(seq) as first_seq
+    from t where amount < 0 group by merchant
+    order by total desc, first_seq
+    limit 10
+  )
+  select case when totals.n = 0 then json_build_object(
+    'total_income', 0,
+    'total_expenses', 0,
+    'cash_flow', 0,
+    'by_category', '{}'::json,
+    'top_merchants', '[]'::json,
+    'cash_flow_by_month', '{}'::json,
+    'transaction_count', 0
+  ) else json_build_object(
+    'total_income', round(totals.income, 2)::float8,
+    'total_expenses', round(totals.expenses, 2)::float8,
+    'cash_flow', round(totals.income - totals.expenses, 2)::float8,
+    'by_category', (select json_object_agg(category, round(total, 2)::float8 order by first_seq) from cats),
+    'top_merchants', coalesce((
+      select json_agg(json_build_object('name', merchant, 'amount', total::float8) order by total desc, first_seq)
+      from merchants
+    ), '[]'::json),
+    'cash_flow_by_month', coalesce((select json_object_agg(month, round(total, 2)::float8 order by month) from months), '{}'::json),
+    'transaction_count', totals.n
+  ) end
+  from totals;
+$$;
+
+-- Generated by python -m api.category_sql from CATEGORY_KEYWORDS in api/analysis.py; do not edit.
+delete from public.category_keywords;
+insert into public.category_keywords (priority, category, keyword) values
+  (0, 'Food & Dining', 'restaurant'),
+  (0, 'Food & Dining', 'cafe'),
+  (0, 'Food & Dining', 'coffee'),
+  (0, 'Food & Dining', 'uber eats'),
+  (0, 'Food & Dining', 'doordash'),
+  (0, 'Food & Dining', 'food'),
+  (0, 'Food & Dining', 'groceries'),
+  (0, 'Food & Dining', 'superstore'),
+  (0, 'Food & Dining', 'loblaws'),
+  (0, 'Food & Dining', 'sobeys'),
+  (0, 'Food & Dining', 'metro'),
+  (0, 'Food & Dining', 'tim horton'),
+  (0, 'Food & Dining', 'mcdonald'),
+  (0, 'Food & Dining', 'starbucks'),
+  (1, 'Shopping', 'amazon'),
+  (1, 'Shopping', 'walmart'),
+  (1, 'Shopping', 'costco'),
+  (1, 'Shopping', 'best buy'),
+  (1, 'Shopping', 'ebay'),
+  (1, 'Shopping', 'etsy'),
+  (1, 'Shopping', 'store'),
+  (1, 'Shopping', 'shop'),
+  (2, 'Transportation', 'gas'),
+  (2, 'Transportation', 'petro'),
+  (2, 'Transportation', 'esso'),
+  (2, 'Transportation', 'shell'),
+  (2, 'Transportation', 'uber'),
+  (2, 'Transportation', 'lyft'),
+  (2, 'Transportation', 'parking'),
+  (2, 'Transportation', 'transit'),
+  (2, 'Transportation', 'go transit'),
+  (2, 'Transportation', 'ttc'),
+  (2, 'Transportation', 'presto'),
+  (3, 'Bills & Utilities', 'hydro'),
+  (3, 'Bills & Utilities', 'enbridge'),
+  (3, 'Bills & Utilities', 'bell'),
+  (3, 'Bills & Utilities', 'rogers'),
+  (3, 'Bills & Utilities', 'telus'),
+  (3, 'Bills & Utilities', 'internet'),
+  (3, 'Bills & Utilities', 'electric'),
+  (3, 'Bills & Utilities', 'water'),
+  (3, 'Bills & Utilities', 'insurance'),
+  (4, 'Entertainment', 'netflix'),
+  (4, 'Entertainment', 'spotify'),
+  (4, 'Entertainment', 'disney'),
+  (4, 'Entertainment', 'hulu'),
+  (4, 'Entertainment', 'apple tv'),
+  (4, 'Entertainment', 'prime video'),
+  (4, 'Entertainment', 'crave'),
+  (4, 'Entertainment', 'hbo'),
+  (4, 'Entertainment', 'youtube premium'),
+  (4, 'Entertainment', 'gaming'),
+  (4, 'Entertainment', 'steam'),
+  (4, 'Entertainment', 'playstation'),
+  (4, 'Entertainment', 'xbox'),
+  (5, 'Travel', 'air canada'),
+  (5, 'Travel', 'westjet'),
+  (5, 'Travel', 'expedia'),
+  (5, 'Travel', 'booking.com'),
+  (5, 'Travel', 'hotel'),
+  (5, 'Travel', 'marriott'),
+  (5, 'Travel', 'airbnb'),
+  (5, 'Travel', 'airline'),
+  (5, 'Travel', 'flight'),
+  (5, 'Travel', 'ticket'),
+  (5, 'Travel', 'kayak'),
+  (5, 'Travel', 'trip.com'),
+  (6, 'Income', 'payroll'),
+  (6, 'Income', 'deposit'),
+  (6, 'Income', 'transfer in'),
+  (6, 'Income', 'direct deposit'),
+  (6, 'Income', 'salary'),
+  (6, 'Income', 'employment'),
+  (7, 'Transfer', 'transfer'),
+  (7, 'Transfer', 'etransfer'),
+  (7, 'Transfer', 'e-transfer');
@@ -0,0 +1,38 @@
+import os
+from pathlib import Path
+
+import pytest
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "supabase" / "migrations"
+SCHEMA = Path(__file__).resolve().parent.parent / "supabase_schema.sql"
+
+# Just enough of Supabase's auth schema for the migrations on a plain Postgres
+AUTH_STUB = """
+create schema if not exists auth;
+create table if not exists auth.users (id uuid primary key);
+do $$ begin
+  if to_regprocedure('auth.uid()') is null then
+    create function auth.uid() returns uuid language sql stable as 'select null::uuid';
+  end if;
+end $$;
+"""
+
+
+@pytest.fixture
+def pg():
+    """Cursor on TEST_DATABASE_URL (e.g. the local Supabase database) with every migration
+    applied inside a transaction that is rolled back afterwards. Skipped when unset."""
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL not set")
+    psycopg2 = pytest.importorskip("psycopg2")
+    conn = psycopg2.connect(url)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(AUTH_STUB)
+            for path in sorted(MIGRATIONS.glob("*.sql")):
+                cur.execute(path.read_text())
+            yield cur
+    finally:
+        conn.rollback()
+        conn.close()
@@ -0,0 +1,45 @@
+"""
+In-process stand-in for Plaid's /transactions/sync, for offline tests.
+The item's history is a log of added/modified/removed events; a cursor is an offset into it.
+"""
+
+
+class MutationDuringPagination(Exception):
+    body = '{"error_code": "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION"}'
+
+
+def plaid_txn(txn_id: str, day: str, name: str, amount: float, category: str | None = None) -> dict:
+    """A transaction as /transactions/sync returns it (Plaid sign: + = outflow)."""
+    txn = {"transaction_id": txn_id, "date": day, "name": name, "amount": amount}
+    if category:
+        txn["personal_finance_category"] = {"primary": category}
+    return txn
+
+
+class FakePlaid:
+    def __init__(self):
+        self.events: list[tuple[str, dict]] = []
+        self.requests: list[dict] = []
+        # Raise MutationDuringPagination on these request numbers (0-based)
+        self.fail_on: set[int] = set()
+
+    def add(self, *txns: dict) -> None:
+        self.events.extend(("added", t) for t in txns)
+
+    def modify(self, *txns: dict) -> None:
+        self.events.extend(("modified", t) for t in txns)
+
+    def remove(self, *txn_ids: str) -> None:
+        self.events.extend(("removed", {"transaction_id": i}) for i in txn_ids)
+
+    def transactions_sync(self, request, _request_timeout=None) -> dict:
+        cursor, count = request.get("cursor"), request.get("count") or 100
+        self.requests.append({"access_token": request["access_token"], "cursor": cursor, "count": count})
+        if len(self.requests) - 1 in self.fail_on:
+            raise MutationDuringPagination()
+        start = int(cursor) if cursor else 0
+        end = min(start + count, len(self.events))
+        page = {"added": [], "modified": [], "removed": []}
+        for kind, txn in self.events[start:end]:
+            page[kind].append(txn)
+        return {**page, "next_cursor": str(end), "has_more": end < len(self.events)}
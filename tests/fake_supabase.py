@@ -0,0 +1,100 @@
+"""
+In-process stand-in for the supabase-py table API, for offline endpoint tests. Supports the
+builder calls the API makes (select/eq/gte/lte/order/range/limit, insert/update/upsert) over
+lists of dicts, and records every write.
+"""
+import copy
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, client: "FakeSupabase", table: str):
+        self.client = client
+        self.table = table
+        self.columns: list[str] | None = None
+        self.filters: list = []
+        self.orders: list[tuple[str, bool]] = []
+        self.window: tuple[int, int] | None = None
+        self.write: tuple[str, dict] | None = None
+
+    def select(self, columns: str = "*") -> "_Query":
+        self.columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def eq(self, column: str, value) -> "_Query":
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def gte(self, column: str, value) -> "_Query":
+        self.filters.append(lambda r: r.get(column) is not None and r[column] >= value)
+        return self
+
+    def lte(self, column: str, value) -> "_Query":
+        self.filters.append(lambda r: r.get(column) is not None and r[column] <= value)
+        return self
+
+    def order(self, column: str, desc: bool = False, nullsfirst: bool | None = None) -> "_Query":
+        self.orders.append((column, desc))
+        return self
+
+    def range(self, start: int, end: int) -> "_Query":
+        self.window = (start, end + 1)
+        return self
+
+    def limit(self, count: int) -> "_Query":
+        self.window = (0, count)
+        return self
+
+    def insert(self, row) -> "_Query":
+        self.write = ("insert", row)
+        return self
+
+    def update(self, values: dict) -> "_Query":
+        self.write = ("update", values)
+        return self
+
+    def upsert(self, row, on_conflict: str | None = None) -> "_Query":
+        self.write = ("upsert", row)
+        return self
+
+    def _matching(self) -> list[dict]:
+        return [r for r in self.client.tables.setdefault(self.table, []) if all(f(r) for f in self.filters)]
+
+    def execute(self) -> _Response:
+        if self.write is not None:
+            return self._execute_write()
+        rows = self._matching()
+        # Later order() calls break ties of earlier ones
+        for column, desc in reversed(self.orders):
+            rows.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        if self.window is not None:
+            rows = rows[self.window[0]:self.window[1]]
+        if self.columns is not None:
+            rows = [{c: r.get(c) for c in self.columns} for r in rows]
+        return _Response(copy.deepcopy(rows))
+
+    def _execute_write(self) -> _Response:
+        kind, payload = self.write
+        self.client.writes.append((self.table, kind, copy.deepcopy(payload), len(self.filters)))
+        if kind == "update":
+            rows = self._matching()
+            for r in rows:
+                r.update(copy.deepcopy(payload))
+            return _Response(copy.deepcopy(rows))
+        new = payload if isinstance(payload, list) else [payload]
+        self.client.tables.setdefault(self.table, []).extend(copy.deepcopy(new))
+        return _Response(copy.deepcopy(new))
+
+
+class FakeSupabase:
+    def __init__(self, **tables: list[dict]):
+        self.tables: dict[str, list[dict]] = {name: list(rows) for name, rows in tables.items()}
+        # (table, "insert" | "update" | "upsert", payload, number of filters)
+        self.writes: list[tuple] = []
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
@@ -0,0 +1,205 @@
+import random
+from collections import defaultdict
+from datetime import datetime
+
+import pytest
+
+from api import analysis
+from api.analysis import CATEGORY_KEYWORDS, analyze_transactions
+
+
+# --- The baseline analysis the engines replace (ISO and dd/mm/yyyy dates only: later
+# changes to month-name parsing are covered elsewhere) ---
+
+def _baseline_category(desc: str) -> str:
+    desc_lower = desc.lower()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        if any(kw in desc_lower for kw in keywords):
+            return category
+    return "Other"
+
+
+def _baseline_merchant(description: str) -> str:
+    for p in description.split():
+        p = p.strip(".,-")
+        if len(p) > 2 and not p.isdigit():
+            return p[:50]
+    return description[:50] or "Unknown"
+
+
+def _baseline_month(date_str) -> str | None:
+    s = str(date_str).strip()
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(s[:10], fmt).strftime("%Y-%m")
+        except ValueError:
+            continue
+    return None
+
+
+def baseline_analysis(transactions: list[dict]) -> dict:
+    total_income = total_expenses = 0.0
+    by_category, by_merchant, by_month = defaultdict(float), defaultdict(float), defaultdict(float)
+    for t in transactions:
+        amount = float(t.get("amount", 0))
+        desc = (t.get("description") or t.get("name") or "Unknown").strip()
+        cat = t.get("category") or _baseline_category(desc)
+        if amount > 0:
+            total_income += amount
+        else:
+            total_expenses += abs(amount)
+        by_category[cat] += abs(amount) if amount < 0 else amount
+        if amount < 0:
+            by_merchant[_baseline_merchant(desc)] += abs(amount)
+        if t.get("date"):
+            month = _baseline_month(t["date"])
+            if month:
+                by_month[month] += amount
+    return {
+        "total_income": round(total_income, 2),
+        "total_expenses": round(total_expenses, 2),
+        "cash_flow": round(total_income - total_expenses, 2),
+        "by_category": {k: round(v, 2) for k, v in by_category.items()},
+        "top_merchants": sorted(
+            [{"name": k, "amount": round(v, 2)} for k, v in by_merchant.items()], key=lambda x: -x["amount"]
+        )[:10],
+        "cash_flow_by_month": {k: round(v, 2) for k, v in sorted(by_month.items())},
+        "transaction_count": len(transactions),
+    }
+
+
+def _ordered(value):
+    """Dicts as item lists, so key order is compared too."""
+    if isinstance(value, dict):
+        return [(k, _ordered(v)) for k, v in value.items()]
+    if isinstance(value, list):
+        return [_ordered(v) for v in value]
+    return value
+
+
+WORDS = ["Tim Hortons", "Amazon.ca", "Shell", "Payroll deposit", "Netflix", "Loblaws", "Rogers", "Uber Eats",
+         "e-Transfer", "Costco", "Hydro One", "12 345", "Misc", "Air Canada"]
+# Cent amounts whose float sums round differently from their exact sums
+CENTS = [0.1, 0.2, 0.3, 0.7, 1.005, 2.675, 0.015, 10.0, 12.34, 99.99, 0.01]
+
+
+def dataset(seed: int, size: int, merchants: int = 40) -> list[dict]:
+    rng = random.Random(seed)
+    names = [f"{rng.choice(WORDS)} {i}" if i % 3 else f"Vendor{i}" for i in range(merchants)]
+    rows = []
+    for i in range(size):
+        amount = rng.choice(CENTS) * rng.choice([1, 3, 7]) * (1 if rng.random() < 0.2 else -1)
+        day = rng.randrange(1, 29)
+        date = rng.choice([f"2025-0{rng.randrange(1, 10)}-{day:02d}", f"{day:02d}/03/2025",
+                           "2025-02-10T08:00:00", "bad date", None])
+        row = {"date": date, "description": rng.choice(names), "amount": round(amount, 3)}
+        if rng.random() < 0.1:
+            row["category"] = "Plaid Category"
+        rows.append(row)
+    return rows
+
+
+def tied_dataset() -> list[dict]:
+    """Merchants with equal totals straddling the top-10 cut, in a known first-seen order."""
+    rows = [{"date": "2025-01-01", "description": f"Tie{i} shop", "amount": -5.0} for i in range(15)]
+    rows += [{"date": "2025-01-02", "description": f"Tie{i} shop", "amount": -0.1} for i in (14, 3)]
+    rows += [{"date": "2025-01-02", "description": f"Tie{i} shop", "amount": -0.2} for i in (14, 3)]
+    return rows
+
+
+@pytest.mark.parametrize("engine", ["rows", "columnar"])
+@pytest.mark.parametrize("rows", [dataset(1, 50), dataset(2, 3000), dataset(3, 5000, merchants=600), tied_dataset()],
+                         ids=["small", "large", "many-merchants", "ties"])
+def test_engines_match_baseline(monkeypatch, engine, rows):
+    if engine == "columnar":
+        pytest.importorskip("numpy")
+        monkeypatch.setattr(analysis, "COLUMNAR_THRESHOLD", 1)
+    else:
+        monkeypatch.setattr(analysis, "HAS_NUMPY", False)
+    assert _ordered(analyze_transactions(rows)) == _ordered(baseline_analysis(rows))
+
+
+def test_top_merchant_prefilter_matches_baseline(monkeypatch):
+    pytest.importorskip("numpy")
+    # More merchants than the threshold, many tied near the cut
+    monkeypatch.setattr(analysis, "COLUMNAR_THRESHOLD", 50)
+    rows = [{"date": "2025-01-01", "description": f"Shop{i % 400}", "amount": -(1 + (i % 7) * 0.1)} for i in range(4000)]
+    rows += [{"date": "2025-01-01", "description": "Shop399", "amount": -0.004}]
+    assert _ordered(analyze_transactions(rows)) == _ordered(baseline_analysis(rows))
+
+
+def test_top_merchants_ties_keep_first_seen_order():
+    by_merchant = {f"m{i}": 5.0 for i in range(12)} | {"big": 9.0, "m3b": 5.004}
+    names = [m["name"] for m in analysis._top_merchants(by_merchant)]
+    # 5.004 rounds to 5.00, so m3b ties with m0..m11 and comes after them
+    assert names == ["big"] + [f"m{i}" for i in range(9)]
+
+
+def _cents(rows: list[dict]) -> list[dict]:
+    # Statement amounts are whole cents; then summation order can't move a rounded total
+    return [{**r, "amount": round(r["amount"], 2)} for r in rows]
+
+
+@pytest.mark.parametrize("chunk_rows", [97, 1000])
+def test_iterator_in_chunks_matches_list(monkeypatch, chunk_rows):
+    monkeypatch.setattr(analysis, "STREAM_CHUNK_ROWS", chunk_rows)
+    rows = _cents(dataset(4, 3000))
+    assert len(rows) > chunk_rows
+    assert _ordered(analyze_transactions(iter(rows))) == _ordered(analyze_transactions(rows))
+
+
+def skewed_dataset(seed: int, size: int, merchants: int = 400) -> list[dict]:
+    """Zipf-like spend: merchant k gets about 1/k of the purchases."""
+    rng = random.Random(seed)
+    weights = [1 / (k + 1) for k in range(merchants)]
+    return [
+        {"date": "2025-03-01", "description": f"Shop{k}", "amount": -rng.choice([4.99, 12.5, 30.0, 75.25])}
+        for k in rng.choices(range(merchants), weights, k=size)
+    ]
+
+
+def test_merchant_sketch_top_merchants_match_exact(monkeypatch):
+    rows = skewed_dataset(5, 20000)
+    exact = analyze_transactions(rows)["top_merchants"]
+    monkeypatch.setattr(analysis, "MERCHANT_SKETCH_SIZE", 40)
+    monkeypatch.setattr(analysis, "STREAM_CHUNK_ROWS", 1000)
+    # 20 chunk partials, each bounded to 40 merchants and merged
+    sketched = analyze_transactions(iter(rows))["top_merchants"]
+    assert [m["name"] for m in sketched] == [m["name"] for m in exact]
+    # Sketched totals may only overestimate
+    assert all(s["amount"] >= e["amount"] for s, e in zip(sketched, exact))
+
+
+def test_merged_sketch_bounds_true_totals(monkeypatch):
+    monkeypatch.setattr(analysis, "MERCHANT_SKETCH_SIZE", 8)
+    rng = random.Random(6)
+    parts = [skewed_dataset(seed, rng.randrange(50, 300), merchants=60) for seed in range(12)]
+    true_totals: dict[str, float] = defaultdict(float)
+    for part in parts:
+        for t in part:
+            true_totals[t["description"]] -= t["amount"]
+    merged = analysis.merge_partials(analysis.partial_analysis(part) for part in parts)
+    assert len(merged["by_merchant"]) <= 8
+    floor = merged["merchant_floor"]
+    assert floor > 0
+    for name, total in true_totals.items():
+        # A listed merchant's estimate, or the floor for one that was dropped, is never below its total
+        assert merged["by_merchant"].get(name, floor) >= total - 1e-9, name
+
+
+def test_merge_adds_other_sides_floor_for_dropped_merchants(monkeypatch):
+    monkeypatch.setattr(analysis, "MERCHANT_SKETCH_SIZE", 2)
+    left = analysis._new_partial() | {"by_merchant": {"a": 10.0, "b": 6.0}, "merchant_floor": 3.0}
+    right = analysis._new_partial() | {"by_merchant": {"c": 8.0, "a": 1.0}, "merchant_floor": 2.0}
+    merged = analysis.merge_partials([left, right])
+    # c was dropped by left (up to its 3.0 floor) and b by right (up to 2.0): c 3+8, b 6+2.
+    # Bounded to two, b goes and its 8.0 becomes the floor
+    assert merged["by_merchant"] == {"a": 11.0, "c": 11.0}
+    assert merged["merchant_floor"] == 8.0
+
+
+def test_merged_statement_partials_match_concatenation():
+    statements = [_cents(dataset(seed, size)) for seed, size in ((7, 40), (8, 2500), (9, 0), (10, 300))]
+    merged = analysis.merge_partials(analysis.partial_analysis(s) for s in statements)
+    concatenated = [t for s in statements for t in s]
+    assert _ordered(analysis.finalize_partial(merged)) == _ordered(analyze_transactions(concatenated))
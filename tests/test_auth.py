@@ -0,0 +1,124 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+jwt = pytest.importorskip("jwt")
+ec = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.ec")
+
+from api import auth
+from api.auth import JWKSCache, TokenCache
+
+JWKS_URL = "http://jwks.test/auth/v1/.well-known/jwks.json"
+
+
+class LocalJWKS:
+    """Offline JWKS endpoint: local EC key pairs, published by kid, with a fetch counter."""
+
+    def __init__(self, delay: float = 0):
+        self.keys: dict[str, ec.EllipticCurvePrivateKey] = {}
+        self.published: set[str] = set()
+        self.fetches = 0
+        self.delay = delay
+
+    def add_key(self, kid: str, publish: bool = True) -> None:
+        self.keys[kid] = ec.generate_private_key(ec.SECP256R1())
+        if publish:
+            self.published.add(kid)
+
+    def fetch(self, url: str) -> dict:
+        assert url == JWKS_URL
+        self.fetches += 1
+        time.sleep(self.delay)
+        jwks = []
+        for kid in sorted(self.published):
+            jwk = json.loads(jwt.algorithms.ECAlgorithm.to_jwk(self.keys[kid].public_key()))
+            jwks.append({**jwk, "kid": kid, "alg": "ES256", "use": "sig"})
+        return {"keys": jwks}
+
+    def token(self, kid: str, sub: str = "user-1", exp_in: float = 3600) -> str:
+        claims = {"sub": sub, "aud": "authenticated", "exp": int(time.time() + exp_in)}
+        return jwt.encode(claims, self.keys[kid], algorithm="ES256", headers={"kid": kid})
+
+
+@pytest.fixture
+def jwks(monkeypatch):
+    stand_in = LocalJWKS()
+    stand_in.add_key("k1")
+    monkeypatch.setenv("SUPABASE_JWKS_URL", JWKS_URL)
+    monkeypatch.delenv("SUPABASE_JWT_SECRET", raising=False)
+    monkeypatch.setattr(auth, "_jwks_caches", {JWKS_URL: JWKSCache(JWKS_URL, min_refresh_interval=0, fetch=stand_in.fetch)})
+    monkeypatch.setattr(auth, "token_cache", TokenCache())
+    return stand_in
+
+
+def test_verified_token_is_cached(jwks):
+    token = jwks.token("k1")
+    assert auth.verify_token(token) == "user-1"
+    assert auth.verify_token(token) == "user-1"
+    assert jwks.fetches == 1
+    assert auth.token_cache.get(token) == "user-1"
+
+
+def test_unknown_kid_refreshes_jwks(jwks):
+    assert auth.verify_token(jwks.token("k1")) == "user-1"
+    # Key rotation: a new kid shows up in the JWKS after the first fetch
+    jwks.add_key("k2")
+    assert auth.verify_token(jwks.token("k2", sub="user-2")) == "user-2"
+    assert jwks.fetches == 2
+
+
+def test_unknown_kid_refresh_is_rate_limited(jwks):
+    cache = auth._jwks_caches[JWKS_URL]
+    cache.min_refresh_interval = 3600
+    assert auth.verify_token(jwks.token("k1")) == "user-1"
+    jwks.add_key("unpublished", publish=False)
+    assert auth.verify_token(jwks.token("unpublished")) is None
+    assert jwks.fetches == 1
+
+
+def test_expired_token_is_rejected_and_cache_entries_expire(jwks, monkeypatch):
+    assert auth.verify_token(jwks.token("k1", exp_in=-60)) is None
+    token = jwks.token("k1", exp_in=60)
+    assert auth.verify_token(token) == "user-1"
+    later = time.time() + 120
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert auth.token_cache.get(token) is None
+
+
+def test_concurrent_misses_share_one_fetch(jwks):
+    jwks.delay = 0.2
+    cache = auth._jwks_caches[JWKS_URL]
+    keys = []
+    threads = [threading.Thread(target=lambda: keys.append(cache.get_signing_key("k1"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(keys) == 8
+    assert jwks.fetches == 1
+
+
+def test_async_verification_does_not_block_the_loop(jwks):
+    jwks.delay = 0.3
+    token = jwks.token("k1")
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        sub = await auth.verify_token_async(token)
+        task.cancel()
+        return sub, ticks
+
+    sub, ticks = asyncio.run(main())
+    assert sub == "user-1"
+    assert ticks >= 10
@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from api.analysis import CATEGORY_KEYWORDS
+from api.categorizer import KeywordCategorizer
+
+
+def baseline_category(keywords: dict[str, list[str]], description: str | None, default: str = "Other") -> str:
+    """The per-keyword scan KeywordCategorizer replaces."""
+    desc_lower = (description or "").lower()
+    for category, kws in keywords.items():
+        if any(kw in desc_lower for kw in kws):
+            return category
+    return default
+
+
+# Overlapping keywords and prefix collisions across categories, lower priority first or last
+TRICKY = {
+    "A": ["transit", "ab"],
+    "B": ["trans", "abc", "go transit", "b"],
+    "C": ["transfer", "transfer in", "abcd", "c"],
+    "D": ["uber eats", "uber", "eat"],
+}
+
+
+@pytest.mark.parametrize("description", [
+    "UBER EATS order", "Uber trip", "uber eats", "TRANSFER IN from savings", "e-Transfer",
+    "Go Transit fare", "gO tRaNsIt", "transferin", "TRANS", "abcd", "ABC", "xabx", "bca",
+    "Shell gas", "petro-canada", "Metro grocery", "Starbucks", "", None, "12345", "éclair café",
+])
+@pytest.mark.parametrize("keywords", [CATEGORY_KEYWORDS, TRICKY], ids=["repo", "tricky"])
+def test_matches_baseline_scan(keywords, description):
+    assert KeywordCategorizer(keywords).categorize(description) == baseline_category(keywords, description)
+
+
+def test_matches_baseline_scan_on_random_descriptions():
+    rng = random.Random(5)
+    keywords = [kw for kws in (*CATEGORY_KEYWORDS.values(), *TRICKY.values()) for kw in kws]
+    filler = ["", " ", "#12", "x", "-", "ON", "store#"]
+    categorizers = [(source, KeywordCategorizer(source)) for source in (CATEGORY_KEYWORDS, TRICKY)]
+    for _ in range(3000):
+        parts = [rng.choice(keywords + filler) for _ in range(rng.randint(1, 4))]
+        text = "".join(p.upper() if rng.random() < 0.3 else p for p in parts)
+        # Cut keywords mid-word now and then, for partial and overlapping matches
+        if rng.random() < 0.3:
+            text = text[rng.randrange(len(text) + 1):]
+        for source, categorizer in categorizers:
+            assert categorizer.categorize(text) == baseline_category(source, text), text
@@ -0,0 +1,118 @@
+import asyncio
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from api import jobs
+from api.jobs import DirectoryQueue, SQLiteQueue
+from api.transactions import TransactionBatch
+
+
+@pytest.fixture(params=["sqlite", "dir"])
+def queue(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_DIR", str(tmp_path))
+    return SQLiteQueue(tmp_path) if request.param == "sqlite" else DirectoryQueue(tmp_path)
+
+
+def _submit(queue, tmp_path, files: int = 2) -> dict:
+    spools = []
+    for i in range(files):
+        path = tmp_path / f"upload-{i}.pdf"
+        path.write_bytes(b"%PDF-1.4")
+        spools.append({"index": i, "filename": f"s{i}.pdf", "size": 8, "sha256": str(i), "path": str(path)})
+    return jobs.submit(queue, spools)
+
+
+def test_stale_claim_is_fenced_off(queue, tmp_path, monkeypatch):
+    _submit(queue, tmp_path)
+    first = queue.claim()
+    monkeypatch.setattr(jobs, "JOB_STALE_SECONDS", -1)
+    second = queue.claim()
+    assert second["id"] == first["id"] and second["claim"] != first["claim"]
+
+    first["status"] = "done"
+    assert not queue.heartbeat(first)
+    assert not queue.save(first)
+    assert queue.get(first["id"])["claim"] == second["claim"]
+    second["status"] = "done"
+    assert queue.save(second)
+
+
+def test_heartbeat_keeps_a_slow_job_claimed(queue, tmp_path, monkeypatch):
+    _submit(queue, tmp_path)
+    job = queue.claim()
+    monkeypatch.setattr(jobs, "JOB_STALE_SECONDS", 0.3)
+    time.sleep(0.2)
+    assert queue.heartbeat(job)
+    time.sleep(0.2)
+    assert queue.claim() is None
+    time.sleep(0.2)
+    assert queue.claim()["id"] == job["id"]
+
+
+def _fake_pipeline(monkeypatch, parse_seconds: float, during_parse=None):
+    async def parse_upload(f, cache):
+        if during_parse:
+            during_parse()
+        await asyncio.sleep(parse_seconds)
+        batch = TransactionBatch()
+        batch.append("2025-01-01", f["filename"], -1.0)
+        return batch
+
+    async def run_parse(func, *args):
+        return func(*args)
+
+    monkeypatch.setattr("api.parse_executor.parse_upload", parse_upload)
+    monkeypatch.setattr("api.parse_executor.run_parse", run_parse)
+    monkeypatch.setattr("api.parse_cache.get_parse_cache", lambda: None)
+
+
+class CountingQueue:
+    def __init__(self, queue):
+        self.queue = queue
+        self.heartbeats = 0
+
+    def heartbeat(self, job):
+        self.heartbeats += 1
+        return self.queue.heartbeat(job)
+
+    def __getattr__(self, name):
+        return getattr(self.queue, name)
+
+
+def test_run_job_heartbeats_while_parsing(queue, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_HEARTBEAT_SECONDS", 0.05)
+    _fake_pipeline(monkeypatch, parse_seconds=0.4)
+    job = _submit(queue, tmp_path)
+    counting = CountingQueue(queue)
+    asyncio.run(jobs.run_job(counting, queue.claim()))
+    assert counting.heartbeats >= 3
+    record = queue.get(job["id"])
+    assert record["status"] == "done" and record["result"]["analysis"]["transaction_count"] == 2
+    assert not jobs._upload_dir(job["id"]).exists()
+
+
+def test_run_job_discards_result_after_losing_claim(queue, tmp_path, monkeypatch):
+    job = _submit(queue, tmp_path, files=1)
+    stolen = {}
+
+    def steal():
+        monkeypatch.setattr(jobs, "JOB_STALE_SECONDS", -1)
+        stolen.update(queue.claim())
+
+    _fake_pipeline(monkeypatch, parse_seconds=0, during_parse=steal)
+    asyncio.run(jobs.run_job(queue, queue.claim()))
+    record = queue.get(job["id"])
+    assert record["status"] == "running" and record["claim"] == stolen["claim"]
+    # The uploads now belong to the worker that holds the claim
+    assert jobs._upload_dir(job["id"]).exists()
+
+
+def test_api_imports_without_fcntl():
+    # fcntl is POSIX only; the API and the SQLite queue must not need it
+    code = ("import sys; sys.modules['fcntl'] = None; import api.index, api.jobs, tempfile; "
+            "api.jobs.SQLiteQueue(tempfile.mkdtemp()).claim()")
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).resolve().parent.parent)
@@ -0,0 +1,27 @@
+import threading
+
+from api.parse_cache import ParseCache
+from api.transactions import TransactionBatch
+
+
+def test_stats_count_every_lookup_under_concurrency():
+    cache = ParseCache(max_bytes=1024 * 1024)
+    batch = TransactionBatch.from_dicts([{"date": "2025-01-01", "description": "Coffee", "amount": -4.5}])
+    cache.set("hit", batch)
+    threads, per_thread = 8, 2000
+    barrier = threading.Barrier(threads)
+
+    def lookups():
+        barrier.wait()
+        for i in range(per_thread):
+            cache.get("hit" if i % 2 else "miss")
+
+    workers = [threading.Thread(target=lookups) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    stats = cache.stats()
+    assert stats["memory_hits"] == threads * per_thread // 2
+    assert stats["misses"] == threads * per_thread // 2
+    assert stats["hit_rate"] == 0.5
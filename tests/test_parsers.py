@@ -0,0 +1,192 @@
+import io
+import random
+from datetime import date
+
+import pytest
+
+pdfplumber = pytest.importorskip("pdfplumber")
+
+from api.parsers.base import read_date, statement_period, tokenize_line
+from api.parsers.document import StatementDocument
+from api.parsers.wealthsimple import _is_activity_header, parse_wealthsimple
+from benchmarks.synthetic_pdf import boilerplate_page, render_pdf, wealthsimple_pages
+
+
+def _open(pages: list[list[tuple]]) -> StatementDocument:
+    return StatementDocument(pdfplumber.open(io.BytesIO(render_pdf(pages))))
+
+
+def _wealthsimple(rows: int = 5, seed: int = 0) -> list[list[tuple]]:
+    """Cover, two Activity pages, legal page."""
+    return wealthsimple_pages(2, rows, random.Random(seed), date(2025, 3, 1))
+
+
+def test_wealthsimple_reads_activity_resumed_after_other_page():
+    pages = _wealthsimple()
+    expected = parse_wealthsimple(_open(pages))
+    assert len(expected) == 10
+    cover, first, second, legal = pages
+    # A non-Activity page between the two Activity sections
+    split = parse_wealthsimple(_open([cover, first, boilerplate_page(0), second, legal]))
+    assert split.to_dicts() == expected.to_dicts()
+
+
+def test_header_split_across_baselines_still_found():
+    pages = _wealthsimple(seed=1)
+    expected = parse_wealthsimple(_open(pages))
+    # AMOUNT (CAD) set a point higher than the rest of its header, e.g. in another font size
+    nudged = [
+        [("t", op[1], op[2] + 1, op[3]) if op[0] == "t" and op[3] == "AMOUNT (CAD)" else op for op in page]
+        for page in pages
+    ]
+    doc = _open(nudged)
+    assert "date" in doc.pages[1].char_lines[1] and "amount(cad)" in doc.pages[1].char_lines[1]
+    assert parse_wealthsimple(doc).to_dicts() == expected.to_dicts()
+
+
+def test_generic_page_pruning_leaves_output_unchanged(monkeypatch):
+    from api.parsers import generic
+    from benchmarks.synthetic_pdf import _ruled_table, generic_table_pages
+
+    pages = generic_table_pages(3, 6, random.Random(2), date(2025, 3, 1))
+    # An unruled page, then a ruled table without a header row, then a boxed disclosure page
+    headerless = _ruled_table([50, 130, 380, 470, 570], 730, ["2025-03-30", "Hydro One", "-95.10", "100.00"], [
+        ["2025-03-31", "Interest", "0.42", "100.42"],
+    ])
+    pages += [[("t", 50, 740, "Summary 2025-03-31 Closing balance 100.42")], headerless, boilerplate_page(0)]
+
+    pruned = generic.parse_generic(_open(pages))
+    monkeypatch.setattr(generic, "_table_pages", lambda doc: iter(doc.pages))
+    every_page = generic.parse_generic(_open(pages))
+    assert len(pruned) == 19  # 18 rows under headers, plus the headerless table's
+    assert pruned.to_dicts() == every_page.to_dicts()
+
+
+def test_learned_layout_does_not_hide_a_second_activity_table():
+    from api.parsers.layouts import get_layout_cache
+    from benchmarks.synthetic_pdf import _ruled_table
+
+    get_layout_cache().clear()
+    cover, single, _, legal = _wealthsimple(rows=4, seed=3)
+    columns = [50, 120, 190, 400, 490, 570]
+    header = ["DATE", "POSTED DATE", "DESCRIPTION", "AMOUNT (CAD)", "BALANCE (CAD)"]
+    rows = [["Mar 20", "Mar 20", f"Store {i}", f"-${i}.00", "$100.00"] for i in range(3)]
+    # The first table sits where the learned layout expects it; the second is under a sub-heading
+    double = [
+        ("t", 50, 755, "Activity"), *_ruled_table(columns, 730, header, rows),
+        ("t", 50, 600, "Activity (continued)"), *_ruled_table(columns, 575, header, rows),
+    ]
+    # The single-table page is parsed first and teaches the layout
+    txns = parse_wealthsimple(_open([cover, single, double, legal]))
+    assert len(txns) == 4 + 6
+
+
+DEC_JAN = (date(2024, 12, 10), date(2025, 1, 9))
+MARCH = (date(2025, 3, 1), date(2025, 3, 31))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Dec 15", date(2024, 12, 15)),
+    ("Jan 3", date(2025, 1, 3)),
+    ("15 Dec", date(2024, 12, 15)),
+    ("3 January", date(2025, 1, 3)),
+])
+def test_year_taken_from_period_spanning_new_year(text, expected):
+    assert read_date(text, DEC_JAN) == expected
+
+
+def test_numeric_date_order_chosen_by_period():
+    # Day first unless only month first falls in the period
+    assert read_date("03/01/2025", MARCH) == date(2025, 3, 1)
+    assert read_date("01/03/2025", MARCH) == date(2025, 3, 1)
+    assert read_date("01/03/2025") == date(2025, 3, 1)
+    # Neither reading is near the period: day first
+    assert read_date("07/08/2025", MARCH) == date(2025, 8, 7)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Statement period March 1 - March 28, 2025", (date(2025, 3, 1), date(2025, 3, 28))),
+    ("2025-03-01 to 2025-03-31", (date(2025, 3, 1), date(2025, 3, 31))),
+    ("Dec 10 - Jan 9, 2025", (date(2024, 12, 10), date(2025, 1, 9))),
+    ("Monthly statement, February 2024", (date(2024, 2, 1), date(2024, 2, 29))),
+    ("No period here", None),
+])
+def test_statement_period(text, expected):
+    assert statement_period(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Statement Dec 9999", None),
+    ("Mar 0000", None),
+    ("May 0099", None),
+    ("Jan 1 - Jan 31, 0001", None),
+    ("Printed Mar 0000, statement for April 2025", (date(2025, 4, 1), date(2025, 4, 30))),
+])
+def test_statement_period_skips_impossible_years(text, expected):
+    assert statement_period(text) == expected
+
+
+def test_iso_date_not_read_as_two_digit_year():
+    line = tokenize_line("2025-03-28 COFFEE 4.50")
+    assert line.date == "2025-03-28"
+    assert line.description == "COFFEE"
+    assert line.amount == 4.5
+
+
+def test_header_on_two_lines_still_found():
+    pages = _wealthsimple(seed=2)
+    expected = parse_wealthsimple(_open(pages))
+    # DESCRIPTION set at the top of its cell and the amount columns at the bottom, further apart
+    # than the line tolerance: no single line has both
+    raised = {"DATE", "POSTED DATE", "DESCRIPTION"}
+    lowered = {"AMOUNT (CAD)", "BALANCE (CAD)"}
+
+    def shift(op):
+        if op[0] != "t" or op[2] != 730:
+            return op
+        return ("t", op[1], op[2] + 4 if op[3] in raised else op[2] - 4 if op[3] in lowered else op[2], op[3])
+
+    two_line = [[shift(op) for op in page] for page in pages]
+    doc = _open(two_line)
+    assert not any(_is_activity_header(line) for page in doc.pages for line in page.char_lines)
+    assert len(expected) == 10
+    assert parse_wealthsimple(doc).to_dicts() == expected.to_dicts()
+
+
+def test_fallback_to_generic_extracts_each_page_once(monkeypatch, tmp_path):
+    from collections import Counter
+
+    from api.parsers import registry
+    from benchmarks.synthetic_pdf import _ruled_table
+
+    header = ["DATE", "POSTED DATE", "DESCRIPTION", "AMOUNT (CAD)", "BALANCE (CAD)"]
+    # The Activity table holds only its header (the template finds nothing); the rows follow
+    # as text, which the generic text path reads
+    activity = [("t", 50, 755, "Activity"), *_ruled_table([50, 120, 190, 400, 490, 570], 730, header, [])]
+    shops = ["Corner Store", "Book Shop", "Bakery Place"]
+    activity += [("t", 50, 690 - 14 * i, f"2025-03-0{i + 1} {shop} -${i + 1}.25") for i, shop in enumerate(shops)]
+    pages = [[("t", 50, 740, "Wealthsimple Cash"), ("t", 50, 720, "Monthly statement March 2025")],
+             activity, [("t", 50, 740, "Legal disclosures Wealthsimple Inc., 80 Spadina Ave")]]
+    path = tmp_path / "statement.pdf"
+    path.write_bytes(render_pdf(pages))
+
+    calls = Counter()
+    for name in ("extract_text", "extract_words", "extract_tables", "find_tables"):
+        original = getattr(pdfplumber.page.Page, name)
+
+        def counted(self, *args, _name=name, _original=original, **kwargs):
+            calls[_name, self.page_number] += 1
+            return _original(self, *args, **kwargs)
+
+        monkeypatch.setattr(pdfplumber.page.Page, name, counted)
+    fallbacks = []
+    monkeypatch.setattr(registry, "label", lambda **labels: fallbacks.append(labels.get("fallback")))
+
+    txns = registry.parse_statement(str(path))
+    assert fallbacks[-1] is True
+    assert [(t["description"], t["amount"]) for t in txns] == [
+        ("Corner Store", -1.25), ("Book Shop", -2.25), ("Bakery Place", -3.25)]
+    # detect_bank, the template and the generic fallback shared every extraction
+    assert calls and max(calls.values()) == 1
+    assert {page for (name, page) in calls if name == "extract_text"} == {1, 2, 3}
+    assert ("find_tables", 2) in calls
@@ -0,0 +1,102 @@
+import pytest
+
+pytest.importorskip("plaid")
+
+from api import plaid_sync
+from api.plaid_sync import DirectoryStore, MemoryStore, item_key, sync_transactions
+
+from fake_plaid import FakePlaid, plaid_txn
+
+TOKEN = "access-sandbox-test"
+
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    monkeypatch.setattr(plaid_sync, "PLAID_SYNC_PAGE_SIZE", 2)
+
+
+def _rows(result) -> list[tuple]:
+    return [(t["date"], t["description"], t["amount"], t["category"]) for t in result["transactions"].to_dicts()]
+
+
+def test_first_sync_pages_through_history_and_stores_cursor():
+    plaid, store = FakePlaid(), MemoryStore()
+    plaid.add(
+        plaid_txn("a", "2025-01-03", "COFFEE", 4.5, "FOOD_AND_DRINK"),
+        plaid_txn("b", "2025-01-05", "PAYROLL", -2000.0, "INCOME"),
+        plaid_txn("c", "2025-01-04", "GROCER", 80.25),
+    )
+    result = sync_transactions(plaid, TOKEN, store)
+    assert [r["cursor"] for r in plaid.requests] == [None, "2"]
+    assert result["added"] == 3 and result["removed"] == 0
+    assert _rows(result) == [
+        ("2025-01-05", "PAYROLL", 2000.0, "INCOME"),
+        ("2025-01-04", "GROCER", -80.25, None),
+        ("2025-01-03", "COFFEE", -4.5, "FOOD_AND_DRINK"),
+    ]
+    assert store.get_cursor(item_key(TOKEN)) == "3"
+
+
+def test_resync_resumes_from_cursor_and_applies_modified_and_removed(tmp_path):
+    plaid = FakePlaid()
+    plaid.add(plaid_txn("a", "2025-01-03", "COFFEE", 4.5), plaid_txn("b", "2025-01-04", "GROCER", 80.0))
+    sync_transactions(plaid, TOKEN, DirectoryStore(tmp_path))
+
+    plaid.modify(plaid_txn("b", "2025-01-04", "GROCER", 82.0))
+    plaid.remove("a")
+    plaid.add(plaid_txn("d", "2025-01-06", "RENT", 1500.0))
+    # A fresh store instance (e.g. after a cold start) picks up the persisted cursor
+    result = sync_transactions(plaid, TOKEN, DirectoryStore(tmp_path))
+
+    assert [r["cursor"] for r in plaid.requests] == [None, "2", "4"]
+    assert result["added"] == 2 and result["removed"] == 1
+    assert _rows(result) == [
+        ("2025-01-06", "RENT", -1500.0, None),
+        ("2025-01-04", "GROCER", -82.0, None),
+    ]
+
+
+def test_removed_in_same_delta_as_added_is_not_stored():
+    plaid, store = FakePlaid(), MemoryStore()
+    plaid.add(plaid_txn("a", "2025-01-03", "PENDING", 10.0), plaid_txn("b", "2025-01-04", "KEEP", 1.0))
+    plaid.remove("a")
+    result = sync_transactions(plaid, TOKEN, store)
+    assert _rows(result) == [("2025-01-04", "KEEP", -1.0, None)]
+
+
+def test_mutation_during_pagination_restarts_from_original_cursor():
+    plaid, store = FakePlaid(), MemoryStore()
+    plaid.add(*(plaid_txn(str(i), f"2025-01-0{i + 1}", f"T{i}", 1.0) for i in range(5)))
+    plaid.fail_on = {1}
+    result = sync_transactions(plaid, TOKEN, store)
+    assert [r["cursor"] for r in plaid.requests] == [None, "2", None, "2", "4"]
+    assert len(result["transactions"]) == 5
+
+
+def test_store_backend_selection(monkeypatch, tmp_path):
+    monkeypatch.setattr(plaid_sync, "PLAID_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr("api.supabase_client.get_supabase", lambda: None)
+
+    monkeypatch.setattr(plaid_sync, "PLAID_STORE_BACKEND", "memory")
+    assert isinstance(plaid_sync._create_store(), MemoryStore)
+    monkeypatch.setattr(plaid_sync, "PLAID_STORE_BACKEND", "")
+    assert isinstance(plaid_sync._create_store(), DirectoryStore)
+    # Persistence was asked for: no silent fallback
+    monkeypatch.setattr(plaid_sync, "PLAID_STORE_BACKEND", "supabase")
+    with pytest.raises(RuntimeError):
+        plaid_sync._create_store()
+
+
+def test_transactions_endpoint_maps_misconfigured_client_to_http_error(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from api import index
+
+    def broken_client():
+        raise ValueError("Invalid host")
+
+    monkeypatch.setattr(index, "get_plaid_client", broken_client)
+    with TestClient(index.app, raise_server_exceptions=False) as client:
+        resp = client.post("/api/transactions", json={"access_token": TOKEN})
+    assert resp.status_code == 500
+    assert "Plaid credentials" in resp.json()["detail"]
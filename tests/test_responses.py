@@ -0,0 +1,129 @@
+import asyncio
+import gzip
+import json
+import zlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import index, responses
+from api.responses import COMPRESS_MIN_SIZE, CompressionMiddleware, index_ranges
+from api.transactions import TransactionBatch
+
+BIG = b'{"rows":"' + b"x" * (2 * COMPRESS_MIN_SIZE) + b'"}'
+
+
+def _app(chunks: list[bytes], content_type: bytes = b"application/json"):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+def _call(app, accept_encoding: str | None) -> list[dict]:
+    sent = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        sent.append(message)
+
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": headers}
+    asyncio.run(CompressionMiddleware(app)(scope, receive, send))
+    return sent
+
+
+def _encoding(messages: list[dict]) -> str | None:
+    headers = dict(messages[0]["headers"])
+    value = headers.get(b"content-encoding")
+    return value.decode() if value else None
+
+
+def _body(messages: list[dict]) -> bytes:
+    return b"".join(m.get("body", b"") for m in messages[1:])
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("gzip, deflate, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip", "gzip"),
+    ("identity", None),
+    (None, None),
+])
+def test_negotiation(accept, expected):
+    messages = _call(_app([BIG]), accept)
+    assert _encoding(messages) == expected
+    body = _body(messages)
+    if expected == "br":
+        body = responses.brotli.decompress(body)
+    elif expected == "gzip":
+        body = gzip.decompress(body)
+    assert body == BIG
+
+
+def test_gzip_when_brotli_is_not_installed(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+    messages = _call(_app([BIG]), "br, gzip")
+    assert _encoding(messages) == "gzip"
+    assert gzip.decompress(_body(messages)) == BIG
+
+
+@pytest.mark.parametrize("accept", ["br", "gzip"])
+def test_small_bodies_left_uncompressed(accept):
+    small = b'{"ok":true}'
+    messages = _call(_app([small]), accept)
+    assert _encoding(messages) is None
+    assert _body(messages) == small
+
+
+def _decompressor(encoding: str):
+    if encoding == "br":
+        return responses.brotli.Decompressor().process
+    return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress
+
+
+@pytest.mark.parametrize("accept", ["br", "gzip"])
+def test_ndjson_chunks_flushed(accept):
+    records = [json.dumps({"type": "file", "index": i, "pad": "y" * 600}).encode() + b"\n" for i in range(4)]
+    messages = _call(_app(records, b"application/x-ndjson"), accept)
+    assert _encoding(messages) == accept
+    decompress = _decompressor(accept)
+    seen = b""
+    # Each body message decompresses to everything sent so far, without waiting for the end
+    for i, message in enumerate(messages[1:len(records)]):
+        seen += decompress(message["body"])
+        assert seen == b"".join(records[:i + 1])
+
+
+def test_index_ranges():
+    groups = [{"transactions": [1, 2]}, {"transactions": TransactionBatch()}, {"transactions": None}, {"transactions": [3]}]
+    assert index_ranges(groups) == [
+        {"transactions_range": [0, 2]}, {"transactions_range": [2, 2]},
+        {"transactions_range": [2, 2]}, {"transactions_range": [2, 3]},
+    ]
+
+
+def test_dedupe_ranges_slice_each_files_rows(monkeypatch):
+    per_file = {
+        "a.pdf": [{"date": "2025-03-01", "description": "Coffee", "amount": -4.5}],
+        "empty.pdf": [],
+        "b.pdf": [{"date": "2025-03-02", "description": "Payroll", "amount": 2000.0},
+                  {"date": "2025-03-03", "description": "Metro", "amount": -80.25}],
+    }
+
+    async def fake_parse(spool, cache):
+        return TransactionBatch.from_dicts(per_file[spool["filename"]])
+
+    monkeypatch.setattr(index, "parse_upload", fake_parse)
+    files = [("statements", (name, b"%PDF-1.4", "application/pdf")) for name in per_file]
+    with TestClient(index.app) as client:
+        full = client.post("/api/upload_statement", files=files).json()
+        deduped = client.post("/api/upload_statement", params={"dedupe": "true"}, files=files).json()
+    assert deduped["transactions"] == full["transactions"]
+    for file, full_file in zip(deduped["files"], full["files"]):
+        assert "transactions" not in file
+        start, end = file["transactions_range"]
+        assert deduped["transactions"][start:end] == full_file["transactions"]
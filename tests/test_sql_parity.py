@@ -0,0 +1,151 @@
+"""The SQL helpers and RPCs in supabase/migrations against the Python rules they mirror."""
+from datetime import date
+
+import pytest
+
+from api.analysis import (
+    _extract_merchant,
+    _infer_category,
+    _parse_date,
+    filter_transactions,
+    finalize_partial,
+    merge_partials,
+    partial_analysis,
+)
+from conftest import MIGRATIONS, SCHEMA
+
+
+@pytest.mark.parametrize("raw", [
+    "2025-01-15", "2025-1-5", "2025-01-15T10:30:00", "15/01/2025", "15-01-2025", "2025/01/15",
+    "5 Jan 2025", "15 Jan 2025", "15 jan 2025", "15 JANUARY 2025", "15  March   2025",
+    "1 Jan 2025 (posted)", "15 Sept 2025", "15 Jan 2025 posted", "2025-02-30", "31 Feb 2025",
+    "Mar 3", "", "   ",
+])
+def test_parse_statement_date_matches_python(pg, raw):
+    pg.execute("select public.parse_statement_date(%s)", (raw,))
+    assert pg.fetchone()[0] == _parse_date(raw)
+
+
+def test_generated_category_keywords_are_current():
+    from api.category_sql import HEADER, category_keywords_sql
+
+    migrations = sorted(MIGRATIONS.glob("*.sql"))
+    latest = next(p for p in reversed(migrations) if HEADER in p.read_text())
+    text = latest.read_text()
+    assert text[text.index(HEADER):] == category_keywords_sql(), (
+        "CATEGORY_KEYWORDS changed: write a new migration with python -m api.category_sql"
+    )
+    schema = SCHEMA.read_text()
+    assert schema[schema.index(HEADER):] == category_keywords_sql()
+
+
+SCHEMA_OBJECTS = """
+select p.proname, pg_get_functiondef(p.oid) from pg_proc p
+where p.pronamespace = 'public'::regnamespace order by 1, 2
+"""
+SCHEMA_TRIGGERS = """
+select tgname, pg_get_triggerdef(oid) from pg_trigger
+where tgrelid = 'public.user_statements'::regclass and not tgisinternal order by 1
+"""
+
+
+def test_schema_file_mirrors_migrations(pg):
+    snapshots = []
+    for _ in range(2):
+        pg.execute(SCHEMA_OBJECTS)
+        functions = pg.fetchall()
+        pg.execute(SCHEMA_TRIGGERS)
+        snapshots.append((functions, pg.fetchall()))
+        # Re-running the schema file over the migrated database changes no definition
+        pg.execute(SCHEMA.read_text())
+    assert snapshots[0] == snapshots[1]
+    assert {name for name, _ in snapshots[0][0]} >= {
+        "parse_statement_date", "infer_transaction_category", "extract_transaction_merchant",
+        "explode_statement_transactions", "analyze_user_transactions",
+    }
+
+
+DESCRIPTIONS = [
+    "UBER EATS order", "Uber trip", "TRANSFER IN from savings", "e-Transfer to Sam",
+    "Shell gas station", "Go Transit fare", "Metro grocery", "Costco Wholesale",
+    "Tim Hortons #123", "RANDOM VENDOR 42", "Payroll deposit", "  spaced  name  ",
+    "12345 678", "a.b, -- xyz", "",
+]
+
+
+def test_category_and_merchant_helpers_match_python(pg):
+    for desc in DESCRIPTIONS:
+        pg.execute("select public.infer_transaction_category(%s), public.extract_transaction_merchant(%s)",
+                   (desc, desc))
+        category, merchant = pg.fetchone()
+        assert category == _infer_category(desc), desc
+        if desc:
+            assert merchant == _extract_merchant(desc), desc
+
+
+def _statement(*rows) -> list[dict]:
+    return [{"date": d, "description": desc, "amount": amount} for d, desc, amount in rows]
+
+
+STATEMENTS = [
+    # (created_at, transactions), inserted out of order: both paths follow created_at
+    ("2025-02-01T00:00:00Z", _statement(
+        ("2025-01-31", "Netflix", -15.99),
+        ("15 Feb 2025", "Spotify premium", -31.98),
+        ("2025-02-03", "Netflix", -15.99),
+        ("2025-02-04", "Coffee 0.1", -0.10),
+        ("2025-02-04", "Coffee 0.2", -0.20),
+        ("not a date", "Refund", 20.0),
+    )),
+    ("2025-01-01T00:00:00Z", _statement(
+        ("2025-01-02", "Payroll deposit", 2000.0),
+        *((f"2025-01-{i + 3:02d}", f"Vendor{i} shop", -(10.0 + i % 3)) for i in range(12)),
+        ("15 January 2025", "Uber trip", -12.5),
+    ) + [{"date": "2025-01-20", "description": "Rogers", "amount": -80.0, "category": "Phone"}]),
+]
+
+
+def _insert_statements(pg) -> str:
+    import json
+    import uuid
+
+    user_id = str(uuid.uuid4())
+    pg.execute("insert into auth.users (id) values (%s)", (user_id,))
+    values = [(user_id, f"s{i}.pdf", json.dumps(txns), created) for i, (created, txns) in enumerate(STATEMENTS)]
+    args = ",".join(pg.mogrify("(%s, %s, %s::jsonb, %s::timestamptz)", v).decode() for v in values)
+    pg.execute(f"insert into public.user_statements (user_id, filename, transactions, created_at) values {args}")
+    return user_id
+
+
+def _python_analysis(**filters) -> dict:
+    parts = [txns for _, txns in sorted(STATEMENTS)]
+    if filters:
+        parts = [filter_transactions(p, **filters) for p in parts]
+    return finalize_partial(merge_partials(partial_analysis(p) for p in parts))
+
+
+def _ordered(value):
+    """Dicts as item lists, so key order is compared too."""
+    if isinstance(value, dict):
+        return [(k, _ordered(v)) for k, v in value.items()]
+    if isinstance(value, list):
+        return [_ordered(v) for v in value]
+    return value
+
+
+def test_trigger_explodes_inserted_statements(pg):
+    user_id = _insert_statements(pg)
+    pg.execute("select count(*) from public.transactions where user_id = %s", (user_id,))
+    assert pg.fetchone()[0] == sum(len(txns) for _, txns in STATEMENTS)
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"date_from": date(2025, 1, 10), "date_to": date(2025, 2, 3)},
+    {"category": "Shopping"},
+])
+def test_analyze_user_transactions_matches_python(pg, filters):
+    user_id = _insert_statements(pg)
+    params = {"p_from": filters.get("date_from"), "p_to": filters.get("date_to"), "p_category": filters.get("category")}
+    pg.execute("select public.analyze_user_transactions(%s, %s, %s, %s)", (user_id, *params.values()))
+    assert _ordered(pg.fetchone()[0]) == _ordered(_python_analysis(**filters))
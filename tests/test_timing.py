@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import index, timing
+
+
+def test_metrics_disabled_without_token(monkeypatch):
+    monkeypatch.setattr(index, "METRICS_TOKEN", None)
+    with TestClient(index.app) as client:
+        assert client.get("/api/metrics").status_code == 404
+
+
+def test_metrics_require_token(monkeypatch):
+    monkeypatch.setattr(index, "METRICS_TOKEN", "s3cret")
+    with TestClient(index.app) as client:
+        assert client.get("/api/metrics").status_code == 401
+        assert client.get("/api/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+        resp = client.get("/api/metrics", headers={"Authorization": "Bearer s3cret"})
+        assert resp.status_code == 200
+        assert "twoloonies_request_duration_seconds" in resp.text
+
+
+async def _sleeping_app(scope, receive, send):
+    await asyncio.sleep(0.02)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _request(middleware, path):
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    await middleware({"type": "http", "method": "GET", "path": path}, receive, send)
+
+
+@pytest.fixture
+def profiling(monkeypatch, tmp_path):
+    monkeypatch.setattr(timing, "PROFILE_SLOW_MS", 1)
+    monkeypatch.setattr(timing, "PROFILE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_profiles_a_slow_request_running_alone(profiling, monkeypatch):
+    monkeypatch.setattr(timing, "PROFILE_SAMPLE_RATE", 1.0)
+    asyncio.run(_request(timing.TimingMiddleware(_sleeping_app), "/alone"))
+    assert [p.name.split("-", 2)[2].rsplit("-", 1)[0] for p in profiling.iterdir()] == ["GET_alone"]
+
+
+def test_drops_profiles_shared_with_other_requests(profiling, monkeypatch):
+    monkeypatch.setattr(timing, "PROFILE_SAMPLE_RATE", 1.0)
+    middleware = timing.TimingMiddleware(_sleeping_app)
+
+    async def overlapping():
+        await asyncio.gather(*(_request(middleware, f"/r{i}") for i in range(4)))
+
+    asyncio.run(overlapping())
+    assert list(profiling.iterdir()) == []
+
+
+def test_profiles_only_a_sample(profiling, monkeypatch):
+    monkeypatch.setattr(timing, "PROFILE_SAMPLE_RATE", 0.0)
+    asyncio.run(_request(timing.TimingMiddleware(_sleeping_app), "/unsampled"))
+    assert list(profiling.iterdir()) == []
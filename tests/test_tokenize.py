@@ -0,0 +1,90 @@
+import random
+import re
+
+import pytest
+
+from api.parsers.base import (
+    AMOUNT_PATTERN,
+    DATE_PATTERNS,
+    PAREN_AMOUNT_PATTERN,
+    POSITIVE_TXN_AMOUNT_PATTERN,
+    SIGNED_AMOUNT_PATTERN,
+    normalize_amount,
+    tokenize_line,
+)
+
+
+def baseline_split(line: str) -> tuple | None:
+    """The regex-by-regex splitting tokenize_line replaces: (date, amount, negative, description)."""
+    signed_match = SIGNED_AMOUNT_PATTERN.search(line)
+    paren_match = PAREN_AMOUNT_PATTERN.search(line)
+    positive_txn_match = POSITIVE_TXN_AMOUNT_PATTERN.search(line)
+    end_match = AMOUNT_PATTERN.search(line)
+    amt_match = signed_match or paren_match or positive_txn_match or end_match
+    if not amt_match:
+        return None
+    is_negative = bool(signed_match or paren_match)
+    date_val = None
+    for pat in DATE_PATTERNS:
+        m = re.search(pat, line)
+        if m:
+            date_val = m.group(1)
+            break
+    try:
+        raw = amt_match.group(1) if amt_match.lastindex else amt_match.group(0)
+        amount = -abs(normalize_amount(raw)) if is_negative else normalize_amount(raw)
+    except (ValueError, TypeError):
+        amount = None
+    desc = re.sub(SIGNED_AMOUNT_PATTERN, "", line)
+    desc = re.sub(POSITIVE_TXN_AMOUNT_PATTERN, "", desc)
+    desc = re.sub(AMOUNT_PATTERN, "", desc).strip()
+    desc = re.sub(PAREN_AMOUNT_PATTERN, "", desc).strip()
+    for p in DATE_PATTERNS:
+        desc = re.sub(p, "", desc, flags=re.I).strip()
+    desc = re.sub(r"\s+", " ", desc).strip() or "Unknown"
+    return date_val, amount, is_negative, desc
+
+
+def tokenized(line: str) -> tuple | None:
+    tok = tokenize_line(line)
+    if tok is None:
+        return None
+    return tok.date, tok.amount, tok.negative, tok.description
+
+
+@pytest.mark.parametrize("line", [
+    "2025-03-01 Coffee Shop -$4.50 $1,203.22",
+    "03/01/2025 PAYROLL DEPOSIT $2,500.00 $3,703.22",
+    "01 Mar 2025 Grocery (12.34)",
+    "1 mar 2025 lowercase month 45.00",
+    "15 March 25 Interac e-Transfer – $100.00",
+    "Refund — 7.99",
+    "Opening balance 1,000",
+    "Balance forward $",
+    "Transfer 2025/03/04 to 12-31-24 $ 5.46 $ 5,953.73",
+    "Trailing comma 1,234,",
+    "Only commas ,,,",
+    "No amount here at all",
+    "Paren ( $ 1,000.00 ) then 2025-01-02",
+    "DEC 05 2024 Upper month 3.00",
+    "Nested (3.00) -3.00 (4.00)",
+    "   ",
+])
+def test_matches_regex_splitting(line):
+    assert tokenized(line) == baseline_split(line)
+
+
+# Fragments that exercise every amount kind, both date case paths and the literal skips
+FRAGMENTS = [
+    "Coffee", "PAYROLL", "e-Transfer", "Shell", "Page 1 of 2", "(", ")", "$", "-", "–", "—", ",",
+    " ", "  ", "2025-03-01", "03/01/2025", "1-2-25", "01 Mar 2025", "1 mar 25", "12 Sept. 2024",
+    "5.46", "$5.46", "-$16.00", "– 3.00", "(12.34)", "( $ 1,000.00 )", "1,234", "1,234.5",
+    "$ 5,953.73", "7", "42,", "abc123", "x",
+]
+
+
+def test_matches_regex_splitting_on_random_lines():
+    rng = random.Random(18)
+    for _ in range(20000):
+        line = " ".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 8))).strip()
+        assert tokenized(line) == baseline_split(line), line
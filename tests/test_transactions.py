@@ -0,0 +1,77 @@
+import json
+import pickle
+
+from api.responses import json_bytes
+from api.transactions import ABSENT, TransactionBatch
+
+PARSED = [
+    {"date": "2025-03-01", "description": "Coffee", "amount": -4.5},
+    {"date": "2025-03-02", "description": "Payroll", "amount": 2000.0},
+]
+PLAID = [
+    {"date": "2025-03-03", "description": "Metro", "amount": -80.25, "category": "Groceries", "transaction_id": "t1"},
+    {"date": "2025-03-04", "description": "Shell", "amount": -45.0, "transaction_id": "t2"},
+]
+STORED = [
+    {"date": "2025-03-05", "description": "Netflix", "amount": -16.99, "category": "Entertainment"},
+]
+
+
+def test_to_dicts_round_trips_rows_without_adding_keys():
+    for rows in (PARSED, PLAID, STORED, PARSED + PLAID + STORED):
+        assert TransactionBatch.from_dicts(rows).to_dicts() == rows
+
+
+def test_concat_aligns_optional_columns():
+    batch = TransactionBatch.concat([
+        TransactionBatch.from_dicts(PARSED), TransactionBatch.from_dicts(PLAID), STORED, TransactionBatch(),
+    ])
+    assert len(batch) == 5
+    assert batch.column("category") == [ABSENT, ABSENT, "Groceries", ABSENT, "Entertainment"]
+    assert batch.column("transaction_id") == [ABSENT, ABSENT, "t1", "t2", ABSENT]
+    assert batch.to_dicts() == PARSED + PLAID + STORED
+    assert TransactionBatch.concat([batch[:2], batch[2:]]).to_dicts() == batch.to_dicts()
+
+
+def test_take_keeps_optional_columns():
+    batch = TransactionBatch.concat([PARSED, PLAID, STORED])
+    picked = batch.take([4, 0, 2])
+    assert picked.to_dicts() == [STORED[0], PARSED[0], PLAID[0]]
+    assert picked.column("transaction_id") == [ABSENT, ABSENT, "t1"]
+    assert batch[1:3].to_dicts() == [PARSED[1], PLAID[0]]
+    assert batch[-1] == STORED[0]
+
+
+def test_append_matches_from_dicts():
+    batch = TransactionBatch()
+    for row in PARSED + PLAID + STORED:
+        batch.append(row["date"], row["description"], row["amount"],
+                     **{k: v for k, v in row.items() if k not in ("date", "description", "amount")})
+    assert batch == TransactionBatch.from_dicts(PARSED + PLAID + STORED)
+
+
+def test_stored_rows_are_normalized():
+    # Intended: rows read back from storage come out in the form the analysis reads them,
+    # amounts as floats and descriptions stripped, with "name" or "Unknown" standing in
+    rows = [
+        {"date": "2025-03-01", "description": "  Padded  ", "amount": 2000},
+        {"date": "2025-03-02", "amount": "-3.5"},
+        {"date": None, "name": "Plaid name", "amount": -1},
+        {"description": "", "amount": 0},
+    ]
+    assert TransactionBatch.from_dicts(rows).to_dicts() == [
+        {"date": "2025-03-01", "description": "Padded", "amount": 2000.0},
+        {"date": "2025-03-02", "description": "Unknown", "amount": -3.5},
+        {"date": None, "description": "Plaid name", "amount": -1.0, "name": "Plaid name"},
+        {"date": None, "description": "Unknown", "amount": 0.0},
+    ]
+    assert json.loads(json_bytes(TransactionBatch.from_dicts(rows[:1]))) == [
+        {"date": "2025-03-01", "description": "Padded", "amount": 2000.0}
+    ]
+    assert b'"amount":2000.0' in json_bytes(TransactionBatch.from_dicts(rows[:1]))
+
+
+def test_pickle_keeps_absent_singleton():
+    batch = pickle.loads(pickle.dumps(TransactionBatch.concat([PARSED, PLAID])))
+    assert batch.column("category")[0] is ABSENT
+    assert batch.to_dicts() == PARSED + PLAID
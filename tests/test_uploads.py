@@ -0,0 +1,129 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import index, uploads
+
+
+@pytest.fixture
+def client(monkeypatch):
+    spooled = []
+    new_spool = uploads._new_spool
+
+    def recording_spool(index_, filename):
+        spool = new_spool(index_, filename)
+        spooled.append(spool["path"])
+        return spool
+
+    async def fake_parse(spool, cache):
+        return []
+
+    monkeypatch.setattr(uploads, "_new_spool", recording_spool)
+    monkeypatch.setattr(index, "parse_upload", fake_parse)
+    with TestClient(index.app) as test_client:
+        test_client.spooled = spooled
+        yield test_client
+
+
+def _stream(client, names):
+    files = [("statements", (name, b"%PDF-1.4 not really", "application/pdf")) for name in names]
+    resp = client.post("/api/upload_statement/stream", files=files)
+    return [json.loads(line) for line in resp.text.splitlines()]
+
+
+def _sync(client, names):
+    files = [("statements", (name, b"%PDF-1.4 not really", "application/pdf")) for name in names]
+    return client.post("/api/upload_statement", files=files).json()
+
+
+def test_stream_rejects_upload_with_non_pdf_like_sync(client):
+    names = ["a.pdf", "notes.txt", "b.pdf"]
+    records = _stream(client, names)
+    error = "Only PDF files accepted. 'notes.txt' is not a PDF."
+    assert records == [{"type": "error", "error": error}]
+    assert _sync(client, names) == {"error": error}
+
+
+def test_stream_too_many_files_deletes_every_spool_before_answering(client, monkeypatch):
+    left_at_answer = []
+    ndjson = index._ndjson
+
+    def checking_ndjson(record):
+        left_at_answer.extend(p for p in client.spooled if Path(p).exists())
+        return ndjson(record)
+
+    monkeypatch.setattr(index, "_ndjson", checking_ndjson)
+    records = _stream(client, [f"s{i}.pdf" for i in range(index.MAX_STATEMENTS + 3)])
+    assert records == [{"type": "error", "error": f"Maximum {index.MAX_STATEMENTS} statements allowed"}]
+    assert len(client.spooled) == index.MAX_STATEMENTS + 3
+    assert left_at_answer == []
+
+
+def test_stream_parses_every_file(client):
+    records = _stream(client, ["a.pdf", "b.PDF"])
+    assert sorted(r["filename"] for r in records if r["type"] == "file") == ["a.pdf", "b.PDF"]
+    assert records[-1]["type"] == "summary"
+    assert not [p for p in client.spooled if Path(p).exists()]
+
+
+@pytest.fixture(params=["inline", "thread"])
+def pooled_client(request, monkeypatch):
+    """Real parse_upload on a PARSE_EXECUTOR pool; each upload's body says how long its parse
+    takes and whether it fails, so files finish out of upload order."""
+    from api import parse_executor, pdf_parser
+    from api.transactions import TransactionBatch
+
+    def fake_parse_statement(path):
+        spec = json.loads(Path(path).read_bytes())
+        time.sleep(spec["delay"])
+        if "error" in spec:
+            raise ValueError(spec["error"])
+        return TransactionBatch.from_dicts([{"date": "2025-03-01", "description": spec["name"], "amount": -1.0}])
+
+    class NoCache:
+        def get(self, key):
+            return None
+
+        def set(self, key, value):
+            pass
+
+    monkeypatch.setattr(parse_executor, "PARSE_EXECUTOR", request.param)
+    monkeypatch.setattr(parse_executor, "_executor", None)
+    monkeypatch.setattr(pdf_parser, "parse_statement", fake_parse_statement)
+    monkeypatch.setattr(index, "get_parse_cache", NoCache)
+    with TestClient(index.app) as test_client:
+        yield test_client
+    parse_executor.shutdown_parse_executor()
+
+
+def _upload(client, specs, path="/api/upload_statement"):
+    files = [("statements", (f"{spec['name']}.pdf", json.dumps(spec).encode(), "application/pdf")) for spec in specs]
+    return client.post(path, files=files)
+
+
+def test_sync_results_keep_upload_order(pooled_client):
+    specs = [{"name": "slow", "delay": 0.3}, {"name": "medium", "delay": 0.15}, {"name": "fast", "delay": 0}]
+    body = _upload(pooled_client, specs).json()
+    assert [f["filename"] for f in body["files"]] == ["slow.pdf", "medium.pdf", "fast.pdf"]
+    assert [t["description"] for t in body["transactions"]] == ["slow", "medium", "fast"]
+
+
+def test_sync_reports_first_failing_file_in_upload_order(pooled_client):
+    # "late" fails after "early" has already failed; the error still names the earlier upload
+    specs = [{"name": "good", "delay": 0}, {"name": "late", "delay": 0.3, "error": "bad xref"},
+             {"name": "early", "delay": 0, "error": "not a statement"}, {"name": "also-good", "delay": 0.1}]
+    assert _upload(pooled_client, specs).json() == {"error": "Failed to parse 'late.pdf': bad xref"}
+
+
+def test_stream_reports_each_failing_file(pooled_client):
+    specs = [{"name": "good", "delay": 0.2}, {"name": "broken", "delay": 0, "error": "bad xref"},
+             {"name": "fast", "delay": 0}]
+    records = [json.loads(line) for line in _upload(pooled_client, specs, "/api/upload_statement/stream").text.splitlines()]
+    files = {r["index"]: r for r in records if r["type"] == "file"}
+    assert [files[i]["filename"] for i in sorted(files)] == ["good.pdf", "broken.pdf", "fast.pdf"]
+    assert files[1] == {"type": "file", "index": 1, "filename": "broken.pdf", "error": "Failed to parse 'broken.pdf': bad xref"}
+    assert [t["description"] for i in (0, 2) for t in files[i]["transactions"]] == ["good", "fast"]
+    assert records[-1]["type"] == "summary" and records[-1]["transaction_count"] == 2
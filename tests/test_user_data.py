@@ -0,0 +1,165 @@
+import base64
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import index
+from api.analysis import PARTIAL_VERSION, analyze_transactions, partial_analysis
+from api.responses import json_bytes
+from api.transactions import TransactionBatch
+from tests.fake_supabase import FakeSupabase
+
+MARCH = [
+    {"date": "2025-03-03", "description": "Payroll", "amount": 2000.0, "category": "Income"},
+    {"date": "2025-03-05", "description": "Metro", "amount": -80.25, "category": "Groceries"},
+    {"date": "2025-03-20", "description": "Shell", "amount": -45.0, "category": "Transportation"},
+]
+APRIL = [
+    {"date": "2025-04-02", "description": "Metro", "amount": -61.1, "category": "Groceries"},
+    {"date": "2025-04-09", "description": "Netflix", "amount": -16.99, "category": "Entertainment"},
+]
+AUTH = {"Authorization": "Bearer good"}
+
+
+def _json(value):
+    return json.loads(json_bytes(value))
+
+
+def _rows(rows):
+    return _json(TransactionBatch.from_dicts(rows))
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    fake = FakeSupabase(user_statements=[
+        {"id": 1, "user_id": "u1", "filename": "march.pdf", "created_at": "2025-04-01", "transactions": MARCH},
+        {"id": 2, "user_id": "u1", "filename": "april.pdf", "created_at": "2025-05-01", "transactions": APRIL},
+        {"id": 3, "user_id": "u2", "filename": "other.pdf", "created_at": "2025-04-01", "transactions": MARCH},
+    ])
+
+    async def verify(token):
+        return "u1" if token == "good" else None
+
+    monkeypatch.setattr(index, "get_supabase", lambda: fake)
+    monkeypatch.setattr(index, "verify_token_async", verify)
+    monkeypatch.setattr(index, "ANALYSIS_BACKEND", "python")
+    return fake
+
+
+@pytest.fixture
+def client(supabase):
+    with TestClient(index.app) as test_client:
+        yield test_client
+
+
+def test_unfiltered(client):
+    body = client.get("/api/user_data", headers=AUTH).json()
+    assert [s["filename"] for s in body["statements"]] == ["march.pdf", "april.pdf"]
+    assert body["transactions"] == _rows(MARCH + APRIL)
+    assert body["analysis"] == _json(analyze_transactions(MARCH + APRIL))
+
+
+def test_requires_token(client):
+    assert client.get("/api/user_data").status_code == 401
+    assert client.get("/api/user_data", headers={"Authorization": "Bearer bad"}).status_code == 401
+
+
+def test_pages_newest_first_until_no_cursor(client):
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/user_data", headers=AUTH, params=params).json()
+        pages.append(body["transactions"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert [len(p) for p in pages] == [2, 2, 1]
+    newest = sorted(MARCH + APRIL, key=lambda t: t["date"], reverse=True)
+    assert [t for p in pages for t in p] == _rows(newest)
+    assert body["analysis"] == _json(analyze_transactions(MARCH + APRIL))
+
+
+def _cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!", base64.urlsafe_b64encode(b"\xff\xfe").decode(), _cursor([1]), _cursor("x"),
+    _cursor({"page": 1}), _cursor({"offset": -1}), _cursor({"offset": "two"}),
+    base64.urlsafe_b64encode(b'{"offset": 1e999}').decode(),
+])
+def test_bad_cursor_is_400(client, cursor):
+    resp = client.get("/api/user_data", headers=AUTH, params={"limit": 2, "cursor": cursor})
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Invalid cursor"
+
+
+def test_cursor_past_the_end_is_an_empty_last_page(client):
+    body = client.get("/api/user_data", headers=AUTH, params={"limit": 2, "cursor": _cursor({"offset": 50})}).json()
+    assert body["transactions"] == []
+    assert body["next_cursor"] is None
+
+
+@pytest.mark.parametrize("limit", [0, -1, index.USER_DATA_MAX_PAGE + 1])
+def test_limit_bounds(client, limit):
+    assert client.get("/api/user_data", headers=AUTH, params={"limit": limit}).status_code == 422
+
+
+@pytest.mark.parametrize("params, expected", [
+    ({"date_from": "2025-03-05", "date_to": "2025-04-02"}, MARCH[1:] + APRIL[:1]),
+    ({"category": "Groceries"}, [MARCH[1], APRIL[0]]),
+    ({"date_from": "2025-04-01", "category": "Groceries"}, APRIL[:1]),
+    ({"date_to": "2024-12-31"}, []),
+])
+def test_filters_narrow_transactions_and_analysis(client, params, expected):
+    body = client.get("/api/user_data", headers=AUTH, params=params).json()
+    assert body["transactions"] == _rows(expected)
+    assert body["analysis"] == _json(analyze_transactions(expected))
+
+
+def test_filtered_and_paged(client):
+    body = client.get("/api/user_data", headers=AUTH, params={"category": "Groceries", "limit": 1}).json()
+    assert body["transactions"] == _rows(APRIL[:1])
+    assert body["next_cursor"] is not None
+    assert body["analysis"] == _json(analyze_transactions([MARCH[1], APRIL[0]]))
+
+
+def test_without_transactions(client):
+    body = client.get("/api/user_data", headers=AUTH, params={"include_transactions": "false"}).json()
+    assert "transactions" not in body
+    assert [(s["filename"], s["transaction_count"]) for s in body["statements"]] == [("march.pdf", 3), ("april.pdf", 2)]
+    assert all("transactions" not in s for s in body["statements"])
+    assert body["analysis"] == _json(analyze_transactions(MARCH + APRIL))
+
+
+def test_without_transactions_still_filters(client):
+    params = {"include_transactions": "false", "category": "Groceries"}
+    body = client.get("/api/user_data", headers=AUTH, params=params).json()
+    assert all("transactions" not in s for s in body["statements"])
+    assert body["analysis"] == _json(analyze_transactions([MARCH[1], APRIL[0]]))
+
+
+def test_stale_partials_rebuilt_and_written_back(client, supabase):
+    current = partial_analysis(APRIL)
+    supabase.tables["user_statements"][0]["analysis_partial"] = {**partial_analysis(MARCH), "version": "0-stale"}
+    supabase.tables["user_statements"][1]["analysis_partial"] = current
+    body = client.get("/api/user_data", headers=AUTH).json()
+    assert body["analysis"] == _json(analyze_transactions(MARCH + APRIL))
+    updates = [w for w in supabase.writes if w[:2] == ("user_statements", "update")]
+    # Only the stale row is rebuilt, and it is stored at the current version
+    assert len(updates) == 1
+    assert updates[0][2]["analysis_partial"]["version"] == PARTIAL_VERSION
+    stored = supabase.tables["user_statements"]
+    assert stored[0]["analysis_partial"] == _json(partial_analysis(MARCH))
+    assert stored[1]["analysis_partial"] == current
+
+
+def test_current_partials_used_as_stored(client, supabase):
+    # A current partial is trusted: the analysis comes from it, not from the rows
+    fake = {**partial_analysis(MARCH[:1]), "version": PARTIAL_VERSION}
+    for row in supabase.tables["user_statements"]:
+        row["analysis_partial"] = fake
+    body = client.get("/api/user_data", headers=AUTH, params={"include_transactions": "false"}).json()
+    assert body["analysis"] == _json(analyze_transactions(MARCH[:1] * 2))
+    assert not [w for w in supabase.writes if w[1] == "update"]